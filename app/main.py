@@ -1,19 +1,45 @@
 # app/main.py
 from __future__ import annotations
 
+import copy
+import json
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 
 from core.models import Task
-from core.extractor import extract_task
+from core.extract_cache import AUTOSAVE_S as TASK_CACHE_AUTOSAVE_S, TASK_CACHE, classify_many_cached, extract_tasks_cached
+from core.extractor import BATCH_CHUNK_SIZE, build_task
 from core.cluster import norm_text
 from core.radar import build_radar
+from core.radar_tree import RadarTree, parse_level
+from core.radar_state import TOP_K as RADAR_SKETCH_K, RadarState, decode_states, encode_states, merge_states, radar_from_states
+from core.rule_pack import current_pack, reload_rules, rules_status
+from core.semantic import SEMANTIC
+from core.signature import SIGNATURES, make_signature
 from core.idea_builder import ideas_from_radar
+from core.text_analysis import analyze
+from collectors.scheduler import DEFAULT_STATE_PATH as SCHEDULER_STATE_PATH, state_view as scheduler_state_view
 
-app = FastAPI(title="Hunter Agent")
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # кэш извлечения: чтение с диска на старте, запись — фоном и на остановке (не в запросах)
+    TASK_CACHE.load()
+    TASK_CACHE.start_autosave(TASK_CACHE_AUTOSAVE_S)
+    try:
+        yield
+    finally:
+        TASK_CACHE.stop_autosave()
+
+
+app = FastAPI(title="Hunter Agent", lifespan=_lifespan)
 
 
 class IngestRequest(BaseModel):
@@ -34,11 +60,22 @@ class IngestRequest(BaseModel):
     signature: Optional[str] = None       # domain|intent|output|subtopic|keyword
 
 
+class IngestBatchRequest(BaseModel):
+    items: List[IngestRequest] = Field(default_factory=list)
+
+
 class ExtractRequest(BaseModel):
     limit: int = 200
     only_new: bool = True
 
 
+class ReextractRequest(BaseModel):
+    chunk_size: int = BATCH_CHUNK_SIZE  # текстов на задачу пула процессов
+    workers: Optional[int] = None  # None — авто (пул процессов только для больших батчей)
+    only_stale: bool = True  # пропускать задачи, уже проштампованные активной версией правил
+    diff_limit: int = 50
+
+
 class StoredRaw(BaseModel):
     id: int
     text: str
@@ -65,6 +102,8 @@ class StoredTask(BaseModel):
     raw_id: int
     task: Task
     meta: Dict[str, Any] = Field(default_factory=dict)
+    # id сигнатуры в SIGNATURES: считается один раз на /extract (и /reextract)
+    signature_id: int = 0
     created_at: str
 
 
@@ -72,6 +111,73 @@ RAW_STORE: List[StoredRaw] = []
 TASK_STORE: List[StoredTask] = []
 EXTRACTED_RAW_IDS: Set[int] = set()
 RAW_DEDUP_SET: Set[str] = set()
+# меняется на старте и на /reset: клиентские фильтры seen-URL по нему понимают, что индекс сервера пуст
+RAW_EPOCH = f"{time.time_ns():x}"
+# иерархические роллапы radar-а (domain → intent → output → subtopic), обновляются на /extract
+RADAR_TREE = RadarTree()
+# RadarState по сигнатурам этого узла (отдаются на /radar/state) и слитые состояния воркеров
+LOCAL_STATES: Dict[int, RadarState] = {}
+MERGED_STATES: Dict[str, RadarState] = {}
+
+
+def _radar_row(st: StoredTask, signature: Any) -> Dict[str, Any]:
+    m = st.meta or {}
+    return {
+        "signature": signature,
+        "text": st.task.problem_statement,
+        "tags": m.get("tags") or [],
+        "source": m.get("source") or "unknown",
+        "url": m.get("url") or None,
+        "created_at": 0,
+        "last_activity_at": int(m.get("last_activity_at") or 0),
+        "view_count": int(m.get("view_count") or 0),
+        "score": int(m.get("vote_score") or 0),
+        "answer_count": int(m.get("answer_count") or 0),
+        "is_answered": bool(m.get("is_answered") or False),
+        "label": m.get("label") or "unknown",
+    }
+
+
+def _tree_add(st: StoredTask, sign: int = 1) -> None:
+    # в дереве — компоненты скора (от времени не зависят), затухание считается на выдаче
+    row = _radar_row(st, st.signature_id)
+    parts = SIGNATURES.parts(st.signature_id)
+    if sign > 0:
+        RADAR_TREE.add(parts, row)
+        _local_state(st.signature_id).add_row(row)
+    else:
+        RADAR_TREE.remove(parts, row)
+
+
+def _local_state(sid: int) -> RadarState:
+    state = LOCAL_STATES.get(sid)
+    if state is None:
+        state = LOCAL_STATES[sid] = RadarState(SIGNATURES.string(sid))
+    return state
+
+
+def _sketch_facets(sid: Any):
+    state = LOCAL_STATES.get(sid)
+    return state.facets() if state is not None else None
+
+
+def _rebuild_local_states(sids: Optional[Set[int]] = None) -> None:
+    # sketch-и и примеры не умеют remove — после переездов пересобираем затронутые сигнатуры
+    if sids is None:
+        LOCAL_STATES.clear()
+    else:
+        for sid in sids:
+            LOCAL_STATES.pop(sid, None)
+    for st in TASK_STORE:
+        if sids is not None and st.signature_id not in sids:
+            continue
+        row = _radar_row(st, st.signature_id)
+        _local_state(st.signature_id).add_row(row)
+
+
+def _signature_id(raw_signature: Optional[str], task: Task, analysis: Any = None) -> int:
+    # сигнатура от коллектора приоритетнее; иначе структура задачи + topic bucket
+    return SIGNATURES.intern(raw_signature or make_signature(task, analysis))
 
 
 @app.get("/health")
@@ -79,15 +185,15 @@ def health():
     return {"status": "ok"}
 
 
-@app.post("/ingest")
-def ingest(req: IngestRequest):
+def _store_raw(req: IngestRequest) -> Tuple[str, Optional[StoredRaw]]:
+    """-> ("placeholder" | "deduped" | "ingested", сохранённый элемент или None)."""
     text = req.text.strip()
     if text.lower() in {"string", "test", "asdf"}:
-        raise HTTPException(status_code=400, detail="Placeholder text. Put a real problem/query.")
+        return "placeholder", None
 
     normalized = norm_text(text)
     if normalized in RAW_DEDUP_SET:
-        return {"ok": True, "deduped": True, "message": "Already ingested", "text": text}
+        return "deduped", None
 
     item = StoredRaw(
         id=len(RAW_STORE) + 1,
@@ -107,9 +213,47 @@ def ingest(req: IngestRequest):
     )
     RAW_STORE.append(item)
     RAW_DEDUP_SET.add(normalized)
+    return "ingested", item
+
+
+@app.post("/ingest")
+def ingest(req: IngestRequest):
+    status, item = _store_raw(req)
+    if status == "placeholder":
+        raise HTTPException(status_code=400, detail="Placeholder text. Put a real problem/query.")
+    if status == "deduped":
+        return {"ok": True, "deduped": True, "message": "Already ingested", "text": req.text.strip()}
     return {"ok": True, "item": item.model_dump()}
 
 
+@app.post("/ingest/batch")
+def ingest_batch(req: IngestBatchRequest):
+    """Пачка элементов за один запрос (sink пайплайна коллекторов); статус — по каждому элементу."""
+    results = [_store_raw(x)[0] for x in req.items]
+    counts = Counter(results)
+    return {
+        "ok": True,
+        "received": len(results),
+        "ingested": counts["ingested"],
+        "deduped": counts["deduped"],
+        "rejected": counts["placeholder"],
+        "results": results,
+    }
+
+
+@app.get("/ingest/seen")
+def ingest_seen(after_id: int = 0, limit: int = 5000):
+    """URL сохранённых элементов с id > after_id — для синхронизации клиентского Bloom-фильтра."""
+    # id = позиция в RAW_STORE + 1
+    items = RAW_STORE[max(0, after_id):max(0, after_id) + max(1, limit)]
+    return {
+        "epoch": RAW_EPOCH,
+        "total": len(RAW_STORE),
+        "last_id": items[-1].id if items else after_id,
+        "urls": [x.url for x in items if x.url],
+    }
+
+
 @app.get("/raw")
 def raw(limit: int = 50):
     items = RAW_STORE[-limit:]
@@ -121,19 +265,23 @@ def extract(req: ExtractRequest):
     candidates = RAW_STORE[-req.limit:] if req.limit > 0 else list(RAW_STORE)
 
     created: List[dict] = []
-    skipped = 0
+    todo = [x for x in candidates if not (req.only_new and x.id in EXTRACTED_RAW_IDS)]
+    skipped = len(candidates) - len(todo)
 
-    for raw_item in candidates:
-        if req.only_new and raw_item.id in EXTRACTED_RAW_IDS:
-            skipped += 1
-            continue
+    # normalized уже посчитан на /ingest — не нормализуем текст второй раз;
+    # один TextAnalysis на документ для extractor-а, кластеризатора и сигнатуры
+    docs = [analyze(x.text, normalized=x.normalized) for x in todo]
+    task_objs = extract_tasks_cached(docs)
 
-        task_obj = extract_task(raw_item.text)
+    # онлайн-кластеризация для /radar?grouping=semantic — один mini-batch на вызов
+    semantic_ids = SEMANTIC.add_many(docs) if docs else []
 
+    for raw_item, doc, task_obj, semantic_id in zip(todo, docs, task_objs, semantic_ids):
         stored = StoredTask(
             id=len(TASK_STORE) + 1,
             raw_id=raw_item.id,
             task=task_obj,
+            signature_id=_signature_id(raw_item.signature, task_obj, doc),
             meta={
                 "source": raw_item.source,
                 "query": raw_item.query,
@@ -145,10 +293,12 @@ def extract(req: ExtractRequest):
                 "vote_score": raw_item.vote_score,
                 "last_activity_at": raw_item.last_activity_at,
                 "signature": raw_item.signature,
+                "semantic_id": semantic_id,
             },
             created_at=datetime.utcnow().isoformat() + "Z",
         )
         TASK_STORE.append(stored)
+        _tree_add(stored)
         EXTRACTED_RAW_IDS.add(raw_item.id)
         created.append(stored.model_dump())
 
@@ -161,6 +311,115 @@ def extract(req: ExtractRequest):
     }
 
 
+@app.post("/reextract")
+def reextract(req: ReextractRequest):
+    """
+    Переклассифицировать уже извлечённые задачи активным rule pack-ом.
+    Task переписывается только если поменялись intent/input_type/output_type/domain,
+    сигнатура (с topic bucket) пересчитывается для каждой просканированной задачи;
+    в ответе — сколько задач переехало между сигнатурами радара.
+    """
+    t0 = time.perf_counter()
+    pack = current_pack()
+    raw_by_id = {x.id: x for x in RAW_STORE}
+    todo = [
+        st for st in TASK_STORE
+        if st.raw_id in raw_by_id and not (req.only_stale and st.task.rules_version == pack.version)
+    ]
+
+    changed = restamped = 0
+    moved: Counter = Counter()
+    sig_out: Counter = Counter()
+    sig_in: Counter = Counter()
+    docs = [analyze(raw_by_id[st.raw_id].text, normalized=raw_by_id[st.raw_id].normalized) for st in todo]
+    # весь прогон — одной версией правил и одним батчем: промахи кэша уходят в один пул процессов
+    fields = classify_many_cached(docs, pack=pack, workers=req.workers, chunk_size=max(1, req.chunk_size))
+    for st, a, f in zip(todo, docs, fields):
+        t = st.task
+        if (t.intent, t.input_type, t.output_type, t.domain) == f:
+            t.rules_version = pack.version
+            restamped += 1
+        else:
+            st.task = build_task(a.text, f, pack.version)
+            changed += 1
+        # сигнатура зависит и от правил topic/subtopic — пересчитываем даже при тех же полях
+        old_sig = st.signature_id
+        new_sig = _signature_id(raw_by_id[st.raw_id].signature, st.task, a)
+        if old_sig != new_sig:
+            # переносим задачу между узлами дерева роллапов
+            _tree_add(st, sign=-1)
+            st.signature_id = new_sig
+            _tree_add(st)
+            moved[(old_sig, new_sig)] += 1
+            sig_out[old_sig] += 1
+            sig_in[new_sig] += 1
+
+    if moved:
+        _rebuild_local_states(set(sig_out) | set(sig_in))
+
+    elapsed = time.perf_counter() - t0
+    lim = max(0, req.diff_limit)
+    return {
+        "ok": True,
+        "rules_version": pack.version,
+        "scanned": len(todo),
+        "skipped": len(TASK_STORE) - len(todo),
+        "changed": changed,
+        "unchanged": restamped,
+        "moved": [
+            {"from": SIGNATURES.string(a), "to": SIGNATURES.string(b), "count": n}
+            for (a, b), n in moved.most_common(lim)
+        ],
+        "signatures": {
+            "out": {SIGNATURES.string(k): n for k, n in sig_out.most_common(lim)},
+            "in": {SIGNATURES.string(k): n for k, n in sig_in.most_common(lim)},
+        },
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_s": round(len(todo) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "raw": len(RAW_STORE),
+        "tasks": len(TASK_STORE),
+        "extract_cache": TASK_CACHE.stats(),
+        "semantic": SEMANTIC.stats(),
+        "signatures": len(SIGNATURES),
+        "radar_sketches": {
+            "states": len(LOCAL_STATES),
+            "k": RADAR_SKETCH_K,
+            "entries": sum(len(x.tags) + len(x.sources) for x in LOCAL_STATES.values()),
+        },
+    }
+
+
+@app.get("/scheduler")
+def scheduler(limit: int = 20):
+    """
+    План опросов adaptive-планировщика (scripts/run_scheduler.py пишет state-файл):
+    due_in_s считается на момент запроса, running — по свежести updated_at.
+    """
+    path = os.getenv("HUNTER_SCHEDULER_STATE", SCHEDULER_STATE_PATH)
+    if not os.path.exists(path):
+        return {"running": False, "plan": []}
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    return scheduler_state_view(state, time.time(), limit)
+
+
+@app.get("/rules")
+def rules():
+    return rules_status()
+
+
+@app.post("/rules/reload")
+def rules_reload():
+    # пак собирается целиком и подменяется атомарно; при ошибке остаётся старый
+    return reload_rules(force=True)
+
+
 @app.get("/tasks")
 def tasks(limit: int = 50):
     items = TASK_STORE[-limit:]
@@ -168,54 +427,108 @@ def tasks(limit: int = 50):
 
 
 @app.get("/radar")
-def radar(min_count: int = 2, limit: int = 30):
+def radar(
+    min_count: int = 2,
+    limit: int = 30,
+    grouping: str = "signature",
+    level: Optional[str] = None,
+    prefix: Optional[str] = None,
+    exact_facets: bool = False,
+):
+    if level:
+        # роллап из дерева: O(узлов уровня), без прохода по TASK_STORE
+        try:
+            depth = parse_level(level)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        path = tuple(x for x in (prefix or "").split("|") if x)
+        if len(path) >= depth:
+            raise HTTPException(status_code=400, detail="prefix must be shorter than level")
+        items = RADAR_TREE.rollup(depth, prefix=path, min_count=min_count, limit=limit)
+        return {"count": len(items), "level": level, "prefix": prefix, "items": items}
+
+    if grouping not in ("signature", "semantic"):
+        raise HTTPException(status_code=400, detail="grouping must be 'signature' or 'semantic'")
+
     rows: List[Dict[str, Any]] = []
     for st in TASK_STORE:
         m = st.meta or {}
-        sig = m.get("signature")
-        if not sig:
-            # fallback: хотя бы domain|intent|output|tags|tags
-            t = st.task
-            tag_hint = "+".join(sorted(set((m.get("tags") or [])[:3]))) or "misc"
-            sig = f"{t.domain}|{t.intent}|{t.output_type}|tags:{tag_hint}|tags:{tag_hint}"
-
-        rows.append(
-            {
-                "signature": sig,
-                "text": st.task.problem_statement,
-                "tags": m.get("tags") or [],
-                "source": m.get("source") or "unknown",
-                "url": m.get("url") or None,
-                "created_at": 0,
-                "last_activity_at": int(m.get("last_activity_at") or 0),
-                "view_count": int(m.get("view_count") or 0),
-                "score": int(m.get("vote_score") or 0),
-                "answer_count": int(m.get("answer_count") or 0),
-                "is_answered": bool(m.get("is_answered") or False),
-                "label": m.get("label") or "unknown",
-            }
-        )
-
-    items = build_radar(items=rows, min_count=min_count, limit=limit)
-
+        if grouping == "semantic":
+            if not m.get("semantic_id"):
+                continue
+            sig: Any = f"semantic:{m['semantic_id']}"
+        else:
+            sig = st.signature_id
+        rows.append(_radar_row(st, sig))
+
+    # tags_top/sources по сигнатурам — из sketch-ей LOCAL_STATES (обновляются на /extract)
+    facets = None if (exact_facets or grouping != "signature") else _sketch_facets
+    items = build_radar(items=rows, min_count=min_count, limit=limit, facets=facets)
+
+    out: List[Dict[str, Any]] = []
+    for x in items:
+        row: Dict[str, Any] = {
+            "signature": x.signature,
+            "count": x.count,
+            "score": round(x.score, 2),
+            "total_views": x.total_views,
+            "total_answers": x.total_answers,
+            "answered_ratio": round(x.answered_ratio, 3),
+            "avg_votes": round(x.avg_votes, 2),
+            "days_since_activity": round(x.age_days, 1),
+            "label": x.label,
+            "tags_top": x.tags_top,
+            "sources": x.sources,
+            "examples": x.examples,
+        }
+        if grouping == "semantic":
+            row["keywords"] = SEMANTIC.keywords(int(str(x.signature).split(":", 1)[1]))
+        else:
+            # строка и компоненты — только для попавших в выдачу сигнатур
+            row["signature_id"] = x.signature
+            row["signature"] = SIGNATURES.string(int(x.signature))
+            row["components"] = SIGNATURES.parts(int(x.signature))._asdict()
+        out.append(row)
+
+    return {"count": len(out), "items": out}
+
+
+@app.get("/radar/state")
+def radar_state():
+    """Частичные RadarState этого узла в бинарном wire-формате (core/radar_state.py)."""
+    return Response(content=encode_states(LOCAL_STATES.values()), media_type="application/octet-stream")
+
+
+@app.post("/radar/merge")
+async def radar_merge(request: Request):
+    """Принять частичные состояния воркера (тело — вывод /radar/state) и влить в общий radar."""
+    try:
+        states = decode_states(await request.body())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"bad radar state payload: {e}")
+    merge_states(MERGED_STATES, states)
+    return {"ok": True, "received": len(states), "signatures": len(MERGED_STATES)}
+
+
+@app.get("/radar/merged")
+def radar_merged(min_count: int = 2, limit: int = 30, include_local: bool = True):
+    states: Dict[str, RadarState] = {}
+    merge_states(states, (copy.deepcopy(x) for x in MERGED_STATES.values()))
+    if include_local:
+        merge_states(states, (copy.deepcopy(x) for x in LOCAL_STATES.values()))
+    items = radar_from_states(states.values(), min_count=min_count, limit=limit)
+    return {"count": len(items), "signatures": len(states), "items": items}
+
+
+@app.get("/signatures")
+def signatures(limit: int = 100):
+    n = len(SIGNATURES)
+    ids = range(max(1, n - limit + 1), n + 1) if limit > 0 else range(1, n + 1)
     return {
-        "count": len(items),
+        "count": n,
         "items": [
-            {
-                "signature": x.signature,
-                "count": x.count,
-                "score": round(x.score, 2),
-                "total_views": x.total_views,
-                "total_answers": x.total_answers,
-                "answered_ratio": round(x.answered_ratio, 3),
-                "avg_votes": round(x.avg_votes, 2),
-                "days_since_activity": round(x.age_days, 1),
-                "label": x.label,
-                "tags_top": x.tags_top,
-                "sources": x.sources,
-                "examples": x.examples,
-            }
-            for x in items
+            {"id": i, "signature": SIGNATURES.string(i), "components": SIGNATURES.parts(i)._asdict()}
+            for i in ids
         ],
     }
 
@@ -230,8 +543,15 @@ def ideas(min_count: int = 2, limit: int = 10):
 
 @app.post("/reset")
 def reset():
+    global RAW_EPOCH
     RAW_STORE.clear()
     TASK_STORE.clear()
     EXTRACTED_RAW_IDS.clear()
     RAW_DEDUP_SET.clear()
+    SEMANTIC.reset()
+    SIGNATURES.clear()
+    RADAR_TREE.clear()
+    LOCAL_STATES.clear()
+    MERGED_STATES.clear()
+    RAW_EPOCH = f"{time.time_ns():x}"
     return {"ok": True}
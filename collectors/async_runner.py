@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# запросов в секунду и burst на хост; публичный reddit режет жёстче всех
+DEFAULT_LIMITS: Dict[str, Tuple[float, int]] = {
+    "www.reddit.com": (1.0, 3),
+    "hn.algolia.com": (4.0, 8),
+    "api.stackexchange.com": (5.0, 10),
+}
+FALLBACK_LIMIT: Tuple[float, int] = (2.0, 2)
+
+
+class TokenBucket:
+    """
+    Token bucket для asyncio: rate токенов в секунду, не больше burst в запасе.
+    Ожидающие обслуживаются по очереди (lock держится на время сна).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.waited_s = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, cost: int = 1) -> None:
+        """
+        Списать cost токенов. cost больше burst списывается по частям по мере
+        пополнения, так что средний темп не превышает rate при любом cost.
+        """
+        if self._lock is None:
+            # lock создаём лениво — внутри работающего event loop
+            self._lock = asyncio.Lock()
+        need = float(max(0, cost))
+        async with self._lock:
+            while True:
+                self._refill()
+                take = min(self.tokens, need)
+                self.tokens -= take
+                need -= take
+                if need <= 1e-9:
+                    return
+                # ждём не дольше, чем до полного bucket-а: сверх burst пополнение теряется
+                wait = min(need, self.burst) / self.rate
+                self.waited_s += wait
+                await asyncio.sleep(wait)
+
+
+@dataclass
+class FetchJob:
+    """
+    Единица сбора: блокирующий fetch() (обычные requests-коллекторы) на одном хосте.
+    cost — сколько HTTP-запросов делает fetch (столько токенов берём из bucket-а).
+    """
+    host: str
+    name: str
+    fetch: Callable[[], List[Dict[str, Any]]]
+    cost: int = 1
+
+
+@dataclass
+class RunStats:
+    wall_s: float = 0.0
+    jobs: int = 0
+    errors: int = 0
+    items: int = 0
+    ingested: int = 0
+    requests_by_host: Counter = field(default_factory=Counter)
+    waited_by_host: Dict[str, float] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "wall_s": round(self.wall_s, 2),
+            "jobs": self.jobs,
+            "errors": self.errors,
+            "items": self.items,
+            "ingested": self.ingested,
+            "requests_by_host": dict(self.requests_by_host),
+            "rate_wait_s_by_host": {h: round(w, 2) for h, w in self.waited_by_host.items()},
+        }
+
+
+def make_buckets(jobs: List[FetchJob], limits: Optional[Dict[str, Tuple[float, int]]] = None) -> Dict[str, TokenBucket]:
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    return {host: TokenBucket(*limits.get(host, FALLBACK_LIMIT)) for host in {j.host for j in jobs}}
+
+
+async def run_async(
+    jobs: List[FetchJob],
+    ingest: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    limits: Optional[Dict[str, Tuple[float, int]]] = None,
+    concurrency: int = 8,
+    ingest_concurrency: int = 4,
+    buckets: Optional[Dict[str, TokenBucket]] = None,
+) -> RunStats:
+    """
+    Параллельный сбор: каждый job ждёт токены своего хоста и выполняется в потоке
+    (asyncio.to_thread), результаты сразу уходят в ingest, не дожидаясь остальных источников.
+    buckets — общие между вызовами bucket-ы (долгоживущий планировщик); недостающие хосты добавляются.
+    """
+    stats = RunStats(jobs=len(jobs))
+    if buckets is None:
+        buckets = make_buckets(jobs, limits)
+    else:
+        for host, b in make_buckets([j for j in jobs if j.host not in buckets], limits).items():
+            buckets[host] = b
+    fetch_sem = asyncio.Semaphore(max(1, concurrency))
+    ingest_sem = asyncio.Semaphore(max(1, ingest_concurrency))
+    pending: List[Awaitable[Any]] = []
+
+    async def ingest_one(item: Dict[str, Any]) -> None:
+        async with ingest_sem:
+            try:
+                if await asyncio.to_thread(ingest, item):
+                    stats.ingested += 1
+            except Exception as e:
+                print(f"[ingest] error: {e}")
+
+    async def run_job(job: FetchJob) -> None:
+        await buckets[job.host].acquire(job.cost)
+        async with fetch_sem:
+            stats.requests_by_host[job.host] += job.cost
+            try:
+                items = await asyncio.to_thread(job.fetch)
+            except Exception as e:
+                stats.errors += 1
+                print(f"[{job.host}] error {job.name}: {e}")
+                return
+        stats.items += len(items)
+        if ingest is not None:
+            pending.extend(asyncio.create_task(ingest_one(it)) for it in items)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(run_job(j) for j in jobs))
+    if pending:
+        await asyncio.gather(*pending)
+    stats.wall_s = time.perf_counter() - t0
+    stats.waited_by_host = {h: b.waited_s for h, b in buckets.items()}
+    return stats
+
+
+def run_sequential(
+    jobs: List[FetchJob],
+    ingest: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    sleep_s: float = 0.5,
+) -> RunStats:
+    """Старое поведение для сравнения: jobs по одному, sleep между ними, ingest после сбора."""
+    stats = RunStats(jobs=len(jobs))
+    t0 = time.perf_counter()
+    collected: List[Dict[str, Any]] = []
+    for job in jobs:
+        stats.requests_by_host[job.host] += job.cost
+        try:
+            collected.extend(job.fetch())
+        except Exception as e:
+            stats.errors += 1
+            print(f"[{job.host}] error {job.name}: {e}")
+            continue
+        time.sleep(sleep_s)
+    stats.items = len(collected)
+    if ingest is not None:
+        for it in collected:
+            try:
+                if ingest(it):
+                    stats.ingested += 1
+            except Exception as e:
+                print(f"[ingest] error: {e}")
+    stats.wall_s = time.perf_counter() - t0
+    return stats
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# тело в кассете уже раскодировано — эти заголовки при replay только врали бы
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+# локальный API не пишем и не подменяем: он часть того, что меряем
+DEFAULT_PASSTHROUGH = "http://127.0.0.1,http://localhost"
+
+
+class CassetteMiss(requests.RequestException):
+    """Запроса нет в кассете. Не ConnectionError — http_client не должен его повторять."""
+
+
+class _Injected503(Exception):
+    pass
+
+
+def request_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    """METHOD url-с-отсортированным-query [#sha1(body)] — порядок параметров не важен."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    key = f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))}"
+    if body:
+        key += "#" + hashlib.sha1(body).hexdigest()[:16]
+    return key
+
+
+class Cassette:
+    """
+    Записанные ответы: gzip JSONL, по строке на ответ. Повторы одного запроса
+    отдаются по порядку записи, после последнего — последний (страницы с курсором
+    и опросы «ничего нового» воспроизводятся как было).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Counter = Counter()
+        if path and os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        e = json.loads(line)
+                        self.entries.setdefault(e["key"], []).append(e)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self.entries.values())
+
+    def add(self, key: str, resp: requests.Response) -> None:
+        entry = {
+            "key": key,
+            "url": resp.url,
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS},
+            "body": base64.b64encode(resp.content or b"").decode("ascii"),
+            "elapsed_ms": int(resp.elapsed.total_seconds() * 1000),
+        }
+        with self._lock:
+            self.entries.setdefault(key, []).append(entry)
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            seq = self.entries.get(key)
+            if not seq:
+                return None
+            i = self._cursor[key]
+            self._cursor[key] += 1
+            return seq[min(i, len(seq) - 1)]
+
+    def rewind(self) -> None:
+        with self._lock:
+            self._cursor.clear()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            lines = [json.dumps(e, ensure_ascii=False) for seq in self.entries.values() for e in seq]
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write("\n".join(lines) + ("\n" if lines else ""))
+        os.replace(tmp, self.path)
+
+
+class RecordingAdapter(BaseAdapter):
+    """Ходит в сеть через inner (обычный HTTPAdapter) и дописывает каждый ответ в кассету."""
+
+    def __init__(self, cassette: Cassette, inner: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner or HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=0)
+
+    @property
+    def poolmanager(self) -> Any:
+        # для http_client.stats(): соединения считаются по пулу настоящего адаптера
+        return getattr(self.inner, "poolmanager", None)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        resp = self.inner.send(request, **kwargs)
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        self.cassette.add(request_key(request.method or "GET", request.url or "", body), resp)
+        return resp
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Отдаёт ответы из кассеты без сети. latency_s + uniform(0, jitter_s) — задержка на запрос
+    (больше timeout — ReadTimeout); error_rate — доля запросов, на которых вместо ответа
+    503 (error_kind="status") или обрыв соединения ("reset"): так проверяются retry/backoff.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency_s: float = 0.0,
+        jitter_s: float = 0.0,
+        error_rate: float = 0.0,
+        error_kind: str = "status",
+        seed: Optional[int] = None,
+    ):
+        super().__init__()
+        if error_kind not in {"status", "reset"}:
+            raise ValueError("error_kind must be 'status' or 'reset'")
+        self.cassette = cassette
+        self.latency_s = max(0.0, latency_s)
+        self.jitter_s = max(0.0, jitter_s)
+        self.error_rate = min(1.0, max(0.0, error_rate))
+        self.error_kind = error_kind
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+
+    def _delay(self, timeout: Any) -> None:
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        with self._lock:
+            delay = self.latency_s + self._rnd.uniform(0, self.jitter_s)
+            fail = self._rnd.random() < self.error_rate
+            timed_out = read_timeout is not None and delay > float(read_timeout)
+            if timed_out:
+                self.counts["timeouts"] += 1
+            else:
+                self.counts["slept_ms"] += int(delay * 1000)
+                if fail:
+                    self.counts["injected_errors"] += 1
+        if timed_out:
+            time.sleep(float(read_timeout))
+            raise requests.ReadTimeout(f"replay latency {delay:.2f}s > timeout {read_timeout}")
+        if delay:
+            time.sleep(delay)
+        if fail:
+            if self.error_kind == "reset":
+                raise requests.ConnectionError("injected connection reset")
+            raise _Injected503()
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout: Any = None, **kwargs: Any) -> requests.Response:
+        try:
+            self._delay(timeout)
+        except _Injected503:
+            return _response(request, {"status": 503, "reason": "Service Unavailable (injected)", "headers": {}, "body": ""})
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        key = request_key(request.method or "GET", request.url or "", body)
+        entry = self.cassette.next(key)
+        if entry is None:
+            with self._lock:
+                self.counts["misses"] += 1
+            raise CassetteMiss(f"not in cassette: {key}")
+        with self._lock:
+            self.counts["served"] += 1
+        return _response(request, entry)
+
+    def close(self) -> None:
+        pass
+
+
+def _response(request: requests.PreparedRequest, entry: Dict[str, Any]) -> requests.Response:
+    r = requests.Response()
+    r.status_code = int(entry["status"])
+    r.reason = entry.get("reason") or ""
+    r.headers = CaseInsensitiveDict(entry.get("headers") or {})
+    r._content = base64.b64decode(entry.get("body") or "")
+    r.url = request.url or entry.get("url") or ""
+    r.request = request
+    r.encoding = get_encoding_from_headers(r.headers)
+    r.elapsed = timedelta(milliseconds=int(entry.get("elapsed_ms") or 0))
+    return r
+
+
+def adapters(
+    cassette: Cassette,
+    mode: str,
+    passthrough: Optional[List[str]] = None,
+    **replay: Any,
+) -> List[Tuple[str, BaseAdapter]]:
+    """(prefix, adapter) для http_client.mount: всё внешнее — через кассету, passthrough — как обычно."""
+    if mode == "record":
+        main: BaseAdapter = RecordingAdapter(cassette)
+    elif mode == "replay":
+        main = ReplayAdapter(cassette, **replay)
+    else:
+        raise ValueError("cassette mode must be 'record' or 'replay'")
+    out: List[Tuple[str, BaseAdapter]] = [("https://", main), ("http://", main)]
+    for prefix in passthrough or []:
+        out.append((prefix, HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=0)))
+    return out
+
+
+def from_env() -> Optional[List[Tuple[str, BaseAdapter]]]:
+    """
+    HUNTER_HTTP_CASSETTE=<file.jsonl.gz> включает кассету для всех коллекторов:
+      HUNTER_HTTP_CASSETTE_MODE  record | replay (по умолчанию replay)
+      HUNTER_REPLAY_LATENCY_MS, HUNTER_REPLAY_JITTER_MS, HUNTER_REPLAY_ERROR_RATE,
+      HUNTER_REPLAY_ERROR_KIND (status | reset), HUNTER_REPLAY_SEED
+      HUNTER_CASSETTE_PASSTHROUGH — префиксы мимо кассеты (по умолчанию локальный API)
+    В режиме record кассета дописывается на выходе из процесса.
+    """
+    path = os.getenv("HUNTER_HTTP_CASSETTE", "")
+    if not path:
+        return None
+    mode = os.getenv("HUNTER_HTTP_CASSETTE_MODE", "replay")
+    cassette = Cassette(path)
+    if mode == "record":
+        atexit.register(cassette.save)
+    seed = os.getenv("HUNTER_REPLAY_SEED", "")
+    passthrough = [p.strip() for p in os.getenv("HUNTER_CASSETTE_PASSTHROUGH", DEFAULT_PASSTHROUGH).split(",") if p.strip()]
+    replay: Dict[str, Any] = {}
+    if mode == "replay":
+        replay = {
+            "latency_s": float(os.getenv("HUNTER_REPLAY_LATENCY_MS", "0")) / 1000.0,
+            "jitter_s": float(os.getenv("HUNTER_REPLAY_JITTER_MS", "0")) / 1000.0,
+            "error_rate": float(os.getenv("HUNTER_REPLAY_ERROR_RATE", "0")),
+            "error_kind": os.getenv("HUNTER_REPLAY_ERROR_KIND", "status"),
+            "seed": int(seed) if seed else None,
+        }
+    return adapters(cassette, mode, passthrough, **replay)
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from collectors.hn_algolia import HNItem, fetch_hn_page
+from collectors.reddit_public import CollectedItem, fetch_posts
+from collectors.stackexchange import SEQuestion, fetch_questions_with_body
+
+DEFAULT_PATH = "var/checkpoints.json"
+# reddit отдаёт пустой список на before=<удалённый пост>; курсор старше этого перепроверяем без before
+REDDIT_STALE_CURSOR_S = 3 * 86400
+# сколько question_id -> last_activity_date помнить на site:tag
+SE_KNOWN_MAX = 5000
+
+
+class CheckpointStore:
+    """
+    Курсоры инкрементального сбора по (source, key): key — сабреддит / HN-запрос / SE site:tag.
+    Хранятся в JSON (path=None — только в памяти); save() пишет атомарно через tmp + replace.
+    Курсор двигается после fetch, а не после ingest: упавший ingest не перезапрашивается,
+    но сервер всё равно дедупит повторы, если курсор сбросить.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._run: Dict[str, Dict[str, int]] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+
+    def get(self, source: str, key: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._data.get(source, {}).get(key) or {})
+
+    def update(self, source: str, key: str, **fields: Any) -> None:
+        with self._lock:
+            cur = self._data.setdefault(source, {}).setdefault(key, {})
+            cur.update(fields)
+            cur["updated_at"] = int(time.time())
+
+    def note(self, source: str, key: str, fetched: int, skipped: int = 0, requests_saved: int = 0) -> None:
+        """Счётчики текущего запуска: сколько пришло и сколько не пришлось качать повторно."""
+        with self._lock:
+            r = self._run.setdefault(f"{source}:{key}", {"fetched": 0, "skipped": 0, "requests_saved": 0})
+            r["fetched"] += fetched
+            r["skipped"] += skipped
+            r["requests_saved"] += requests_saved
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            run = {k: dict(v) for k, v in self._run.items()}
+        by_source: Dict[str, Dict[str, int]] = {}
+        for k, v in run.items():
+            agg = by_source.setdefault(k.split(":", 1)[0], {"keys": 0, "fetched": 0, "skipped": 0, "requests_saved": 0})
+            agg["keys"] += 1
+            for name, n in v.items():
+                agg[name] += n
+        return {"by_source": by_source, "by_key": run}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._data))
+
+    def restore(self, snap: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data = json.loads(json.dumps(snap))
+
+    def reset(self, source: Optional[str] = None) -> None:
+        with self._lock:
+            if source is None:
+                self._data.clear()
+            else:
+                self._data.pop(source, None)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            payload = json.dumps(self._data, ensure_ascii=False, indent=1, sort_keys=True)
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, self.path)
+
+
+CHECKPOINTS = CheckpointStore(os.getenv("HUNTER_CHECKPOINTS", DEFAULT_PATH) or None)
+
+
+def report_line(store: Optional[CheckpointStore] = None) -> str:
+    by_source = (store or CHECKPOINTS).report()["by_source"]
+    if not by_source:
+        return "no checkpointed fetches"
+    return "; ".join(
+        f"{src}: keys={v['keys']} fetched={v['fetched']} skipped={v['skipped']} requests_saved={v['requests_saved']}"
+        for src, v in sorted(by_source.items())
+    )
+
+
+def reddit_new_since(sr: str, limit: int = 80, store: Optional[CheckpointStore] = None) -> List[CollectedItem]:
+    """/new сабреддита только новее прошлого запуска (before=<fullname самого свежего поста>)."""
+    store = store or CHECKPOINTS
+    cur = store.get("reddit", sr)
+    posts = fetch_posts(subreddit=sr, limit=limit, sort="new", sleep_s=0.0, before=cur.get("before"))
+    if not posts and cur.get("before") and time.time() - int(cur.get("created_utc") or 0) > REDDIT_STALE_CURSOR_S:
+        cur = {}
+        posts = fetch_posts(subreddit=sr, limit=limit, sort="new", sleep_s=0.0)
+    newest = max((p for p in posts if p.fullname), key=lambda p: p.created_utc, default=None)
+    if newest is not None:
+        store.update("reddit", sr, before=newest.fullname, created_utc=newest.created_utc)
+    # без курсора пришли бы последние limit постов — всё, что не пришло, уже видели
+    skipped = max(0, limit - len(posts)) if cur.get("before") else 0
+    store.note("reddit", sr, fetched=len(posts), skipped=skipped)
+    return posts
+
+
+def hn_pages_since(
+    query: str,
+    pages: int = 2,
+    hits_per_page: int = 50,
+    store: Optional[CheckpointStore] = None,
+) -> List[HNItem]:
+    """
+    Страницы search_by_date новее курсора (окно hn_window); пустой хвост не качаем.
+    Если pages страниц не хватило до курсора, следующий запуск сначала дочитывает
+    пропущенное (backfill), см. hn_advance.
+    """
+    store = store or CHECKPOINTS
+    win = hn_window(store.get("hn", query))
+    out: List[HNItem] = []
+    fetched_pages = 0
+    tail = False
+    for page in range(pages):
+        got = fetch_hn_page(query, page=page, hits_per_page=hits_per_page, since=win["since"], until=win["until"])
+        fetched_pages += 1
+        out.extend(got)
+        if len(got) < hits_per_page:
+            tail = True
+            break
+    # сводка — по всему скачанному, включая уже виденное на границах: иначе окно из одних
+    # граничных историй не давало бы продвижения
+    fields = hn_advance(win, hn_summary(out, tail))
+    out = hn_drop_seen(out, win)
+    if fields:
+        store.update("hn", query, **fields)
+    skipped = max(0, pages * hits_per_page - len(out)) if win["since"] else 0
+    store.note("hn", query, fetched=len(out), skipped=skipped, requests_saved=pages - fetched_pages)
+    return out
+
+
+# --- курсор HN ------------------------------------------------------------------
+# created_at_i/boundary_ids — всё не новее этой секунды уже прочитано (ids — истории самой секунды);
+# backfill {until, until_ids, newest, newest_ids} — прошлый запуск не дошёл до курсора:
+# прочитано всё новее until, а [created_at_i, until] ещё нет.
+
+def hn_window(cur: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Окно следующего запуска: since..until, уже виденные objectID на обеих границах
+    и самая свежая история, прочитанная до начала дозагрузки (newest).
+    """
+    bf = cur.get("backfill") or {}
+    return {
+        "since": int(cur.get("created_at_i") or 0) or None,
+        "since_ids": list(cur.get("boundary_ids") or []),
+        "until": int(bf.get("until") or 0) or None,
+        "until_ids": list(bf.get("until_ids") or []),
+        "newest": int(bf.get("newest") or 0) or None,
+        "newest_ids": list(bf.get("newest_ids") or []),
+    }
+
+
+def hn_drop_seen(items: List[HNItem], win: Dict[str, Any]) -> List[HNItem]:
+    """Фильтр >= / <= включает границы — убираем истории граничных секунд, которые уже приходили."""
+    since_ids, until_ids = set(win["since_ids"]), set(win["until_ids"])
+    return [
+        x for x in items
+        if not (x.created_at_i == win["since"] and x.object_id in since_ids)
+        and not (x.created_at_i == win["until"] and x.object_id in until_ids)
+    ]
+
+
+def _edge(items: List[HNItem], ts: int) -> List[str]:
+    return sorted(x.object_id for x in items if x.created_at_i == ts)
+
+
+def hn_summary(items: List[HNItem], tail: bool) -> Dict[str, Any]:
+    """Что дал запуск (или одна страница): дошли ли до хвоста окна, самая свежая и самая старая секунды."""
+    out: Dict[str, Any] = {"tail": tail}
+    if items:
+        newest = max(x.created_at_i for x in items)
+        oldest = min(x.created_at_i for x in items)
+        out.update(newest=newest, newest_ids=_edge(items, newest), oldest=oldest, oldest_ids=_edge(items, oldest))
+    return out
+
+
+def hn_merge_summary(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Сводка двух страниц одного окна (страницы очереди приходят в любом порядке)."""
+    out: Dict[str, Any] = {"tail": bool(a.get("tail") or b.get("tail"))}
+    for key, pick in (("newest", max), ("oldest", min)):
+        parts = [x for x in (a, b) if x.get(key)]
+        if parts:
+            ts = pick(x[key] for x in parts)
+            out[key] = ts
+            out[f"{key}_ids"] = sorted({i for x in parts if x[key] == ts for i in x[f"{key}_ids"]})
+    return out
+
+
+def hn_advance(win: Dict[str, Any], summary: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Новые поля курсора после прочтения окна win. Дошли до хвоста окна (или курсора
+    ещё не было) — курсор встаёт на самую свежую прочитанную историю. Не дошли —
+    ниже самой старой прочитанной остались новые истории: запоминаем backfill,
+    курсор не двигаем, следующий запуск дочитывает [since, oldest].
+    """
+    top = hn_merge_summary({"newest": win["newest"], "newest_ids": win["newest_ids"]}, summary)
+    top_ts, top_ids = top.get("newest"), list(top.get("newest_ids") or [])
+    if top_ts and top_ts == win["since"]:
+        top_ids = sorted(set(top_ids) | set(win["since_ids"]))
+
+    if summary.get("tail") or not win["since"]:
+        if not top_ts:
+            return {"backfill": None} if win["until"] else {}
+        return {"created_at_i": top_ts, "boundary_ids": top_ids, "backfill": None}
+    if not summary.get("oldest"):
+        return {}
+    low_ts, low_ids = summary["oldest"], list(summary["oldest_ids"])
+    if low_ts == win["until"]:
+        low_ids = sorted(set(low_ids) | set(win["until_ids"]))
+    return {"backfill": {"until": low_ts, "until_ids": low_ids, "newest": top_ts, "newest_ids": top_ids}}
+
+
+def se_questions_since(
+    site: str,
+    tagged: str,
+    pages: int = 2,
+    pagesize: int = 50,
+    store: Optional[CheckpointStore] = None,
+    **kwargs: Any,
+) -> List[SEQuestion]:
+    """
+    fetch_questions_with_body с min=<последняя виденная активность> (sort=activity)
+    и known_activity: тела вопросов без новой активности не перекачиваются.
+    """
+    store = store or CHECKPOINTS
+    key = f"{site}:{tagged}"
+    cur = store.get("stackexchange", key)
+    since = int(cur.get("last_activity_at") or 0) or None
+    # JSON хранит ключи строками
+    known = {int(k): int(v) for k, v in (cur.get("activity") or {}).items()}
+    counts: Counter = Counter()
+    qs = fetch_questions_with_body(
+        site=site,
+        tagged=tagged,
+        pages=pages,
+        pagesize=pagesize,
+        min_activity=since,
+        known_activity=known,
+        stats=counts,
+        **kwargs,
+    )
+    newest = max([since or 0] + [q.last_activity_at for q in qs])
+    # храним только самые свежие SE_KNOWN_MAX вопросов: старые всё равно отсекает min=
+    recent = sorted(known.items(), key=lambda kv: kv[1], reverse=True)[:SE_KNOWN_MAX]
+    store.update("stackexchange", key, last_activity_at=newest, activity={str(k): v for k, v in recent})
+    skipped = max(0, pages * pagesize - counts["listed"]) if since else 0
+    store.note("stackexchange", key, fetched=len(qs), skipped=skipped + counts["unchanged"])
+    return qs
@@ -3,7 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Optional
 import time
-import requests
+
+from collectors import http_client
 
 
 @dataclass
@@ -16,61 +17,83 @@ class HNItem:
     num_comments: int
     created_at_i: int
     source: str = "hn"
+    object_id: str = ""
 
 
 ALGOLIA = "https://hn.algolia.com/api/v1/search_by_date"
 
 
-def search_hn(
+def fetch_hn_page(
     query: str,
-    pages: int = 2,
+    page: int = 0,
     hits_per_page: int = 50,
-    sleep_s: float = 0.5,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
 ) -> List[HNItem]:
+    """
+    Одна страница search_by_date — единица работы для async-раннера.
+    since/until — unix ts: только истории с since <= created_at_i <= until (обе границы
+    включительно, чтобы не терять истории той же секунды; уже виденные на границах
+    отсекает вызывающий по objectID, см. collectors.checkpoints).
+    """
+    params = {
+        "query": query,
+        "tags": "story",
+        "page": page,
+        "hitsPerPage": hits_per_page,
+    }
+    filters = []
+    if since:
+        filters.append(f"created_at_i>={int(since)}")
+    if until:
+        filters.append(f"created_at_i<={int(until)}")
+    if filters:
+        params["numericFilters"] = ",".join(filters)
+    r = http_client.get(ALGOLIA, params=params, timeout=25)
+    r.raise_for_status()
+    data = r.json()
+    hits = data.get("hits") or []
     out: List[HNItem] = []
-    for page in range(pages):
-        params = {
-            "query": query,
-            "tags": "story",
-            "page": page,
-            "hitsPerPage": hits_per_page,
-        }
-        r = requests.get(
-            ALGOLIA,
-            params=params,
-            timeout=25,
-            headers={"User-Agent": "hunter-agent/0.1"},
-        )
-        r.raise_for_status()
-        data = r.json()
-        hits = data.get("hits") or []
-        for h in hits:
-            title = (h.get("title") or "").strip()
-            story_text = (h.get("story_text") or "").strip()
-            url = h.get("url") or h.get("story_url")
-            created_at_i = int(h.get("created_at_i") or 0)
-            points = int(h.get("points") or 0)
-            num_comments = int(h.get("num_comments") or 0)
+    for h in hits:
+        title = (h.get("title") or "").strip()
+        story_text = (h.get("story_text") or "").strip()
+        url = h.get("url") or h.get("story_url")
+        created_at_i = int(h.get("created_at_i") or 0)
+        points = int(h.get("points") or 0)
+        num_comments = int(h.get("num_comments") or 0)
 
-            # HN часто без body — сделаем “псевдо-текст” чтобы extractor работал
-            combined = title
-            if story_text:
-                combined = f"{title}\n\n{story_text}"
+        # HN часто без body — сделаем “псевдо-текст” чтобы extractor работал
+        combined = title
+        if story_text:
+            combined = f"{title}\n\n{story_text}"
 
-            if not combined.strip():
-                continue
+        if not combined.strip():
+            continue
 
-            tags = ["hn", "story", "query:" + query]
-            out.append(
-                HNItem(
-                    title=title,
-                    text=combined,
-                    url=url,
-                    tags=tags,
-                    points=points,
-                    num_comments=num_comments,
-                    created_at_i=created_at_i,
-                )
+        tags = ["hn", "story", "query:" + query]
+        out.append(
+            HNItem(
+                title=title,
+                text=combined,
+                url=url,
+                tags=tags,
+                points=points,
+                num_comments=num_comments,
+                created_at_i=created_at_i,
+                object_id=str(h.get("objectID") or ""),
             )
+        )
+    return out
+
+
+def search_hn(
+    query: str,
+    pages: int = 2,
+    hits_per_page: int = 50,
+    sleep_s: float = 0.5,
+) -> List[HNItem]:
+    out: List[HNItem] = []
+    for page in range(pages):
+        out.extend(fetch_hn_page(query, page=page, hits_per_page=hits_per_page))
         time.sleep(sleep_s)
     return out
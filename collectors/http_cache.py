@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+DEFAULT_PATH = "var/http_cache.sqlite"
+DEFAULT_TTL_S = 300.0
+# записи старше MAX_AGE_TTLS * ttl удаляются (перепроверять их уже нечего), файл не больше DEFAULT_MAX_BYTES
+MAX_AGE_TTLS = 48
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+PRUNE_EVERY = 200  # store() между чистками
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    raw_size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)"
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+def cache_key(method: str, url: str, params: Any = None) -> str:
+    """sha1 от метода, url и отсортированных params — порядок параметров не важен."""
+    if isinstance(params, dict):
+        items = sorted((str(k), str(v)) for k, v in params.items() if v is not None)
+    else:
+        items = sorted((str(k), str(v)) for k, v in (params or []))
+    raw = json.dumps([method.upper(), url, items], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """
+    Локальный кэш GET-ответов в SQLite, тела сжаты zlib.
+    Свежие (моложе ttl_s) записи отдаются без сети, устаревшие — перепроверяются
+    условным запросом (If-None-Match / If-Modified-Since); 304 обновляет fetched_at.
+    prune() выбрасывает записи старше max_age_s и самые старые сверх max_bytes
+    (сжатых тел); вызывается при открытии и раз в PRUNE_EVERY store().
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_age_s: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_age_s = ttl_s * MAX_AGE_TTLS if max_age_s is None else max_age_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        # соединение делят потоки async-раннера — сериализуем через lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_INDEX)
+        self._conn.commit()
+        self._stats: Counter = Counter()
+        self._since_prune = 0
+        self.prune()
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body, etag, last_modified, fetched_at = row
+        return CachedResponse(url, status, json.loads(headers), zlib.decompress(body), etag, last_modified, fetched_at)
+
+    def is_fresh(self, entry: CachedResponse, ttl_s: Optional[float] = None) -> bool:
+        return time.time() - entry.fetched_at < (self.ttl_s if ttl_s is None else ttl_s)
+
+    def store(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        packed = zlib.compress(body, 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    status,
+                    json.dumps(headers, ensure_ascii=False),
+                    packed,
+                    len(body),
+                    headers.get("ETag") or headers.get("etag"),
+                    headers.get("Last-Modified") or headers.get("last-modified"),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+            self._since_prune += 1
+            due = self._since_prune >= PRUNE_EVERY
+        self.count("stored_bytes_raw", len(body))
+        self.count("stored_bytes_packed", len(packed))
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Удаляет записи старше max_age_s, затем самые старые, пока тела не влезут в max_bytes."""
+        with self._lock:
+            self._since_prune = 0
+            n = 0
+            if self.max_age_s > 0:
+                n += self._conn.execute(
+                    "DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.max_age_s,)
+                ).rowcount
+            if self.max_bytes > 0:
+                (total,) = self._conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()
+                if total > self.max_bytes:
+                    drop, cutoff = total - self.max_bytes, None
+                    for size, fetched_at in self._conn.execute(
+                        "SELECT LENGTH(body), fetched_at FROM responses ORDER BY fetched_at"
+                    ):
+                        drop -= size
+                        cutoff = fetched_at
+                        if drop <= 0:
+                            break
+                    if cutoff is not None:
+                        n += self._conn.execute("DELETE FROM responses WHERE fetched_at <= ?", (cutoff,)).rowcount
+            self._conn.commit()
+            self._stats["evicted"] += n
+        return n
+
+    def touch(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            entries, raw, packed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+            ).fetchone()
+        lookups = s.get("hits", 0) + s.get("revalidated", 0) + s.get("misses", 0)
+        return {
+            "hits": s.get("hits", 0),
+            "revalidated": s.get("revalidated", 0),
+            "misses": s.get("misses", 0),
+            "hit_ratio": round((s.get("hits", 0) + s.get("revalidated", 0)) / lookups, 3) if lookups else 0.0,
+            "bytes_saved": s.get("bytes_saved", 0),
+            "entries": entries,
+            "evicted": s.get("evicted", 0),
+            "bypassed": s.get("bypassed", 0),
+            "compression": round(packed / raw, 3) if raw else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._stats.clear()
+
+
+def open_default() -> Optional[HttpCache]:
+    """
+    Кэш по env: HUNTER_HTTP_CACHE — путь ("" — выключен), HUNTER_HTTP_CACHE_TTL — секунды,
+    HUNTER_HTTP_CACHE_MAX_AGE — секунды до удаления записи, HUNTER_HTTP_CACHE_MAX_MB — предел сжатых тел.
+    """
+    path = os.getenv("HUNTER_HTTP_CACHE", DEFAULT_PATH)
+    if not path:
+        return None
+    max_age = os.getenv("HUNTER_HTTP_CACHE_MAX_AGE")
+    return HttpCache(
+        path,
+        ttl_s=float(os.getenv("HUNTER_HTTP_CACHE_TTL", str(DEFAULT_TTL_S))),
+        max_age_s=float(max_age) if max_age else None,
+        max_bytes=int(float(os.getenv("HUNTER_HTTP_CACHE_MAX_MB", str(DEFAULT_MAX_BYTES // (1024 * 1024)))) * 1024 * 1024),
+    )
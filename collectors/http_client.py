@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from collectors.http_cache import CachedResponse, HttpCache, cache_key, open_default
+
+USER_AGENT = "hunter-agent/0.1"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 3
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 30.0
+# Retry-After больше этого — не ждём, отдаём ответ вызывающему (он решит сам)
+MAX_RETRY_AFTER_S = 120.0
+POOL_SIZE = 10  # соединений на хост: async-раннер ходит в один хост из нескольких потоков
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_stats: Counter = Counter()
+_by_host: Dict[str, Counter] = {}
+# HTTP-кэш GET-ответов открывается лениво при первом GET (app, импортирующий market_scan, файл не создаёт)
+_cache: Optional[HttpCache] = None
+_cache_opened = False
+# транспорт вместо сети (кассеты record/replay, приложение in-process): (prefix, adapter),
+# более длинный prefix побеждает; HUNTER_HTTP_CASSETTE подключает кассету при первом запросе
+_mounts: List[Tuple[str, BaseAdapter]] = []
+_transport_opened = False
+# не храним в кэше: тело уже раскодировано requests-ом
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+# курсорные запросы (reddit before=, SE min=, HN numericFilters=created_at_i...) уникальны на каждый
+# прогон: в кэше они только копятся, а свежая запись вернула бы устаревшее окно
+_CURSOR_PARAMS = frozenset({"before", "after", "min", "fromdate"})
+
+
+def _new_session() -> requests.Session:
+    s = requests.Session()
+    # свои retry ниже (с Retry-After и jitter) — у адаптера отключены
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    for prefix, mounted in _mounts:
+        s.mount(prefix, mounted)
+    s.headers["User-Agent"] = USER_AGENT
+    return s
+
+
+def _open_transport() -> None:
+    global _cache, _cache_opened, _transport_opened
+    with _lock:
+        if _transport_opened:
+            return
+        _transport_opened = True
+    from collectors.cassette import from_env  # cassette сам импортирует requests-адаптеры, не http_client
+
+    mounts = from_env()
+    if mounts:
+        # с кассетой HTTP-кэш мешает: record пропустит закэшированное, replay померит кэш, а не пайплайн
+        set_cache(None)
+        for prefix, adapter in mounts:
+            mount(prefix, adapter)
+
+
+def mount(prefix: str, adapter: BaseAdapter) -> None:
+    """Подменить транспорт для URL с этим префиксом — и в новых, и в уже открытых сессиях."""
+    global _transport_opened
+    with _lock:
+        # явный mount важнее переменных окружения
+        _transport_opened = True
+        _mounts[:] = [(p, a) for p, a in _mounts if p != prefix] + [(prefix, adapter)]
+        for s in _sessions.values():
+            s.mount(prefix, adapter)
+
+
+def session_for(url: str) -> requests.Session:
+    """Keep-alive Session на хост (scheme://netloc): TCP/TLS переиспользуются между вызовами."""
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _lock:
+        s = _sessions.get(key)
+        if s is None:
+            s = _sessions[key] = _new_session()
+        return s
+
+
+def _count(host: str, name: str, n: int = 1) -> None:
+    with _lock:
+        _stats[name] += n
+        _by_host.setdefault(host, Counter())[name] += n
+
+
+def retry_after_s(resp: requests.Response) -> Optional[float]:
+    """Retry-After в секундах (delta-seconds или HTTP-date); None, если заголовка нет/он битый."""
+    val = (resp.headers.get("Retry-After") or "").strip()
+    if not val:
+        return None
+    if val.isdigit():
+        return float(val)
+    try:
+        return max(0.0, parsedate_to_datetime(val).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_s(attempt: int) -> float:
+    # full jitter: равномерно в [0, min(max, base * 2^attempt)]
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+
+def request(method: str, url: str, retries: int = MAX_RETRIES, **kwargs: Any) -> requests.Response:
+    """
+    requests.request через пул хоста + до retries повторов на 429/5xx и сетевых ошибках.
+    Последний ответ (даже 429/5xx) возвращается как есть — raise_for_status на вызывающем.
+    """
+    _open_transport()
+    host = urlsplit(url).netloc
+    s = session_for(url)
+    kwargs.setdefault("timeout", 25)
+    attempt = 0
+    while True:
+        _count(host, "requests")
+        try:
+            resp = s.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                _count(host, "failures")
+                raise
+            _count(host, "retries")
+            time.sleep(backoff_s(attempt))
+            attempt += 1
+            continue
+
+        if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+            return resp
+
+        wait = retry_after_s(resp)
+        if wait is not None and wait > MAX_RETRY_AFTER_S:
+            _count(host, "retry_after_too_long")
+            return resp
+        _count(host, "retries")
+        if wait is not None:
+            _count(host, "retry_after_honored")
+        resp.close()
+        time.sleep(wait if wait is not None else backoff_s(attempt))
+        attempt += 1
+
+
+def http_cache() -> Optional[HttpCache]:
+    global _cache, _cache_opened
+    _open_transport()
+    with _lock:
+        if not _cache_opened:
+            _cache = open_default()
+            _cache_opened = True
+        return _cache
+
+
+def set_cache(cache: Optional[HttpCache]) -> None:
+    """Подменить кэш (None — выключить)."""
+    global _cache, _cache_opened
+    with _lock:
+        _cache = cache
+        _cache_opened = True
+
+
+def _from_cache(entry: CachedResponse) -> requests.Response:
+    r = requests.Response()
+    r.status_code = entry.status
+    r.headers = CaseInsensitiveDict(entry.headers)
+    r._content = entry.body
+    r.url = entry.url
+    r.reason = "OK"
+    r.encoding = get_encoding_from_headers(r.headers)
+    r.from_cache = True  # type: ignore[attr-defined]
+    return r
+
+
+def from_cache(resp: requests.Response) -> bool:
+    """Ответ отдан из HTTP-кэша (свежая запись или 304), а не получен по сети."""
+    return bool(getattr(resp, "from_cache", False))
+
+
+def _cursor_request(url: str, params: Any) -> bool:
+    if isinstance(params, dict):
+        items = [(str(k), str(v)) for k, v in params.items() if v is not None]
+    else:
+        items = [(str(k), str(v)) for k, v in (params or [])]
+    items += [tuple(p.split("=", 1)) if "=" in p else (p, "") for p in urlsplit(url).query.split("&") if p]
+    return any(k in _CURSOR_PARAMS or (k == "numericFilters" and "created_at_i" in v) for k, v in items)
+
+
+def get(url: str, cache: bool = True, ttl_s: Optional[float] = None, **kwargs: Any) -> requests.Response:
+    """
+    GET через пул + HTTP-кэш: свежая запись отдаётся без сети, устаревшая
+    перепроверяется условным запросом (ETag / Last-Modified), 304 -> тело из кэша.
+    Курсорные запросы (_CURSOR_PARAMS) идут мимо кэша.
+    """
+    c = http_cache() if cache else None
+    if c is not None and _cursor_request(url, kwargs.get("params")):
+        c.count("bypassed")
+        c = None
+    if c is None:
+        return request("GET", url, **kwargs)
+
+    key = cache_key("GET", url, kwargs.get("params"))
+    entry = c.lookup(key)
+    if entry is not None and c.is_fresh(entry, ttl_s):
+        c.count("hits")
+        c.count("bytes_saved", len(entry.body))
+        return _from_cache(entry)
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    resp = request("GET", url, headers=headers, **kwargs)
+
+    if entry is not None and resp.status_code == 304:
+        c.touch(key)
+        c.count("revalidated")
+        c.count("bytes_saved", len(entry.body))
+        return _from_cache(entry)
+
+    c.count("misses")
+    if resp.status_code == 200 and "no-store" not in (resp.headers.get("Cache-Control") or "").lower():
+        keep = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        c.store(key, resp.url, resp.status_code, keep, resp.content)
+    return resp
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def _pool_counters(s: requests.Session) -> Dict[str, int]:
+    opened = served = 0
+    seen = set()
+    for adapter in s.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pm = getattr(adapter, "poolmanager", None)
+        if pm is None:
+            # replay / in-process адаптеры соединений не открывают
+            continue
+        pools = pm.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            served += pool.num_requests
+    return {"connections_opened": opened, "requests_sent": served}
+
+
+def stats() -> Dict[str, Any]:
+    """Счётчики запросов/повторов и переиспользование соединений (requests_sent - connections_opened)."""
+    with _lock:
+        sessions = dict(_sessions)
+        total = dict(_stats)
+        by_host = {h: dict(c) for h, c in _by_host.items()}
+        transport: Dict[str, Dict[str, int]] = {}
+        seen_adapters = set()
+        for p, a in _mounts:
+            # один адаптер обычно висит и на https://, и на http:// — считаем его один раз
+            if id(a) not in seen_adapters and isinstance(getattr(a, "counts", None), Counter):
+                seen_adapters.add(id(a))
+                transport[p] = dict(a.counts)
+    pools: Dict[str, Dict[str, int]] = {}
+    for key, s in sessions.items():
+        c = _pool_counters(s)
+        c["connections_reused"] = max(0, c["requests_sent"] - c["connections_opened"])
+        pools[key] = c
+    return {
+        **total,
+        "connections_opened": sum(p["connections_opened"] for p in pools.values()),
+        "connections_reused": sum(p["connections_reused"] for p in pools.values()),
+        "cache": _cache.stats() if _cache is not None else None,
+        "by_host": by_host,
+        "pools": pools,
+        "transport": transport,
+    }
+
+
+def report_line() -> str:
+    """Одна строка для конца запуска скрипта: сеть + кэш."""
+    s = stats()
+    line = (
+        f"requests={s.get('requests', 0)} retries={s.get('retries', 0)} "
+        f"connections opened={s['connections_opened']} reused={s['connections_reused']}"
+    )
+    c = s["cache"]
+    if c:
+        line += (
+            f" | cache hits={c['hits']} revalidated={c['revalidated']} misses={c['misses']}"
+            f" hit_ratio={c['hit_ratio']} bytes_saved={c['bytes_saved']} compression={c['compression']}"
+        )
+    return line
+
+
+def close() -> None:
+    with _lock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
+        _stats.clear()
+        _by_host.clear()
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+from collectors import http_client
+from collectors.seen_filter import SeenFilter, item_keys
+from core.signal_filter import is_signal_soft, is_signal_strict
+from core.text_clean import clean_html, clean_text
+
+API_BASE = os.getenv("HUNTER_API_BASE", "http://127.0.0.1:8000")
+
+
+@dataclass
+class NormalizedItem:
+    """Элемент любого коллектора в форме /ingest (+ title и флаг HTML для стадии clean)."""
+    text: str
+    source: str
+    title: str = ""
+    query: Optional[str] = None
+    url: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+    view_count: int = 0
+    answer_count: int = 0
+    is_answered: bool = False
+    vote_score: int = 0
+    last_activity_at: int = 0
+    signature: Optional[str] = None
+    is_html: bool = False
+    source_id: Optional[str] = None  # id в источнике: reddit fullname, HN objectID
+    revision: Optional[str] = None  # версия изменяемого элемента (SE: last_activity_at), см. item_keys
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "text": self.text,
+            "source": self.source,
+            "query": self.query,
+            "url": self.url,
+            "tags": list(self.tags),
+            "view_count": self.view_count,
+            "answer_count": self.answer_count,
+            "is_answered": self.is_answered,
+            "vote_score": self.vote_score,
+            "last_activity_at": self.last_activity_at,
+            "signature": self.signature,
+        }
+
+    def keys(self) -> List[str]:
+        return item_keys(self.url, self.source, self.source_id, self.revision)
+
+
+class Collector(Protocol):
+    """Источник, лениво отдающий NormalizedItem по мере загрузки страниц."""
+    name: str
+
+    def items(self) -> Iterator[NormalizedItem]: ...
+
+
+Stage = Callable[[Iterable[NormalizedItem]], Iterator[NormalizedItem]]
+
+
+# --- стадии --------------------------------------------------------------------
+
+def skip_seen(seen: SeenFilter) -> Stage:
+    """Первая стадия: уже отправленное (по Bloom-фильтру URL/id) не чистим и не шлём повторно."""
+    def stage(items: Iterable[NormalizedItem]) -> Iterator[NormalizedItem]:
+        for it in items:
+            keys = it.keys()
+            if not keys or not seen.seen(keys):
+                yield it
+
+    return stage
+
+
+def clean(max_chars: Optional[int] = None) -> Stage:
+    """clean_text для обычного текста, clean_html (без блоков кода) для HTML-тел SE."""
+    def stage(items: Iterable[NormalizedItem]) -> Iterator[NormalizedItem]:
+        for it in items:
+            if it.is_html:
+                it.text = clean_html(it.text, code="skip", max_chars=max_chars)
+                it.is_html = False
+            else:
+                it.text = clean_text(it.text)
+                if max_chars and len(it.text) > max_chars:
+                    it.text = it.text[:max_chars]
+            yield it
+
+    return stage
+
+
+def signal_filter(soft_title: bool = True) -> Stage:
+    """Строгий фильтр по тексту; мягкий — по заголовку (если soft_title)."""
+    def stage(items: Iterable[NormalizedItem]) -> Iterator[NormalizedItem]:
+        for it in items:
+            if is_signal_strict(it.text) or (soft_title and it.title and is_signal_soft(clean_text(it.title))):
+                yield it
+
+    return stage
+
+
+def min_length(n: int) -> Stage:
+    def stage(items: Iterable[NormalizedItem]) -> Iterator[NormalizedItem]:
+        for it in items:
+            if len(it.text) >= n:
+                yield it
+
+    return stage
+
+
+def batched(items: Iterable[NormalizedItem], size: int = 100, start: int = 1) -> Iterator[List[NormalizedItem]]:
+    """
+    Пачки растут от start до size (x2 за пачку): первые элементы уходят в sink сразу,
+    дальше — крупными пачками.
+    """
+    cur = max(1, min(start, size))
+    batch: List[NormalizedItem] = []
+    for it in items:
+        batch.append(it)
+        if len(batch) >= cur:
+            yield batch
+            batch = []
+            cur = min(size, cur * 2)
+    if batch:
+        yield batch
+
+
+# --- sink ------------------------------------------------------------------------
+
+class IngestSink:
+    """
+    POST /ingest/batch через пул http_client; on_batch — хук на каждую отправленную пачку.
+    seen — ключи принятой сервером пачки (в т.ч. deduped) записываются в фильтр.
+    """
+
+    def __init__(
+        self,
+        api_base: str = API_BASE,
+        on_batch: Optional[Callable[[List[NormalizedItem]], None]] = None,
+        dry_run: bool = False,
+        seen: Optional[SeenFilter] = None,
+    ):
+        self.url = f"{api_base}/ingest/batch"
+        self.on_batch = on_batch
+        self.dry_run = dry_run
+        self.seen = seen
+        self.counts: Counter = Counter()
+
+    def __call__(self, batch: List[NormalizedItem]) -> None:
+        self.counts["batches"] += 1
+        self.counts["sent"] += len(batch)
+        if not self.dry_run:
+            r = http_client.post(self.url, json={"items": [it.payload() for it in batch]}, timeout=60)
+            r.raise_for_status()
+            data = r.json()
+            for name in ("ingested", "deduped", "rejected"):
+                self.counts[name] += int(data.get(name) or 0)
+            if self.seen is not None:
+                for it in batch:
+                    self.seen.record(it.keys())
+        if self.on_batch is not None:
+            self.on_batch(batch)
+
+
+# --- пайплайн ----------------------------------------------------------------------
+
+class Pipeline:
+    """
+    collectors -> stages -> batched -> sink, всё лениво: память не зависит от размера прогона.
+    Для каждой стадии считается, сколько элементов прошло дальше.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Stage]], batch_size: int = 100):
+        self.stages = stages
+        self.batch_size = batch_size
+        self.counts: Counter = Counter()
+        self.first_item_s: Optional[float] = None
+
+    def _counted(self, name: str, items: Iterable[NormalizedItem]) -> Iterator[NormalizedItem]:
+        for it in items:
+            self.counts[name] += 1
+            yield it
+
+    def items(self, collectors: Iterable[Collector]) -> Iterator[NormalizedItem]:
+        def source() -> Iterator[NormalizedItem]:
+            for c in collectors:
+                yield from c.items()
+
+        stream: Iterable[NormalizedItem] = self._counted("collected", source())
+        for name, stage in self.stages:
+            stream = self._counted(name, stage(stream))
+        return iter(stream)
+
+    def run(self, collectors: Iterable[Collector], sink: Callable[[List[NormalizedItem]], None]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        for batch in batched(self.items(collectors), size=self.batch_size):
+            sink(batch)
+            if self.first_item_s is None:
+                self.first_item_s = time.perf_counter() - t0
+        return {
+            "stages": dict(self.counts),
+            "first_item_s": round(self.first_item_s, 2) if self.first_item_s is not None else None,
+            "wall_s": round(time.perf_counter() - t0, 2),
+        }
+
+
+def default_stages(min_chars: int = 40, soft_title: bool = True, seen: Optional[SeenFilter] = None) -> List[Tuple[str, Stage]]:
+    """
+    [skip_seen ->] clean -> signal_filter -> min_length: общий порядок для всех collect-скриптов
+    (min_chars=0 — без порога длины).
+    """
+    stages: List[Tuple[str, Stage]] = [("unseen", skip_seen(seen))] if seen is not None else []
+    stages += [
+        ("cleaned", clean()),
+        ("signal", signal_filter(soft_title=soft_title)),
+    ]
+    if min_chars > 0:
+        stages.append((f"min_length_{min_chars}", min_length(min_chars)))
+    return stages
@@ -3,7 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Optional, Literal
 import time
-import requests
+
+from collectors import http_client
 
 
 @dataclass
@@ -13,18 +14,23 @@ class CollectedItem:
     text: str
     url: str
     query: Optional[str] = None
+    fullname: Optional[str] = None  # t3_xxx — курсор для before=
+    created_utc: int = 0
 
 
-def fetch_reddit_subreddit_new(subreddit: str, limit: int = 25) -> List[CollectedItem]:
+def fetch_reddit_subreddit_new(subreddit: str, limit: int = 25, before: Optional[str] = None) -> List[CollectedItem]:
     """
     Публичный JSON (без OAuth) для быстрого MVP.
     В будущем лучше перейти на официальный Reddit API.
+    before — fullname поста: вернутся только посты новее него.
     """
     url = f"https://www.reddit.com/r/{subreddit}/new.json"
     headers = {"User-Agent": "hunter-agent/0.1 (by u/placeholder)"}
     params = {"limit": limit}
+    if before:
+        params["before"] = before
 
-    r = requests.get(url, params=params, headers=headers, timeout=20)
+    r = http_client.get(url, params=params, headers=headers, timeout=20)
     r.raise_for_status()
     data = r.json()
 
@@ -44,6 +50,8 @@ def fetch_reddit_subreddit_new(subreddit: str, limit: int = 25) -> List[Collecte
                 text=text,
                 url=link,
                 query=subreddit,
+                fullname=d.get("name") or None,
+                created_utc=int(d.get("created_utc") or 0),
             )
         )
 
@@ -55,6 +63,7 @@ def fetch_posts(
     limit: int = 25,
     sort: Literal["new", "hot", "top"] = "new",
     sleep_s: float = 0.0,
+    before: Optional[str] = None,
 ) -> List[CollectedItem]:
     """
     Совместимость со старым кодом, который импортит fetch_posts().
@@ -64,7 +73,7 @@ def fetch_posts(
         # без OAuth лучше не симулировать другие режимы — реддит часто режет.
         sort = "new"
 
-    items = fetch_reddit_subreddit_new(subreddit=subreddit, limit=limit)
+    items = fetch_reddit_subreddit_new(subreddit=subreddit, limit=limit, before=before)
 
     if sleep_s > 0:
         time.sleep(sleep_s)
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from collectors.async_runner import FetchJob, RunStats, TokenBucket, run_async
+from collectors.checkpoints import CHECKPOINTS, CheckpointStore
+from collectors.seen_filter import SeenFilter
+
+DEFAULT_STATE_PATH = "var/scheduler_state.json"
+# state-файл переписывается и в простое, не реже раза в HEARTBEAT_S: по его updated_at видно, жив ли процесс
+HEARTBEAT_S = 60.0
+STALE_HEARTBEATS = 3
+
+
+@dataclass
+class PollState:
+    """Выученное состояние источника — переживает рестарт (state-файл)."""
+    interval_s: float
+    rate_per_s: float = 0.0  # EWMA новых элементов в секунду
+    last_poll: float = 0.0
+    next_due: float = 0.0
+    polls: int = 0
+    empty_streak: int = 0
+    last_yield: int = 0
+    total_yield: int = 0
+    errors: int = 0
+
+
+@dataclass
+class Source:
+    """
+    Опрашиваемый источник: job для async_runner + ключ курсора в CheckpointStore
+    (по нему считается сырой приток, до фильтров). capacity — сколько элементов
+    максимум приносит один опрос: упёрлись — значит, опрашиваем слишком редко.
+    """
+    key: str
+    job: FetchJob
+    checkpoint: Optional[Tuple[str, str]] = None
+    capacity: Optional[int] = None
+    state: PollState = field(default_factory=lambda: PollState(interval_s=600.0))
+
+
+class AdaptiveScheduler:
+    """
+    Опрос источников с интервалом, подстроенным под приток:
+      - интервал = target_per_poll / rate (EWMA), в пределах [min_interval_s, max_interval_s];
+      - пустой опрос — интервал x2 (экспоненциальный backoff), упор в capacity — /2;
+      - общий бюджет запросов в час: token bucket на все источники; если плановая
+        нагрузка sum(cost / interval) выше бюджета, все интервалы растягиваются
+        пропорционально, а в каждый тик первыми идут источники с большим ожидаемым уловом.
+    Срабатывающие источники уходят пачкой в run_async (per-host лимиты — там же).
+    """
+
+    def __init__(
+        self,
+        sources: List[Source],
+        ingest: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        budget_per_hour: float = 600.0,
+        target_per_poll: float = 20.0,
+        min_interval_s: float = 60.0,
+        max_interval_s: float = 6 * 3600.0,
+        alpha: float = 0.3,
+        store: Optional[CheckpointStore] = None,
+        state_path: Optional[str] = None,
+        heartbeat_s: float = HEARTBEAT_S,
+        persist_checkpoints: bool = True,
+        seen: Optional[SeenFilter] = None,
+    ):
+        self.sources = {s.key: s for s in sources}
+        self.ingest = ingest
+        self.budget_per_hour = budget_per_hour
+        self.target_per_poll = target_per_poll
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.alpha = alpha
+        self.store = store or CHECKPOINTS
+        # False — dry-run: курсоры двигаются только в памяти, следующий настоящий запуск получит те же элементы
+        self.persist_checkpoints = persist_checkpoints
+        # seen-фильтр, в который пишут job-ы источников: сохраняется вместе с курсорами
+        self.seen = seen
+        self.state_path = state_path
+        self.heartbeat_s = heartbeat_s
+        self._saved_at = 0.0
+        # бюджет: запас на 5 минут, пополнение budget/3600 в секунду
+        self.budget = TokenBucket(budget_per_hour / 3600.0, burst=max(1, int(budget_per_hour / 12)))
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.last_run: Optional[RunStats] = None
+        self._load()
+
+    # --- состояние -------------------------------------------------------------
+
+    def _load(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            saved = (json.load(f) or {}).get("sources") or {}
+        for key, st in saved.items():
+            if key in self.sources:
+                self.sources[key].state = PollState(**st["state"])
+
+    def save(self, stopped: bool = False) -> None:
+        """stopped=True — последняя запись при штатной остановке: /scheduler сразу покажет running=False."""
+        if not self.state_path:
+            return
+        self._saved_at = time.time()
+        payload = {
+            "updated_at": int(self._saved_at),
+            "heartbeat_s": self.heartbeat_s,
+            "stopped": stopped,
+            "budget_per_hour": self.budget_per_hour,
+            "pressure": round(self.pressure(), 2),
+            "plan": self.plan(),
+            "sources": {k: {"state": asdict(s.state)} for k, s in self.sources.items()},
+        }
+        d = os.path.dirname(self.state_path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.state_path)
+
+    # --- адаптация интервалов ----------------------------------------------------
+
+    def pressure(self) -> float:
+        """Во сколько раз плановая нагрузка превышает бюджет (>= 1)."""
+        planned = sum(s.job.cost / max(s.state.interval_s, 1.0) for s in self.sources.values())
+        return max(1.0, planned / (self.budget_per_hour / 3600.0))
+
+    def observe(self, src: Source, n_new: int, now: float) -> None:
+        st = src.state
+        first = st.polls == 0
+        st.polls += 1
+        st.last_yield = n_new
+        st.total_yield += n_new
+        if first:
+            # первый опрос приносит накопленный хвост за неизвестный срок — только засекаем время
+            st.last_poll = now
+            st.next_due = now + st.interval_s * self.pressure()
+            return
+        inst = n_new / max(now - st.last_poll, 1.0)
+        st.rate_per_s = inst if st.polls == 2 else (1 - self.alpha) * st.rate_per_s + self.alpha * inst
+        st.last_poll = now
+
+        if n_new == 0:
+            st.empty_streak += 1
+            interval = st.interval_s * 2
+        else:
+            st.empty_streak = 0
+            interval = self.target_per_poll / max(st.rate_per_s, 1e-9)
+            if src.capacity and n_new >= src.capacity:
+                interval = min(interval, st.interval_s / 2)
+        st.interval_s = min(self.max_interval_s, max(self.min_interval_s, interval))
+        st.next_due = now + st.interval_s * self.pressure()
+
+    def expected_yield(self, src: Source, at: Optional[float] = None) -> float:
+        st = src.state
+        if st.polls < 2:
+            return float(self.target_per_poll)
+        at = st.next_due if at is None else at
+        return st.rate_per_s * max(0.0, at - st.last_poll)
+
+    def plan(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ближайшие опросы: когда, с каким интервалом и сколько новых элементов ожидается."""
+        now = time.time()
+        rows = [
+            {
+                "source": s.key,
+                "host": s.job.host,
+                "next_due": round(s.state.next_due, 1),
+                "due_in_s": round(max(0.0, s.state.next_due - now), 1),
+                "interval_s": round(s.state.interval_s, 1),
+                "rate_per_h": round(s.state.rate_per_s * 3600, 2),
+                "expected_yield": round(self.expected_yield(s), 1),
+                "last_yield": s.state.last_yield,
+                "polls": s.state.polls,
+            }
+            for s in self.sources.values()
+        ]
+        rows.sort(key=lambda r: r["due_in_s"])
+        return rows[:limit] if limit else rows
+
+    # --- опрос ---------------------------------------------------------------------
+
+    def _fetched(self, src: Source) -> int:
+        if src.checkpoint is None:
+            return 0
+        run = self.store.report()["by_key"].get(f"{src.checkpoint[0]}:{src.checkpoint[1]}") or {}
+        return int(run.get("fetched") or 0)
+
+    def _tracked(self, src: Source) -> FetchJob:
+        # оборачиваем fetch: считаем приток по курсору (сырые элементы) или по длине результата
+        def fetch() -> List[Dict[str, Any]]:
+            before = self._fetched(src)
+            try:
+                items = src.job.fetch()
+            except Exception:
+                src.state.errors += 1
+                # ошибка — не сигнал о тишине: повторим через текущий интервал
+                src.state.next_due = time.time() + src.state.interval_s * self.pressure()
+                raise
+            n = self._fetched(src) - before if src.checkpoint is not None else len(items)
+            self.observe(src, n, time.time())
+            return items
+
+        return FetchJob(host=src.job.host, name=src.key, fetch=fetch, cost=src.job.cost)
+
+    def due(self, now: float) -> List[Source]:
+        """Созревшие источники в пределах бюджета: сначала с большим ожидаемым уловом на запрос."""
+        ready = [s for s in self.sources.values() if s.state.next_due <= now]
+        ready.sort(key=lambda s: self.expected_yield(s, now) / s.job.cost, reverse=True)
+        picked: List[Source] = []
+        self.budget._refill()
+        for s in ready:
+            if self.budget.tokens < s.job.cost:
+                continue
+            self.budget.tokens -= s.job.cost
+            picked.append(s)
+        return picked
+
+    async def tick(self) -> int:
+        now = time.time()
+        batch = self.due(now)
+        if not batch:
+            return 0
+        for s in batch:
+            # пока идёт опрос, источник не должен попасть в следующий тик
+            s.state.next_due = now + s.state.interval_s
+        self.last_run = await run_async([self._tracked(s) for s in batch], ingest=self.ingest, buckets=self.buckets)
+        if self.persist_checkpoints:
+            self.store.save()
+            if self.seen is not None:
+                self.seen.save()
+        self.save()
+        return len(batch)
+
+    async def run_forever(self, tick_s: float = 5.0, max_ticks: Optional[int] = None, on_tick: Optional[Callable[["AdaptiveScheduler", int], None]] = None) -> None:
+        ticks = 0
+        while max_ticks is None or ticks < max_ticks:
+            n = await self.tick()
+            if not n and time.time() - self._saved_at >= self.heartbeat_s:
+                self.save()
+            if on_tick is not None:
+                on_tick(self, n)
+            ticks += 1
+            nxt = min((s.state.next_due for s in self.sources.values()), default=time.time() + tick_s)
+            # не чаще раза в секунду, даже если кто-то созрел, но ждёт бюджета
+            await asyncio.sleep(min(tick_s, max(1.0, nxt - time.time())))
+
+
+def state_view(state: Dict[str, Any], now: float, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Сохранённый state-файл глазами читателя в момент now: due_in_s пересчитывается
+    от next_due (в файле он на момент записи), running — по свежести updated_at.
+    """
+    updated_at = state.get("updated_at")
+    heartbeat_s = float(state.get("heartbeat_s") or HEARTBEAT_S)
+    running = (
+        updated_at is not None
+        and not state.get("stopped")
+        and now - float(updated_at) <= heartbeat_s * STALE_HEARTBEATS
+    )
+    rows = []
+    for r in state.get("plan") or []:
+        r = dict(r)
+        if r.get("next_due") is not None:
+            r["due_in_s"] = round(max(0.0, float(r["next_due"]) - now), 1)
+        rows.append(r)
+    rows.sort(key=lambda r: r.get("due_in_s") or 0.0)
+    return {
+        "running": running,
+        "updated_at": updated_at,
+        "age_s": round(now - float(updated_at), 1) if updated_at is not None else None,
+        "budget_per_hour": state.get("budget_per_hour"),
+        "pressure": state.get("pressure"),
+        "plan": rows[: max(0, limit)] if limit is not None else rows,
+    }
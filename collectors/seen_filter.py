@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from collectors import http_client
+
+DEFAULT_PATH = "var/seen_filter.bin"
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_CAPACITY = 10000
+MAGIC = b"SBF1"
+_U32 = struct.Struct("<I")
+
+
+class BloomFilter:
+    """Классический Bloom: m бит, k позиций из двойного хеширования blake2b."""
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be in (0, 1)")
+        self.capacity = max(1, int(capacity))
+        self.error_rate = float(error_rate)
+        self.m = max(8, int(math.ceil(-self.capacity * math.log(self.error_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.m / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.m + 7) // 8)
+        self.count = count
+
+    def _positions(self, key: str) -> List[int]:
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """
+    Scalable Bloom (Almeida et al.): заполненный фильтр не растёт, а к нему добавляется
+    следующий — в growth раз больше и с ошибкой x tightening, так что суммарная
+    доля ложных срабатываний остаётся не выше error_rate при любом числе ключей.
+    """
+
+    def __init__(self, error_rate: float = DEFAULT_ERROR_RATE, initial_capacity: int = DEFAULT_CAPACITY, growth: int = 2, tightening: float = 0.5):
+        self.error_rate = float(error_rate)
+        self.initial_capacity = max(1, int(initial_capacity))
+        self.growth = max(2, int(growth))
+        self.tightening = float(tightening)
+        self.filters: List[BloomFilter] = []
+
+    def _next(self) -> BloomFilter:
+        i = len(self.filters)
+        return BloomFilter(
+            self.initial_capacity * self.growth ** i,
+            self.error_rate * (1 - self.tightening) * self.tightening ** i,
+        )
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in f for f in reversed(self.filters))
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    def add(self, key: str) -> bool:
+        """True, если ключ новый (с точностью до ложного срабатывания)."""
+        if key in self:
+            return False
+        if not self.filters or self.filters[-1].full:
+            self.filters.append(self._next())
+        self.filters[-1].add(key)
+        return True
+
+    def size_bytes(self) -> int:
+        return sum(len(f.bits) for f in self.filters)
+
+    def to_bytes(self, meta: Optional[Dict[str, Any]] = None) -> bytes:
+        header = {
+            "error_rate": self.error_rate,
+            "initial_capacity": self.initial_capacity,
+            "growth": self.growth,
+            "tightening": self.tightening,
+            "filters": [{"capacity": f.capacity, "error_rate": f.error_rate, "count": f.count} for f in self.filters],
+            "meta": meta or {},
+        }
+        raw = json.dumps(header, sort_keys=True).encode("utf-8")
+        return MAGIC + zlib.compress(_U32.pack(len(raw)) + raw + b"".join(bytes(f.bits) for f in self.filters))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Tuple["ScalableBloomFilter", Dict[str, Any]]:
+        if not data.startswith(MAGIC):
+            raise ValueError("not a seen-filter payload")
+        buf = zlib.decompress(data[len(MAGIC):])
+        (n,) = _U32.unpack_from(buf, 0)
+        header = json.loads(buf[4:4 + n].decode("utf-8"))
+        sbf = cls(header["error_rate"], header["initial_capacity"], header["growth"], header["tightening"])
+        pos = 4 + n
+        for h in header["filters"]:
+            f = BloomFilter(h["capacity"], h["error_rate"], count=h["count"])
+            size = len(f.bits)
+            if pos + size > len(buf):
+                raise ValueError("truncated seen-filter payload")
+            f.bits = bytearray(buf[pos:pos + size])
+            pos += size
+            sbf.filters.append(f)
+        return sbf, header.get("meta") or {}
+
+
+def item_keys(url: Optional[str], source: Optional[str] = None, source_id: Optional[str] = None, revision: Optional[str] = None) -> List[str]:
+    """
+    Ключи элемента: URL (его знает и сервер) и id в источнике (reddit fullname, HN objectID).
+    revision — версия изменяемого элемента (SE: last_activity_at): входит во все ключи,
+    так что элемент с новой активностью фильтр не прячет (голые URL из sync() с ним не совпадают).
+    """
+    suffix = f"@{revision}" if revision else ""
+    keys: List[str] = []
+    if url and url.strip():
+        keys.append("url:" + url.strip().rstrip("/") + suffix)
+    if source_id:
+        keys.append(f"id:{source or ''}:{source_id}{suffix}")
+    return keys
+
+
+class SeenFilter:
+    """
+    Клиентский фильтр уже отправленных элементов: проверка идёт до clean/фильтров/POST.
+    Ложное срабатывание = элемент пропущен, хотя сервер его не видел — поэтому error_rate
+    настраивается (HUNTER_SEEN_FPR); ложных «не видели» не бывает, их дорежет серверный dedup.
+    sync() догружает URL из серверного индекса (/ingest/seen); сменился epoch сервера
+    (/reset, рестарт с пустой памятью) — фильтр сбрасывается, иначе он прятал бы всё подряд.
+    """
+
+    def __init__(self, path: Optional[str] = None, error_rate: float = DEFAULT_ERROR_RATE, initial_capacity: int = DEFAULT_CAPACITY):
+        self.path = path
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self.meta: Dict[str, Any] = {}
+        self.counts: Counter = Counter()
+        self.bloom = ScalableBloomFilter(error_rate, initial_capacity)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.bloom, self.meta = ScalableBloomFilter.from_bytes(f.read())
+
+    def seen(self, keys: Iterable[str]) -> bool:
+        with self._lock:
+            hit = any(k in self.bloom for k in keys)
+            self.counts["hits" if hit else "misses"] += 1
+            return hit
+
+    def record(self, keys: Iterable[str]) -> int:
+        with self._lock:
+            added = sum(1 for k in keys if self.bloom.add(k))
+            self.counts["recorded"] += added
+            return added
+
+    def snapshot(self) -> bytes:
+        with self._lock:
+            return self.bloom.to_bytes(self.meta)
+
+    def restore(self, snap: bytes) -> None:
+        bloom, meta = ScalableBloomFilter.from_bytes(snap)
+        with self._lock:
+            self.bloom, self.meta = bloom, meta
+
+    def reset(self) -> None:
+        with self._lock:
+            self.bloom = ScalableBloomFilter(self.error_rate, self.initial_capacity)
+            self.meta = {}
+
+    def sync(self, api_base: str, page_size: int = 5000) -> Dict[str, Any]:
+        """Инкрементально: только элементы сервера с id > последнего синхронизированного."""
+        after = int(self.meta.get("server_last_id") or 0)
+        added = 0
+        while True:
+            r = http_client.get(
+                f"{api_base}/ingest/seen",
+                params={"after_id": after, "limit": page_size},
+                timeout=30,
+                cache=False,
+            )
+            r.raise_for_status()
+            data = r.json()
+            epoch = data.get("epoch")
+            if self.meta.get("server_epoch") not in (None, epoch):
+                # сервер начал с чистого листа — наши ключи больше ничего не гарантируют
+                self.reset()
+                after, added = 0, 0
+                self.meta["server_epoch"] = epoch
+                continue
+            self.meta["server_epoch"] = epoch
+            for url in data.get("urls") or []:
+                added += self.record(item_keys(url))
+            prev, after = after, int(data.get("last_id") or after)
+            self.meta["server_last_id"] = after
+            if after >= int(data.get("total") or 0) or after == prev:
+                break
+        return {"added": added, "server_last_id": after, "epoch": self.meta.get("server_epoch")}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "keys": len(self.bloom),
+                "filters": len(self.bloom.filters),
+                "bytes": self.bloom.size_bytes(),
+                "error_rate": self.bloom.error_rate,
+                **dict(self.counts),
+            }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        payload = self.snapshot()
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, self.path)
+
+
+SEEN = SeenFilter(
+    os.getenv("HUNTER_SEEN_FILTER", DEFAULT_PATH) or None,
+    error_rate=float(os.getenv("HUNTER_SEEN_FPR", str(DEFAULT_ERROR_RATE))),
+    initial_capacity=int(os.getenv("HUNTER_SEEN_CAPACITY", str(DEFAULT_CAPACITY))),
+)
+
+
+def report_line(seen: Optional[SeenFilter] = None) -> str:
+    s = (seen or SEEN).stats()
+    return (
+        f"keys={s['keys']} filters={s['filters']} bytes={s['bytes']} fpr={s['error_rate']} "
+        f"skipped={s.get('hits', 0)} passed={s.get('misses', 0)} recorded={s.get('recorded', 0)}"
+    )
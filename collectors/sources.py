@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from typing import Callable, Iterator, List, Optional, Sequence, TypeVar
+
+from collectors.checkpoints import CheckpointStore, hn_pages_since, reddit_new_since, se_questions_since
+from collectors.hn_algolia import HNItem
+from collectors.pipeline import NormalizedItem
+from collectors.reddit_public import CollectedItem
+from collectors.stackexchange import SEQuestion
+
+T = TypeVar("T")
+
+
+def reddit_item(p: CollectedItem, sr: str) -> Optional[NormalizedItem]:
+    # p.text = title + selftext
+    text = (p.text or p.title or "").strip()
+    if not text:
+        return None
+    return NormalizedItem(
+        text=text,
+        source=p.source,
+        title=(p.title or "").strip(),
+        query=p.query,
+        url=p.url,
+        tags=["reddit", f"r:{sr}"],
+        last_activity_at=p.created_utc,
+        source_id=p.fullname or None,
+    )
+
+
+def hn_item(it: HNItem) -> NormalizedItem:
+    return NormalizedItem(
+        text=it.text or it.title,
+        source="hn",
+        title=it.title,
+        url=it.url,
+        tags=list(it.tags),
+        vote_score=it.points,
+        answer_count=it.num_comments,
+        last_activity_at=it.created_at_i,
+        source_id=it.object_id or None,
+    )
+
+
+def se_item(q: SEQuestion) -> NormalizedItem:
+    """Тело вопроса — HTML (чистит стадия clean через clean_html)."""
+    return NormalizedItem(
+        text=f"<p>{q.title}</p>\n{q.text}",
+        source=q.source,
+        title=q.title,
+        query=q.query,
+        url=q.url,
+        tags=list(q.tags),
+        view_count=q.view_count,
+        answer_count=q.answer_count,
+        is_answered=q.is_answered,
+        vote_score=q.score,
+        last_activity_at=q.last_activity_at,
+        is_html=True,
+        # вопрос с новой активностью перекачан намеренно — seen-фильтр не должен его отсечь
+        revision=str(q.last_activity_at) if q.last_activity_at else None,
+    )
+
+
+def _fetch(c: "RedditCollector | HNCollector | SECollector", key: str, fetch: Callable[[], Sequence[T]]) -> Sequence[T]:
+    """
+    Ошибка загрузки одного источника по умолчанию летит вызывающему (async_runner/планировщик
+    считают её и откладывают опрос); skip_errors=True — записать в c.errors и идти к следующему.
+    """
+    try:
+        return fetch()
+    except Exception as e:
+        if not c.skip_errors:
+            raise
+        c.errors.append(f"{key}: {type(e).__name__}: {e}")
+        return []
+
+
+class RedditCollector:
+    """/new сабреддитов (инкрементально по курсорам); элементы отдаются по мере загрузки сабреддита."""
+
+    name = "reddit"
+
+    def __init__(self, subreddits: List[str], limit: int = 80, store: Optional[CheckpointStore] = None, skip_errors: bool = False):
+        self.subreddits = subreddits
+        self.limit = limit
+        self.store = store
+        self.skip_errors = skip_errors
+        self.errors: List[str] = []
+
+    def items(self) -> Iterator[NormalizedItem]:
+        for sr in self.subreddits:
+            posts = _fetch(self, f"r/{sr}", lambda: reddit_new_since(sr, limit=self.limit, store=self.store))
+            for p in posts:
+                item = reddit_item(p, sr)
+                if item is not None:
+                    yield item
+
+
+class HNCollector:
+    name = "hn"
+
+    def __init__(self, queries: List[str], pages: int = 2, hits_per_page: int = 50, store: Optional[CheckpointStore] = None, skip_errors: bool = False):
+        self.queries = queries
+        self.pages = pages
+        self.hits_per_page = hits_per_page
+        self.store = store
+        self.skip_errors = skip_errors
+        self.errors: List[str] = []
+
+    def items(self) -> Iterator[NormalizedItem]:
+        for q in self.queries:
+            hits = _fetch(self, f"hn {q!r}", lambda: hn_pages_since(q, pages=self.pages, hits_per_page=self.hits_per_page, store=self.store))
+            for it in hits:
+                yield hn_item(it)
+
+
+class SECollector:
+    """specs — "site:tag"."""
+
+    name = "stackexchange"
+
+    def __init__(self, specs: List[str], pages: int = 2, pagesize: int = 50, store: Optional[CheckpointStore] = None, skip_errors: bool = False):
+        self.specs = specs
+        self.pages = pages
+        self.pagesize = pagesize
+        self.store = store
+        self.skip_errors = skip_errors
+        self.errors: List[str] = []
+
+    def items(self) -> Iterator[NormalizedItem]:
+        for spec in self.specs:
+            site, _, tagged = spec.partition(":")
+            qs = _fetch(self, f"se {spec}", lambda: se_questions_since(site, tagged or "python", pages=self.pages, pagesize=self.pagesize, store=self.store, query=spec))
+            for q in qs:
+                yield se_item(q)
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import re
+import threading
 import time
-import requests
+
+from collectors import http_client
 
 API = "https://api.stackexchange.com/2.3"
+IDS_PER_CALL = 100  # лимит /questions/{ids}: до 100 id за вызов
+BODY_WORKERS = 4
+# ниже этого остатка дневной квоты новые вызовы не делаем
+MIN_QUOTA = 10
+# дневная квота SE сбрасывается в полночь UTC: исчерпанный остаток не переживает своё окно
+QUOTA_WINDOW_S = 86400
 
 
 @dataclass
@@ -23,102 +34,214 @@ class SEQuestion:
     last_activity_at: int = 0  # unix ts
 
 
-def _request_json(endpoint: str, params: Dict, timeout: int = 25) -> Dict:
-    r = requests.get(endpoint, params=params, timeout=timeout, headers={"User-Agent": "hunter-agent/0.1"})
-    if r.status_code >= 400:
-        try:
-            data = r.json()
-        except Exception:
-            data = None
+class SEQuotaLimiter:
+    """
+    Общий для всех потоков учёт ограничений SE API:
+      - quota_remaining из последнего ответа: при <= min_quota вызовы прекращаются
+        до конца окна квоты (полночь UTC), дальше остаток снова неизвестен;
+      - backoff (секунды) из ответа: тот же метод нельзя дёргать раньше, чем через backoff.
+    Метод — путь без id (/questions, /questions/{ids}).
+    """
 
-        if isinstance(data, dict) and data.get("error_name") == "throttle_violation":
-            # поднимаем специальную ошибку
-            raise RuntimeError(f"SE_THROTTLED:{data.get('error_message','')}|url={r.url}")
+    def __init__(self, min_quota: int = MIN_QUOTA, window_s: float = QUOTA_WINDOW_S):
+        self.min_quota = min_quota
+        self.window_s = window_s
+        self.quota_remaining: Optional[int] = None
+        self._quota_reset_at = 0.0  # unix ts конца окна, в котором получен quota_remaining
+        self._not_before: Dict[str, float] = {}
+        self._lock = threading.Lock()
 
-        raise RuntimeError(f"StackExchange HTTP {r.status_code}: {r.text} | url={r.url}")
+    def wait(self, method: str) -> None:
+        with self._lock:
+            if self.quota_remaining is not None and time.time() >= self._quota_reset_at:
+                self.quota_remaining = None
+            if self.quota_remaining is not None and self.quota_remaining <= self.min_quota:
+                raise RuntimeError(f"SE_QUOTA_EXHAUSTED:quota_remaining={self.quota_remaining}")
+            delay = self._not_before.get(method, 0.0) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
-    return r.json()
+    def observe(self, method: str, data: Dict) -> None:
+        with self._lock:
+            if "quota_remaining" in data:
+                self.quota_remaining = int(data["quota_remaining"])
+                self._quota_reset_at = (time.time() // self.window_s + 1) * self.window_s
+            backoff = int(data.get("backoff") or 0)
+            if backoff > 0:
+                until = time.monotonic() + backoff
+                self._not_before[method] = max(self._not_before.get(method, 0.0), until)
 
-def _request_json(endpoint: str, params: Dict, timeout: int = 25) -> Dict:
-    r = requests.get(endpoint, params=params, timeout=timeout, headers={"User-Agent": "hunter-agent/0.1"})
+
+QUOTA = SEQuotaLimiter()
+
+_THROTTLE_WAIT_RX = re.compile(r"available in (\d+) seconds")
+
+
+def _method_of(endpoint: str) -> str:
+    path = endpoint[len(API):] if endpoint.startswith(API) else endpoint
+    return re.sub(r"/[\d;]+(?=/|$)", "/{ids}", path)
+
+
+def _request_json(endpoint: str, params: Dict, timeout: int = 25, limiter: Optional[SEQuotaLimiter] = None) -> Dict:
+    limiter = limiter or QUOTA
+    method = _method_of(endpoint)
+    limiter.wait(method)
+    r = http_client.get(endpoint, params=params, timeout=timeout)
 
     # Cloudflare / HTML-ban page
     ct = (r.headers.get("content-type") or "").lower()
     if "text/html" in ct and ("too many requests" in (r.text or "").lower()):
         raise RuntimeError(f"SE_BLOCKED_HTML:{r.status_code}|url={r.url}")
 
+    try:
+        data = r.json()
+    except ValueError:
+        data = None
+
     if r.status_code >= 400:
-        ...
+        if isinstance(data, dict) and data.get("error_name") == "throttle_violation":
+            msg = str(data.get("error_message") or "")
+            m = _THROTTLE_WAIT_RX.search(msg)
+            if m:
+                # следующий вызов метода не раньше, чем разрешил SE
+                limiter.observe(method, {"backoff": int(m.group(1))})
+            # поднимаем специальную ошибку
+            raise RuntimeError(f"SE_THROTTLED:{msg}|url={r.url}")
 
-def fetch_questions_with_body(
+        raise RuntimeError(f"StackExchange HTTP {r.status_code}: {r.text} | url={r.url}")
+
+    if not isinstance(data, dict):
+        raise RuntimeError(f"StackExchange: non-JSON response {r.status_code} | url={r.url}")
+    if not http_client.from_cache(r):
+        # у ответа из кэша quota_remaining/backoff старые — квоту он не тратил
+        limiter.observe(method, data)
+    return data
+
+
+def _question(it: Dict, query: Optional[str]) -> SEQuestion:
+    return SEQuestion(
+        title=it.get("title") or "",
+        text=it.get("body") or "",
+        url=it.get("link") or "",
+        tags=list(it.get("tags") or []),
+        source="stackexchange",
+        query=query,
+        view_count=int(it.get("view_count") or 0),
+        answer_count=int(it.get("answer_count") or 0),
+        is_answered=bool(it.get("is_answered") or False),
+        score=int(it.get("score") or 0),
+        last_activity_at=int(it.get("last_activity_date") or 0),
+    )
+
+
+def fetch_bodies(
     site: str,
-    tagged: str,
-    pages: int = 2,
-    pagesize: int = 50,
+    ids: List[int],
     api_key: str | None = None,
     query: str | None = None,
+    workers: int = BODY_WORKERS,
+    limiter: Optional[SEQuotaLimiter] = None,
 ) -> List[SEQuestion]:
     """
-    2-step:
-      1) /questions without body filter -> get ids
-      2) /questions/{ids} with filter=withbody -> get bodies
+    /questions/{ids}?filter=withbody чанками по 100 id, чанки — параллельно.
+    Чанк из 100 id влезает в одну страницу (pagesize=100), has_more не бывает.
     """
-    all_ids: List[int] = []
+    chunks = [ids[i:i + IDS_PER_CALL] for i in range(0, len(ids), IDS_PER_CALL)]
 
-    for page in range(1, pages + 1):
+    def one(chunk: List[int]) -> List[SEQuestion]:
         params = {
             "site": site,
-            "tagged": tagged,
-            "pagesize": pagesize,
-            "page": page,
-            "order": "desc",
-            "sort": "activity",
+            "filter": "withbody",
+            "pagesize": IDS_PER_CALL,
         }
         if api_key:
             params["key"] = api_key
+        data = _request_json(f"{API}/questions/{';'.join(map(str, chunk))}", params=params, limiter=limiter)
+        return [_question(it, query) for it in (data.get("items") or [])]
+
+    if len(chunks) <= 1 or workers <= 1:
+        return [q for c in chunks for q in one(c)]
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        return [q for part in pool.map(one, chunks) for q in part]
 
-        data = _request_json(f"{API}/questions", params=params)
-        items = data.get("items") or []
-        for it in items:
-            qid = it.get("question_id")
-            if qid:
-                all_ids.append(int(qid))
 
-        if not data.get("has_more"):
+def list_questions_page(
+    site: str,
+    tagged: str,
+    page: int,
+    pagesize: int = 50,
+    api_key: str | None = None,
+    min_activity: int | None = None,
+) -> Tuple[Dict[int, int], bool]:
+    """Одна страница /questions без тел: ({question_id: last_activity_date}, has_more)."""
+    params = {
+        "site": site,
+        "tagged": tagged,
+        "pagesize": pagesize,
+        "page": page,
+        "order": "desc",
+        "sort": "activity",
+    }
+    if min_activity:
+        params["min"] = int(min_activity)
+    if api_key:
+        params["key"] = api_key
+
+    data = _request_json(f"{API}/questions", params=params)
+    listed: Dict[int, int] = {}
+    for it in data.get("items") or []:
+        qid = it.get("question_id")
+        if qid:
+            listed[int(qid)] = int(it.get("last_activity_date") or 0)
+    return listed, bool(data.get("has_more"))
+
+
+def fetch_questions_with_body(
+    site: str,
+    tagged: str,
+    pages: int = 2,
+    pagesize: int = 50,
+    api_key: str | None = None,
+    query: str | None = None,
+    min_activity: int | None = None,
+    known_activity: Optional[Dict[int, int]] = None,
+    stats: Optional[Counter] = None,
+) -> List[SEQuestion]:
+    """
+    2-step:
+      1) /questions without body filter -> get ids
+      2) /questions/{ids} with filter=withbody -> get bodies (чанки по 100, см. fetch_bodies)
+    min_activity — unix ts: при sort=activity параметр min отсекает вопросы
+    без активности с прошлого запуска.
+    known_activity — {question_id: last_activity_date} с прошлых запусков: тела вопросов,
+    у которых дата активности не изменилась, не запрашиваются; словарь обновляется на месте.
+    stats (Counter) получает listed / unchanged / bodies.
+    """
+    listed: Dict[int, int] = {}
+
+    for page in range(1, pages + 1):
+        got, has_more = list_questions_page(site, tagged, page, pagesize=pagesize, api_key=api_key, min_activity=min_activity)
+        listed.update(got)
+        if not has_more:
             break
 
         # лёгкий троттлинг, чтобы не рвать API
         time.sleep(0.2)
 
-    if not all_ids:
+    todo = list(listed)
+    if known_activity is not None:
+        todo = [qid for qid, ts in listed.items() if known_activity.get(qid) != ts]
+    if stats is not None:
+        stats["listed"] += len(listed)
+        stats["unchanged"] += len(listed) - len(todo)
+    if not todo:
         return []
 
     # step 2: bodies
-    ids_str = ";".join(map(str, all_ids))
-    params2 = {
-        "site": site,
-        "filter": "withbody",
-        "pagesize": min(100, len(all_ids)),
-    }
-    if api_key:
-        params2["key"] = api_key
-
-    data2 = _request_json(f"{API}/questions/{ids_str}", params=params2)
-    out: List[SEQuestion] = []
-    for it in (data2.get("items") or []):
-        out.append(
-            SEQuestion(
-                title=it.get("title") or "",
-                text=it.get("body") or "",
-                url=it.get("link") or "",
-                tags=list(it.get("tags") or []),
-                source="stackexchange",
-                query=query,
-                view_count=int(it.get("view_count") or 0),
-                answer_count=int(it.get("answer_count") or 0),
-                is_answered=bool(it.get("is_answered") or False),
-                score=int(it.get("score") or 0),
-                last_activity_at=int(it.get("last_activity_date") or 0),
-            )
-        )
+    out = fetch_bodies(site, todo, api_key=api_key, query=query)
+    if known_activity is not None:
+        for qid in todo:
+            known_activity[qid] = listed[qid]
+    if stats is not None:
+        stats["bodies"] += len(out)
     return out
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PATH = "var/work_queue.sqlite"
+DEFAULT_VISIBILITY_S = 120.0
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_BASE_S = 5.0
+RETRY_MAX_S = 600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    dedupe_key TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,
+    lease_token TEXT,
+    leased_by TEXT,
+    last_error TEXT,
+    result TEXT,
+    harvested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+-- одна живая (queued/leased) задача на ключ: повторный enqueue не плодит дублей
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_live_key ON jobs(dedupe_key) WHERE status IN ('queued', 'leased');
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, visible_at);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    jobs_done INTEGER NOT NULL DEFAULT 0,
+    jobs_failed INTEGER NOT NULL DEFAULT 0,
+    leases_lost INTEGER NOT NULL DEFAULT 0,
+    items_fetched INTEGER NOT NULL DEFAULT 0,
+    items_sent INTEGER NOT NULL DEFAULT 0,
+    ingested INTEGER NOT NULL DEFAULT 0,
+    busy_s REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS host_buckets (
+    host TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    lease_token: str
+    leased_by: str
+    lease_expires: float
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    Долговечная очередь единиц сбора в SQLite (WAL): переживает рестарты, её файл делят
+    воркеры-процессы (на других хостах — через общий диск; WAL требует локальной ФС,
+    для сетевых — HUNTER_QUEUE_WAL=0).
+    Семантика at-least-once: lease() выдаёт задачу с видимостью visibility_s; не подтверждённая
+    за это время (воркер упал/завис) снова становится доступной. ack/nack принимаются только
+    с токеном текущей аренды — опоздавший воркер не закроет чужую попытку.
+    Повтор задачи безопасен: сервер дедупит ingest по тексту.
+    """
+
+    def __init__(self, path: Optional[str] = None, wal: Optional[bool] = None):
+        self.path = path or ":memory:"
+        if path:
+            d = os.path.dirname(path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+        if wal is None:
+            wal = os.getenv("HUNTER_QUEUE_WAL", "1") == "1"
+        self._lock = threading.Lock()
+        # autocommit: транзакции открываем явно (BEGIN IMMEDIATE — сразу берём write-lock)
+        self._db = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        if wal and path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=30000")
+        self._db.executescript(_SCHEMA)
+
+    def _tx(self, fn: Any) -> Any:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return out
+
+    # --- продюсер --------------------------------------------------------------
+
+    def push(self, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS, delay_s: float = 0.0) -> bool:
+        """False — такая задача (dedupe_key) уже ждёт или выполняется."""
+        return self.push_many([(kind, payload, dedupe_key)], max_attempts=max_attempts, delay_s=delay_s) == 1
+
+    def push_many(self, jobs: List[Tuple[str, Dict[str, Any], Optional[str]]], max_attempts: int = DEFAULT_MAX_ATTEMPTS, delay_s: float = 0.0) -> int:
+        now = time.time()
+
+        def run(db: sqlite3.Connection) -> int:
+            n = 0
+            for kind, payload, key in jobs:
+                cur = db.execute(
+                    "INSERT OR IGNORE INTO jobs (kind, dedupe_key, payload, max_attempts, visible_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (kind, key, json.dumps(payload, ensure_ascii=False), max_attempts, now + delay_s, now, now),
+                )
+                n += cur.rowcount
+            return n
+
+        return self._tx(run)
+
+    def harvest(self) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+        """Результаты выполненных задач, ещё не забранные продюсером: (kind, payload, result)."""
+        def run(db: sqlite3.Connection) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+            rows = db.execute(
+                "SELECT id, kind, payload, result FROM jobs WHERE status = 'done' AND harvested = 0 ORDER BY id"
+            ).fetchall()
+            db.executemany("UPDATE jobs SET harvested = 1 WHERE id = ?", [(r[0],) for r in rows])
+            return [(r[1], json.loads(r[2]), json.loads(r[3] or "{}")) for r in rows]
+
+        return self._tx(run)
+
+    # --- воркер ------------------------------------------------------------------
+
+    def lease(self, worker: str, visibility_s: float = DEFAULT_VISIBILITY_S, kinds: Optional[List[str]] = None) -> Optional[Job]:
+        """Следующая видимая задача (queued или с истёкшей арендой); attempts +1."""
+        now = time.time()
+
+        def run(db: sqlite3.Connection) -> Optional[Job]:
+            sql = "SELECT id, kind, payload, attempts, max_attempts FROM jobs WHERE status IN ('queued', 'leased') AND visible_at <= ?"
+            args: List[Any] = [now]
+            if kinds:
+                sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+                args += kinds
+            row = db.execute(sql + " ORDER BY visible_at, id LIMIT 1", args).fetchone()
+            if row is None:
+                return None
+            job_id, kind, payload, attempts, max_attempts = row
+            if attempts >= max_attempts:
+                # аренда истекла на последней попытке — воркер так и не ответил
+                db.execute(
+                    "UPDATE jobs SET status = 'dead', last_error = COALESCE(last_error, 'lease expired'), updated_at = ? WHERE id = ?",
+                    (now, job_id),
+                )
+                return run(db)
+            token = uuid.uuid4().hex
+            expires = now + visibility_s
+            db.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, visible_at = ?, lease_token = ?, leased_by = ?, updated_at = ? WHERE id = ?",
+                (expires, token, worker, now, job_id),
+            )
+            return Job(job_id, kind, json.loads(payload), attempts + 1, max_attempts, token, worker, expires)
+
+        return self._tx(run)
+
+    def extend(self, job: Job, visibility_s: float = DEFAULT_VISIBILITY_S) -> bool:
+        """Продлить аренду долгой задачи; False — аренда уже потеряна."""
+        expires = time.time() + visibility_s
+
+        def run(db: sqlite3.Connection) -> bool:
+            cur = db.execute(
+                "UPDATE jobs SET visible_at = ? WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (expires, job.id, job.lease_token),
+            )
+            return cur.rowcount == 1
+
+        ok = self._tx(run)
+        if ok:
+            job.lease_expires = expires
+        return ok
+
+    def ack(self, job: Job, result: Optional[Dict[str, Any]] = None) -> bool:
+        def run(db: sqlite3.Connection) -> bool:
+            cur = db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_token = NULL, last_error = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (json.dumps(result or {}, ensure_ascii=False), time.time(), job.id, job.lease_token),
+            )
+            return cur.rowcount == 1
+
+        return self._tx(run)
+
+    def nack(self, job: Job, error: str, retry_in_s: Optional[float] = None) -> bool:
+        """Ошибка попытки: повтор с экспоненциальной задержкой или 'dead' после max_attempts."""
+        if retry_in_s is None:
+            retry_in_s = min(RETRY_MAX_S, RETRY_BASE_S * (2 ** (job.attempts - 1)))
+        now = time.time()
+        status = "dead" if job.attempts >= job.max_attempts else "queued"
+
+        def run(db: sqlite3.Connection) -> bool:
+            cur = db.execute(
+                "UPDATE jobs SET status = ?, visible_at = ?, lease_token = NULL, last_error = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (status, now + retry_in_s, error[:500], now, job.id, job.lease_token),
+            )
+            return cur.rowcount == 1
+
+        return self._tx(run)
+
+    def acquire_host(self, host: str, rate: float, burst: int = 1) -> float:
+        """
+        Общий для всех воркеров token bucket хоста (в той же базе): 0 — токен взят,
+        иначе сколько ждать до следующей попытки. Так N воркеров вместе не превышают лимит хоста.
+        """
+        now = time.time()
+
+        def run(db: sqlite3.Connection) -> float:
+            row = db.execute("SELECT tokens, updated FROM host_buckets WHERE host = ?", (host,)).fetchone()
+            tokens = float(burst) if row is None else min(float(burst), row[0] + (now - row[1]) * rate)
+            wait = 0.0
+            if tokens >= 1.0:
+                tokens -= 1.0
+            else:
+                wait = (1.0 - tokens) / rate
+            db.execute("INSERT OR REPLACE INTO host_buckets (host, tokens, updated) VALUES (?, ?, ?)", (host, tokens, now))
+            return wait
+
+        return self._tx(run)
+
+    # --- статистика -----------------------------------------------------------------
+
+    def record_worker(self, worker: str, **deltas: float) -> None:
+        """Накопительные счётчики воркера: jobs_done, jobs_failed, leases_lost, items_*, ingested, busy_s."""
+        now = time.time()
+        cols = [c for c in deltas if c in _WORKER_COUNTERS]
+
+        def run(db: sqlite3.Connection) -> None:
+            db.execute("INSERT OR IGNORE INTO workers (worker, started_at, last_seen) VALUES (?, ?, ?)", (worker, now, now))
+            sets = ", ".join(f"{c} = {c} + ?" for c in cols)
+            db.execute(
+                f"UPDATE workers SET last_seen = ?{', ' + sets if sets else ''} WHERE worker = ?",
+                [now] + [deltas[c] for c in cols] + [worker],
+            )
+
+        self._tx(run)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            by_status = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            ready = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased') AND visible_at <= ?", (now,)
+            ).fetchone()[0]
+            by_kind = {
+                k: dict(zip(("queued", "leased", "done", "dead"), rest))
+                for k, *rest in self._db.execute(
+                    "SELECT kind, SUM(status = 'queued'), SUM(status = 'leased'), SUM(status = 'done'), SUM(status = 'dead') "
+                    "FROM jobs GROUP BY kind"
+                ).fetchall()
+            }
+        return {"by_status": by_status, "ready": ready, "by_kind": by_kind}
+
+    def worker_stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._db.execute("SELECT * FROM workers ORDER BY started_at")
+            names = [d[0] for d in cur.description]
+            rows = [dict(zip(names, r)) for r in cur.fetchall()]
+        for r in rows:
+            up = max(r["last_seen"] - r["started_at"], 1e-9)
+            r["uptime_s"] = round(up, 1)
+            r["jobs_per_min"] = round(r["jobs_done"] * 60.0 / up, 2)
+            r["items_per_s"] = round(r["items_fetched"] / up, 2)
+            # доля времени в работе (не в ожидании задач/токенов)
+            r["utilization"] = round(min(1.0, r["busy_s"] / up), 2)
+            r["busy_s"] = round(r["busy_s"], 1)
+        return rows
+
+    def purge(self, older_than_s: float = 7 * 86400) -> int:
+        """Удалить давно выполненные и забранные задачи."""
+        cutoff = time.time() - older_than_s
+
+        def run(db: sqlite3.Connection) -> int:
+            return db.execute("DELETE FROM jobs WHERE status = 'done' AND harvested = 1 AND updated_at < ?", (cutoff,)).rowcount
+
+        return self._tx(run)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_WORKER_COUNTERS = frozenset({"jobs_done", "jobs_failed", "leases_lost", "items_fetched", "items_sent", "ingested", "busy_s"})
+
+
+def open_default() -> WorkQueue:
+    return WorkQueue(os.getenv("HUNTER_WORK_QUEUE", DEFAULT_PATH))
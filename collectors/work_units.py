@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from collectors.checkpoints import REDDIT_STALE_CURSOR_S, SE_KNOWN_MAX, CheckpointStore, hn_advance, hn_drop_seen, hn_merge_summary, hn_summary, hn_window
+from collectors.hn_algolia import fetch_hn_page
+from collectors.pipeline import NormalizedItem
+from collectors.reddit_public import fetch_posts
+from collectors.sources import hn_item, reddit_item, se_item
+from collectors.stackexchange import IDS_PER_CALL, fetch_bodies, list_questions_page
+
+# единица работы = один HTTP-запрос к источнику (SE: страница id + запрос тел)
+HOSTS = {"reddit": "www.reddit.com", "hn": "hn.algolia.com", "stackexchange": "api.stackexchange.com"}
+# пороги длины — как в collect-скриптах
+MIN_CHARS = {"reddit": 40, "hn": 0, "stackexchange": 80}
+
+Unit = Tuple[str, Dict[str, Any], str]  # (kind, payload, dedupe_key)
+# ключ результата единицы, выполненной воркером в --dry-run: курсоры по нему не двигаются
+DRY_RUN_RESULT = "dry_run"
+
+
+# --- продюсер: единицы из курсоров --------------------------------------------------
+
+def reddit_unit(sr: str, limit: int, store: CheckpointStore) -> Unit:
+    cur = store.get("reddit", sr)
+    before = cur.get("before")
+    # протухший курсор reddit молча отдаёт пустой список — берём свежие limit постов, дубли срежет dedup
+    if before and time.time() - int(cur.get("created_utc") or 0) > REDDIT_STALE_CURSOR_S:
+        before = None
+    return "reddit", {"subreddit": sr, "limit": limit, "before": before}, f"reddit:{sr}"
+
+
+def hn_units(query: str, pages: int, hits_per_page: int, store: CheckpointStore) -> List[Unit]:
+    win = hn_window(store.get("hn", query))
+    return [
+        ("hn", {"query": query, "page": page, "hits_per_page": hits_per_page, "window": win}, f"hn:{query}:{page}")
+        for page in range(pages)
+    ]
+
+
+def se_units(spec: str, pages: int, pagesize: int, store: CheckpointStore) -> List[Unit]:
+    site, _, tagged = spec.partition(":")
+    tagged = tagged or "python"
+    cur = store.get("stackexchange", f"{site}:{tagged}")
+    since = int(cur.get("last_activity_at") or 0) or None
+    # known_activity для воркера: min= отдаёт только активность >= since, вопросы старше since
+    # с новой активностью и так незнакомы — в payload хватает записей не старше курсора
+    known = {k: int(v) for k, v in (cur.get("activity") or {}).items() if since is None or int(v) >= since}
+    return [
+        (
+            "stackexchange",
+            {"site": site, "tagged": tagged, "page": page, "pagesize": pagesize, "min_activity": since, "query": spec, "known": known},
+            f"se:{spec}:{page}",
+        )
+        for page in range(1, pages + 1)
+    ]
+
+
+# --- воркер: выполнение единицы ------------------------------------------------------
+
+def run_unit(kind: str, p: Dict[str, Any], throttle: Callable[[int], None] = lambda n: None) -> Tuple[List[NormalizedItem], Dict[str, Any]]:
+    """
+    -> (элементы, результат для курсора). Исключения — на вызывающем (nack + повтор).
+    throttle(n) вызывается перед каждыми n HTTP-запросами к хосту единицы (лимит хоста, продление аренды).
+    """
+    throttle(1)
+    if kind == "reddit":
+        posts = fetch_posts(subreddit=p["subreddit"], limit=int(p["limit"]), sort="new", sleep_s=0.0, before=p.get("before"))
+        items = [x for x in (reddit_item(post, p["subreddit"]) for post in posts) if x is not None]
+        newest = max((post for post in posts if post.fullname), key=lambda post: post.created_utc, default=None)
+        result: Dict[str, Any] = {"fetched": len(posts)}
+        if newest is not None:
+            result.update(before=newest.fullname, created_utc=newest.created_utc)
+        return items, result
+    if kind == "hn":
+        win = p["window"]
+        hits = fetch_hn_page(p["query"], page=int(p["page"]), hits_per_page=int(p["hits_per_page"]), since=win["since"], until=win["until"])
+        summary = hn_summary(hits, tail=len(hits) < int(p["hits_per_page"]))
+        hits = hn_drop_seen(hits, win)
+        return [hn_item(h) for h in hits], {"fetched": len(hits), "summary": summary}
+    if kind == "stackexchange":
+        listed, _ = list_questions_page(p["site"], p["tagged"], int(p["page"]), pagesize=int(p["pagesize"]), min_activity=p.get("min_activity"))
+        # тела — только вопросам с новой активностью (как known_activity в se_questions_since)
+        known = p.get("known") or {}
+        todo = [qid for qid, ts in listed.items() if known.get(str(qid)) != ts]
+        qs: List[Any] = []
+        if todo:
+            throttle((len(todo) + IDS_PER_CALL - 1) // IDS_PER_CALL)
+            qs = fetch_bodies(p["site"], todo, query=p.get("query"))
+        return [se_item(q) for q in qs], {
+            "fetched": len(qs),
+            "unchanged": len(listed) - len(todo),
+            "last_activity_at": max(listed.values(), default=0),
+            "activity": {str(qid): listed[qid] for qid in todo},
+        }
+    raise ValueError(f"unknown work unit kind: {kind}")
+
+
+# --- продюсер: результаты -> курсоры -----------------------------------------------------
+
+def fold_result(kind: str, p: Dict[str, Any], result: Dict[str, Any], store: CheckpointStore) -> None:
+    """
+    Курсоры двигает только продюсер: воркеры ничего не пишут в checkpoints (их файл не общий).
+    Результат dry-run (DRY_RUN_RESULT) пропускается: его элементы не отправлены, их перечитает следующая единица.
+    """
+    if result.get(DRY_RUN_RESULT):
+        return
+    if kind == "reddit":
+        key = p["subreddit"]
+        if result.get("before") and int(result.get("created_utc") or 0) >= int(store.get("reddit", key).get("created_utc") or 0):
+            store.update("reddit", key, before=result["before"], created_utc=int(result["created_utc"]))
+    elif kind == "hn":
+        key = p["query"]
+        cur = store.get("hn", key)
+        pending = cur.get("pending") or {}
+        # единица от старого окна (уже начато следующее) — курсор не трогаем, её истории просто перечитаются
+        if p["window"] in (hn_window(cur), pending.get("window")):
+            summary = result.get("summary") or {}
+            if pending.get("window") == p["window"]:
+                summary = hn_merge_summary(pending["summary"], summary)
+            # страницы окна приходят в любом порядке: решение принимается по сводке всех уже сданных
+            store.update("hn", key, pending={"window": p["window"], "summary": summary}, **hn_advance(p["window"], summary))
+    elif kind == "stackexchange":
+        key = f"{p['site']}:{p['tagged']}"
+        cur = store.get("stackexchange", key)
+        newest = max(int(result.get("last_activity_at") or 0), int(cur.get("last_activity_at") or 0))
+        # единицы сдаются в любом порядке: по каждому вопросу остаётся самая поздняя активность
+        known = {k: int(v) for k, v in (cur.get("activity") or {}).items()}
+        for k, v in (result.get("activity") or {}).items():
+            known[k] = max(int(v), known.get(k, 0))
+        recent = sorted(known.items(), key=lambda kv: kv[1], reverse=True)[:SE_KNOWN_MAX]
+        store.update("stackexchange", key, last_activity_at=newest, activity=dict(recent))
+    else:
+        return
+    store.note(kind, key, fetched=int(result.get("fetched") or 0), skipped=int(result.get("unchanged") or 0))
@@ -2,7 +2,9 @@
 from __future__ import annotations
 
 import re
-from typing import Iterable, Dict, Any, List
+from typing import Iterable, Dict, Any, Callable, List, Optional
+
+from core.heavy_hitters import SpaceSaving
 
 WS_RE = re.compile(r"\s+")
 NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
@@ -32,6 +34,10 @@ def simple_topic_key(text: str) -> str:
     return "_".join(parts[:6]) if parts else "misc"
 
 
+def task_key(t: Any) -> str:
+    return f"{t.domain}|{t.intent}|{t.output_type}|{simple_topic_key(t.problem_statement)}"
+
+
 def cluster_by_key(tasks: Iterable[Any], sample_size: int = 3) -> List[Dict[str, Any]]:
     """
     Fallback кластеризация, если тебе нужно быстро "что-то сгруппировать".
@@ -40,7 +46,7 @@ def cluster_by_key(tasks: Iterable[Any], sample_size: int = 3) -> List[Dict[str,
     buckets: Dict[str, Dict[str, Any]] = {}
 
     for t in tasks:
-        key = f"{t.domain}|{t.intent}|{t.output_type}|{simple_topic_key(t.problem_statement)}"
+        key = task_key(t)
         b = buckets.get(key)
         if not b:
             b = {
@@ -62,6 +68,89 @@ def cluster_by_key(tasks: Iterable[Any], sample_size: int = 3) -> List[Dict[str,
     return sorted(buckets.values(), key=lambda x: x["count"], reverse=True)
 
 
+class StreamingKeyClusters:
+    """
+    Потоковый вариант cluster_by_key с ограниченной памятью: частоты ключей
+    ведёт SpaceSaving(k), примеры хранятся только для отслеживаемых ключей.
+    count в результате — оценка сверху, error — на сколько она может
+    завышать (истина в [count - error, count]).
+    Частичные результаты воркеров сливаются через merge().
+    """
+
+    def __init__(self, k: int = 1000, sample_size: int = 3):
+        self.sketch = SpaceSaving(k)
+        self.sample_size = sample_size
+        self.examples: Dict[str, List[str]] = {}
+
+    def add(self, t: Any) -> None:
+        key = task_key(t)
+        evicted = self.sketch.update(key)
+        if evicted is not None:
+            self.examples.pop(evicted, None)
+        ex = self.examples.setdefault(key, [])
+        if len(ex) < self.sample_size:
+            ex.append(t.problem_statement)
+
+    def feed(
+        self,
+        tasks: Iterable[Any],
+        snapshot_every: int = 0,
+        on_snapshot: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        top_n: int = 20,
+    ) -> "StreamingKeyClusters":
+        """Прогнать поток; каждые snapshot_every задач отдаёт top_n в on_snapshot."""
+        for i, t in enumerate(tasks, 1):
+            self.add(t)
+            if on_snapshot is not None and snapshot_every and i % snapshot_every == 0:
+                on_snapshot(self.top(top_n))
+        return self
+
+    def merge(self, other: "StreamingKeyClusters") -> "StreamingKeyClusters":
+        self.sketch.merge(other.sketch)
+        merged: Dict[str, List[str]] = {}
+        for key, _, _ in self.sketch.top():
+            ex = (self.examples.get(key) or []) + (other.examples.get(key) or [])
+            merged[key] = ex[: self.sample_size]
+        self.examples = merged
+        return self
+
+    def top(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        out = []
+        for key, count, error in self.sketch.top(n):
+            domain, intent, output_type, topic = key.split("|", 3)
+            out.append(
+                {
+                    "key": key,
+                    "domain": domain,
+                    "intent": intent,
+                    "output_type": output_type,
+                    "topic": topic,
+                    "count": count,
+                    "error": error,
+                    "examples": list(self.examples.get(key) or []),
+                }
+            )
+        return out
+
+
+def cluster_by_key_streaming(
+    tasks: Iterable[Any],
+    k: int = 1000,
+    sample_size: int = 3,
+    top_n: Optional[int] = None,
+    snapshot_every: int = 0,
+    on_snapshot: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Как cluster_by_key, но память O(k), а не O(число ключей).
+    Пока различных ключей <= k, count точный и результат совпадает с cluster_by_key
+    (плюс поле error=0); дальше — top-k с оценкой ошибки.
+    """
+    sc = StreamingKeyClusters(k=k, sample_size=sample_size)
+    sc.feed(tasks, snapshot_every=snapshot_every, on_snapshot=on_snapshot, top_n=top_n or 20)
+    return sc.top(top_n)
+
+
 import re
 
 WS_RE = re.compile(r"\s+")
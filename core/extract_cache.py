@@ -0,0 +1,221 @@
+# core/extract_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from core.extractor import BATCH_CHUNK_SIZE, Fields, build_task, classify, classify_many
+from core.models import Task
+from core.rule_pack import RulePack, current_pack
+from core.text_analysis import TextAnalysis, TextLike, analyze
+
+
+def rules_version() -> str:
+    """
+    Версия активного rule pack-а (хэш всех таблиц правил).
+    Поменялись правила — поменялась версия, старые ключи кэша перестают
+    совпадать и вытесняются LRU.
+    """
+    return current_pack().version
+
+
+def cache_key(norm: str, version: str) -> str:
+    return hashlib.blake2b(f"{version}\0{norm}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TaskCache:
+    """
+    Ограниченный LRU: digest(rules_version + normalized text) -> поля Task.
+    Хранит только классификацию (intent/input_type/output_type/domain):
+    problem_statement берётся из конкретного текста, а разные тексты
+    с одинаковой нормализацией дают один ключ.
+    """
+
+    def __init__(self, maxsize: int = 50_000, path: Optional[str] = None):
+        self.maxsize = max(0, int(maxsize))
+        self.path = path
+        self._data: "OrderedDict[str, Fields]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # изменений с последнего save(): файл переписывается фоновым потоком, а не в запросе
+        self._dirty = 0
+        self._stop: Optional[threading.Event] = None
+        self._saver: Optional[threading.Thread] = None
+
+    def get(self, key: str) -> Optional[Fields]:
+        with self._lock:
+            v = self._data.get(key)
+            if v is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return v
+
+    def put(self, key: str, value: Fields) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._dirty += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "rules_version": rules_version(),
+            "path": self.path,
+        }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._data.items())
+            dirty, self._dirty = self._dirty, 0
+        payload = {"rules_version": rules_version(), "entries": entries}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty += dirty
+            raise
+
+    def start_autosave(self, interval_s: float) -> None:
+        """Фоновый поток: раз в interval_s сохраняет кэш, если в нём что-то поменялось."""
+        if not self.path or interval_s <= 0 or self._saver is not None:
+            return
+        stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(interval_s):
+                if self._dirty:
+                    try:
+                        self.save()
+                    except OSError:
+                        pass  # повторим на следующем тике
+
+        self._stop = stop
+        self._saver = threading.Thread(target=loop, name="task-cache-autosave", daemon=True)
+        self._saver.start()
+
+    def stop_autosave(self) -> None:
+        """Останавливает поток и дописывает несохранённое (на shutdown)."""
+        if self._stop is not None:
+            self._stop.set()
+        if self._saver is not None:
+            self._saver.join(timeout=5.0)
+        self._stop = self._saver = None
+        if self._dirty:
+            self.save()
+
+    def load(self) -> int:
+        """Поднимает кэш с диска; файл от другой версии правил игнорируется целиком."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if payload.get("rules_version") != rules_version():
+            return 0
+        n = 0
+        for key, value in payload.get("entries") or []:
+            self.put(str(key), tuple(value))  # type: ignore[arg-type]
+            n += 1
+        return n
+
+
+TASK_CACHE = TaskCache(
+    maxsize=int(os.getenv("HUNTER_EXTRACT_CACHE_SIZE", "50000")),
+    path=os.getenv("HUNTER_EXTRACT_CACHE") or None,
+)
+# load()/start_autosave() делает приложение на старте (app/main.py lifespan), не импорт модуля
+AUTOSAVE_S = float(os.getenv("HUNTER_EXTRACT_CACHE_SAVE_S", "60"))
+
+
+def extract_task_cached(text: TextLike, cache: Optional[TaskCache] = None) -> Task:
+    """extract_task через LRU; результат совпадает с extract_task(text)."""
+    if cache is None:
+        cache = TASK_CACHE
+    a = analyze(text)
+    pack = current_pack()
+    key = cache_key(a.norm, pack.version)
+    fields = cache.get(key)
+    if fields is None:
+        fields = classify(a, pack)
+        cache.put(key, fields)
+    return build_task(a.text, fields, pack.version)
+
+
+def classify_many_cached(
+    docs: Sequence[TextAnalysis],
+    pack: Optional[RulePack] = None,
+    workers: Optional[int] = None,
+    cache: Optional[TaskCache] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+) -> List[Fields]:
+    """
+    Поля Task для пачки уже разобранных документов: из кэша берём что есть,
+    промахи классифицируем одним батчем (classify_many, при большом объёме — в пуле процессов,
+    по chunk_size текстов на задачу пула).
+    """
+    if cache is None:
+        cache = TASK_CACHE
+    pack = pack or current_pack()
+    keys = [cache_key(a.norm, pack.version) for a in docs]
+    fields: List[Optional[Fields]] = [cache.get(k) for k in keys]
+
+    miss_idx = [i for i, f in enumerate(fields) if f is None]
+    if miss_idx:
+        computed = classify_many(
+            [docs[i].text for i in miss_idx],
+            normalized=[docs[i].norm for i in miss_idx],
+            workers=workers,
+            chunk_size=chunk_size,
+            pack=pack,
+        )
+        for i, f in zip(miss_idx, computed):
+            fields[i] = f
+            cache.put(keys[i], f)
+    return fields  # type: ignore[return-value]
+
+
+def extract_tasks_cached(
+    texts: Iterable[TextLike],
+    normalized: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+    cache: Optional[TaskCache] = None,
+) -> List[Task]:
+    """extract_tasks через LRU (см. classify_many_cached)."""
+    if normalized is None:
+        docs = [analyze(t) for t in texts]
+    else:
+        docs = [analyze(t, normalized=n) for t, n in zip(texts, normalized)]
+
+    pack = current_pack()
+    fields = classify_many_cached(docs, pack=pack, workers=workers, cache=cache)
+    return [build_task(a.text, f, pack.version) for a, f in zip(docs, fields)]
@@ -1,63 +1,129 @@
 from __future__ import annotations
 
-import re
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
 from core.models import Task
-from core.signal_filter import has_decision_signal
+from core.rule_pack import RulePack, current_pack, pin_pack, register_section
+from core.signal_filter import SignalRules, has_decision_signal, has_decision_signal_norm
+from core.text_analysis import TextLike, analyze
 
-WS_RE = re.compile(r"\s+")
+# Таблицы ниже — встроенные значения секции "extractor" rule pack-а.
 
-def _norm(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = WS_RE.sub(" ", s)
-    return s
+# input_type=image: явные маркеры картинки + вопросы “что на фото” даже без слова photo
+IMAGE_INPUT_HINTS: Tuple[str, ...] = ("photo", "picture", "image", "screenshot", "camera", "scan")
+IMAGE_QUESTION_HINTS: Tuple[str, ...] = ("what is this", "identify", "recognize", "does this look")
 
-def _guess_input_type(t: str) -> str:
-    if any(k in t for k in ("photo", "picture", "image", "screenshot", "camera", "scan")):
-        return "image"
-    # если вопрос явно “что на фото” даже без слова photo
-    if any(k in t for k in ("what is this", "identify", "recognize", "does this look")):
-        return "image"
-    return "text"
-
-def _guess_intent_output_domain(t: str) -> tuple[str, str, str]:
+# (ключи, доп. ключи — нужен хотя бы один из них или пусто, (intent, output_type, domain))
+# порядок важен: срабатывает первое правило
+DOMAIN_RULES: List[Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, str, str]]] = [
     # Food / calories
-    if any(k in t for k in ("calories", "macro", "nutrition", "ingredients")):
-        return ("estimate", "score", "health")
-
+    (("calories", "macro", "nutrition", "ingredients"), (), ("estimate", "score", "health")),
     # Style / outfit / haircut
-    if any(k in t for k in ("outfit", "style", "hairstyle", "haircut", "how do i look")):
-        return ("compare", "recommendation", "style")
+    (("outfit", "style", "hairstyle", "haircut", "how do i look"), (), ("compare", "recommendation", "style")),
+    # Identify living thing: часто хотят “что это и опасно ли”
+    (("plant", "mushroom", "insect", "bug", "snake", "spider"), ("dangerous", "poisonous", "safe"), ("identify", "risk", "nature")),
+    (("plant", "mushroom", "insect", "bug", "snake", "spider"), (), ("identify", "summary", "nature")),
+    # Scam / authenticity
+    (("scam", "fake", "legit", "authentic", "real or fake"), (), ("verify", "verdict", "shopping")),
+    # General “which should I choose”
+    (("which one", "choose", "recommend", "better option"), (), ("choose", "recommendation", "general")),
+]
 
-    # Identify living thing
-    if any(k in t for k in ("plant", "mushroom", "insect", "bug", "snake", "spider")):
-        # часто хотят “что это и опасно ли”
-        if any(k in t for k in ("dangerous", "poisonous", "safe")):
-            return ("identify", "risk", "nature")
-        return ("identify", "summary", "nature")
+# fallback: decision but unclear
+FALLBACK = ("understand", "summary", "general")
 
-    # Scam / authenticity
-    if any(k in t for k in ("scam", "fake", "legit", "authentic", "real or fake")):
-        return ("verify", "verdict", "shopping")
+class ExtractorRules(NamedTuple):
+    image_input_hints: Tuple[str, ...]
+    image_question_hints: Tuple[str, ...]
+    domain_rules: Tuple[Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, str, str]], ...]
+    fallback: Tuple[str, str, str]
 
-    # General “which should I choose”
-    if any(k in t for k in ("which one", "choose", "recommend", "better option")):
-        return ("choose", "recommendation", "general")
 
-    # fallback: decision but unclear
-    return ("understand", "summary", "general")
+def _compile(sec: Dict[str, Any]) -> ExtractorRules:
+    rules = []
+    for r in sec["domain_rules"]:
+        intent, output_type, domain = r["result"]
+        rules.append((tuple(r["any"]), tuple(r.get("also") or ()), (intent, output_type, domain)))
+    intent, output_type, domain = sec["fallback"]
+    return ExtractorRules(
+        image_input_hints=tuple(sec["image_input_hints"]),
+        image_question_hints=tuple(sec["image_question_hints"]),
+        domain_rules=tuple(rules),
+        fallback=(intent, output_type, domain),
+    )
+
+
+register_section(
+    "extractor",
+    {
+        "image_input_hints": IMAGE_INPUT_HINTS,
+        "image_question_hints": IMAGE_QUESTION_HINTS,
+        "domain_rules": [{"any": k, "also": also, "result": r} for k, also, r in DOMAIN_RULES],
+        "fallback": FALLBACK,
+    },
+    _compile,
+)
+
+# с какого числа уникальных текстов classify_many раскидывает работу по процессам.
+# Один документ в процессе — ~10 мкс (bench_classifiers --only batch, 20k docs:
+# classify_many 0.18s), а старт пула + пиклинг чанков стоят ~0.1-0.2s, так что
+# пул окупается только на сотнях тысяч документов и при нескольких ядрах.
+BATCH_POOL_THRESHOLD = 100_000
+BATCH_CHUNK_SIZE = 10_000
 
-def extract_task(text: str) -> Task:
-    t = _norm(text)
+Fields = Tuple[str, str, str, str]
 
+def _guess_input_type(t: str, rules: ExtractorRules) -> str:
+    if any(k in t for k in rules.image_input_hints):
+        return "image"
+    if any(k in t for k in rules.image_question_hints):
+        return "image"
+    return "text"
+
+def _guess_intent_output_domain(t: str, rules: ExtractorRules) -> tuple[str, str, str]:
+    for keys, also, result in rules.domain_rules:
+        if any(k in t for k in keys) and (not also or any(k in t for k in also)):
+            return result
+    return rules.fallback
+
+def _fields(t: str, rules: ExtractorRules, decision: bool) -> Fields:
     # даже если текст странный — создадим задачу, но domain/intent будут общими
-    input_type = _guess_input_type(t)
-    intent, output_type, domain = _guess_intent_output_domain(t)
+    input_type = _guess_input_type(t, rules)
 
     # если нет decision-сигнала, всё равно отдадим “general understand”,
     # но по проекту такие штуки должны отфильтроваться раньше signal_filter-ом
-    if not has_decision_signal(t):
-        intent, output_type, domain = ("understand", "summary", "general")
+    if decision:
+        intent, output_type, domain = _guess_intent_output_domain(t, rules)
+    else:
+        intent, output_type, domain = rules.fallback
+    return intent, input_type, output_type, domain
+
+def classify(text: TextLike, pack: Optional[RulePack] = None) -> Fields:
+    """(intent, input_type, output_type, domain) без сборки Task."""
+    a = analyze(text)
+    pack = pack or current_pack()
+    return _fields(a.norm, pack.section("extractor"), has_decision_signal(a, pack))
+
+def _classify_norms(norms: Iterable[str], pack: RulePack) -> List[Fields]:
+    """
+    classify() для готовых norm-строк: таблицы берутся из пака один раз на батч,
+    TextAnalysis не строится, одинаковые тексты (репосты, кросспосты) считаются один раз.
+    """
+    rules: ExtractorRules = pack.section("extractor")
+    sig: SignalRules = pack.section("signal_filter")
+    memo: Dict[str, Fields] = {}
+    out: List[Fields] = []
+    for t in norms:
+        f = memo.get(t)
+        if f is None:
+            f = memo[t] = _fields(t, rules, has_decision_signal_norm(t, sig))
+        out.append(f)
+    return out
 
+def build_task(text: str, fields: Tuple[str, str, str, str], rules_version: Optional[str] = None) -> Task:
+    intent, input_type, output_type, domain = fields
     return Task(
         intent=intent,
         input_type=input_type,
@@ -65,4 +131,72 @@ def extract_task(text: str) -> Task:
         domain=domain,
         problem_statement=text.strip(),
         evidence=[text.strip()],
+        rules_version=rules_version,
     )
+
+def extract_task(text: TextLike) -> Task:
+    a = analyze(text)
+    pack = current_pack()
+    return build_task(a.text, classify(a, pack), pack.version)
+
+def _classify_chunk(norms: List[str]) -> List[Fields]:
+    # top-level, чтобы ProcessPoolExecutor мог её запиклить;
+    # пак правил в воркере закреплён через _pin_worker_pack
+    return _classify_norms(norms, current_pack())
+
+def _pin_worker_pack(tables: Dict[str, Dict[str, Any]], source: str) -> None:
+    pin_pack(tables, source)
+
+def classify_many(
+    texts: Sequence[TextLike],
+    normalized: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+    pool_threshold: int = BATCH_POOL_THRESHOLD,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    pack: Optional[RulePack] = None,
+) -> List[Fields]:
+    """
+    classify() для пачки. Классификация зависит только от нормализованного текста,
+    поэтому считается по norm-строкам, а в процессы уходят только уникальные из них.
+    workers=0 — всегда в текущем процессе; None — os.cpu_count() для больших батчей.
+    Весь батч считается одним паком правил (pack или активный на момент вызова).
+    """
+    pack = pack or current_pack()
+    norms = list(normalized) if normalized is not None else [analyze(t).norm for t in texts]
+
+    n_workers = (os.cpu_count() or 1) if workers is None else workers
+    uniq = list(dict.fromkeys(norms))
+    if n_workers <= 1 or len(uniq) <= pool_threshold:
+        return _classify_norms(norms, pack)
+
+    chunks = [uniq[i:i + chunk_size] for i in range(0, len(uniq), chunk_size)]
+    by_norm: Dict[str, Fields] = {}
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_pin_worker_pack,
+        initargs=(pack.tables, pack.source),
+    ) as pool:
+        # map сохраняет порядок чанков
+        for chunk, part in zip(chunks, pool.map(_classify_chunk, chunks)):
+            by_norm.update(zip(chunk, part))
+    return [by_norm[t] for t in norms]
+
+def extract_tasks(
+    texts: Iterable[TextLike],
+    workers: Optional[int] = None,
+    pool_threshold: int = BATCH_POOL_THRESHOLD,
+) -> List[Task]:
+    """
+    Батч-версия extract_task: принимает список или итератор текстов,
+    возвращает Task в том же порядке; результат поэлементно равен extract_task(text).
+    """
+    pack = current_pack()
+    # держим только строки: 20k живых TextAnalysis заметно нагружают GC
+    raw: List[str] = []
+    norms: List[str] = []
+    for t in texts:
+        a = analyze(t)
+        raw.append(a.text)
+        norms.append(a.norm)
+    fields = classify_many(raw, normalized=norms, workers=workers, pool_threshold=pool_threshold, pack=pack)
+    return [build_task(text, f, pack.version) for text, f in zip(raw, fields)]
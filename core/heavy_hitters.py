@@ -0,0 +1,164 @@
+# core/heavy_hitters.py
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving (Metwally et al.): top-k частых ключей потока в O(k) памяти.
+
+    Для каждого отслеживаемого ключа хранится count и error:
+    истинная частота лежит в [count - error, count], а любой ключ
+    с частотой > total / k гарантированно отслеживается.
+    Новый ключ при заполненной таблице вытесняет ключ с минимальным count
+    и наследует его count как error.
+
+    Сводки мержатся (merge), поэтому поток можно поделить между воркерами.
+    """
+
+    def __init__(self, k: int = 1000):
+        if k <= 0:
+            raise ValueError("k must be positive")
+        self.k = k
+        self.total = 0
+        self._counts: Dict[Hashable, int] = {}
+        self._errors: Dict[Hashable, int] = {}
+        # min-heap (count, seq, key) с ленивым удалением: устаревшие записи
+        # (count уже не совпадает) пропускаются при pop и чистятся rebuild-ом
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._counts
+
+    def _push(self, key: Hashable, count: int) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (count, self._seq, key))
+        if len(self._heap) > 4 * self.k + 64:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._heap = [(c, i, key) for i, (key, c) in enumerate(self._counts.items())]
+        heapq.heapify(self._heap)
+        self._seq = len(self._heap)
+
+    def _pop_min(self) -> Tuple[Hashable, int]:
+        while True:
+            c, _, key = heapq.heappop(self._heap)
+            if self._counts.get(key) == c:
+                return key, c
+
+    def min_count(self) -> int:
+        """Нижняя граница count-а отслеживаемых ключей (0, пока таблица не заполнена)."""
+        if len(self._counts) < self.k:
+            return 0
+        while self._heap:
+            c, _, key = self._heap[0]
+            if self._counts.get(key) == c:
+                return c
+            heapq.heappop(self._heap)
+        return 0
+
+    def update(self, key: Hashable, weight: int = 1) -> Optional[Hashable]:
+        """Учесть ключ; возвращает вытесненный ключ (или None), чтобы вызывающий мог выкинуть его данные."""
+        self.total += weight
+        c = self._counts.get(key)
+        if c is not None:
+            self._counts[key] = c + weight
+            self._push(key, c + weight)
+            return None
+
+        if len(self._counts) < self.k:
+            self._counts[key] = weight
+            self._errors[key] = 0
+            self._push(key, weight)
+            return None
+
+        evicted, m = self._pop_min()
+        del self._counts[evicted]
+        del self._errors[evicted]
+        self._counts[key] = m + weight
+        self._errors[key] = m
+        self._push(key, m + weight)
+        return evicted
+
+    def count(self, key: Hashable) -> Tuple[int, int]:
+        """(count, error) для ключа; для неотслеживаемого — (0, min_count())."""
+        if key in self._counts:
+            return self._counts[key], self._errors[key]
+        return 0, self.min_count()
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Hashable, int, int]]:
+        """[(key, count, error)] по убыванию count."""
+        items = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)
+        if n is not None:
+            items = items[:n]
+        return [(key, c, self._errors[key]) for key, c in items]
+
+    def guaranteed(self, n: int) -> List[Hashable]:
+        """
+        Ключи из top(n), которые точно входят в истинный top-n:
+        нижняя граница (count - error) не меньше count-а (n+1)-го ключа.
+        """
+        ranked = self.top(n + 1)
+        if len(ranked) <= n:
+            return [key for key, _, _ in ranked]
+        cut = ranked[n][1]
+        return [key for key, c, e in ranked[:n] if c - e >= cut]
+
+    def error_bound(self) -> float:
+        """Максимальная переоценка count-а любого ключа: total / k."""
+        return self.total / self.k
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Слить другую сводку в эту (Agarwal et al., mergeable summaries).
+        Отсутствующий в заполненной сводке ключ мог встречаться до её min_count
+        раз — это добавляется и к count, и к error; затем оставляем top-k.
+        """
+        m_self, m_other = self.min_count(), other.min_count()
+        counts: Dict[Hashable, int] = {}
+        errors: Dict[Hashable, int] = {}
+        for key in self._counts.keys() | other._counts.keys():
+            c1, e1 = (self._counts[key], self._errors[key]) if key in self._counts else (m_self, m_self)
+            c2, e2 = (other._counts[key], other._errors[key]) if key in other._counts else (m_other, m_other)
+            counts[key] = c1 + c2
+            errors[key] = e1 + e2
+
+        # тай-брейк по ключу: результат не зависит от порядка обхода множеств
+        keep = sorted(counts, key=lambda key: (-counts[key], str(key)))[: self.k]
+        self._counts = {key: counts[key] for key in keep}
+        self._errors = {key: errors[key] for key in keep}
+        self.total += other.total
+        self._rebuild()
+        return self
+
+    def update_many(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            self.update(key)
+
+    def entries(self) -> List[Tuple[Hashable, int, int]]:
+        """[(key, count, error)] в каноническом порядке — для сериализации и сравнения сводок."""
+        return sorted(
+            ((key, c, self._errors[key]) for key, c in self._counts.items()),
+            key=lambda x: (-x[1], str(x[0])),
+        )
+
+    @classmethod
+    def from_entries(cls, k: int, total: int, entries: Iterable[Tuple[Hashable, int, int]]) -> "SpaceSaving":
+        """Восстановить сводку из entries(); больше k записей — не сводка этого k, отказ."""
+        entries = list(entries)
+        if len(entries) > k:
+            raise ValueError(f"sketch has {len(entries)} entries, more than k={k}")
+        ss = cls(k)
+        ss.total = total
+        for key, c, e in entries:
+            ss._counts[key] = c
+            ss._errors[key] = e
+        ss._rebuild()
+        return ss
@@ -4,6 +4,7 @@ from __future__ import annotations
 from typing import Any, Dict, List
 
 from core.models import Idea, Task
+from core.signature import parse_signature
 
 
 def _bucket_title(subtopic: str) -> str:
@@ -98,12 +99,12 @@ def idea_from_radar_item(item: Dict[str, Any]) -> Idea:
     item — элемент из /radar.
     Превращаем его в Idea без LLM: шаблоны + примеры как Tasks.
     """
-    sig = str(item.get("signature", "general|understand|summary|misc|misc"))
-    parts = sig.split("|")
-    domain = parts[0] if len(parts) > 0 else "general"
-    intent = parts[1] if len(parts) > 1 else "understand"
-    output_type = parts[2] if len(parts) > 2 else "summary"
-    subtopic = parts[3] if len(parts) > 3 else "misc"
+    # /radar отдаёт уже разобранные components; строку парсим только для чужих item-ов
+    comp = item.get("components") or parse_signature(str(item.get("signature", "general|understand|summary|misc|misc")))._asdict()
+    domain = comp["domain"]
+    intent = comp["intent"]
+    output_type = comp["output_type"]
+    subtopic = comp["subtopic"]
 
     examples = item.get("examples") or []
     tasks: List[Task] = []
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
-import re
+from typing import Any, Dict
+
+from core.rule_engine import RuleMatcher
+from core.rule_pack import current_pack, register_section
+from core.text_analysis import TextLike, analyze
+
+# Таблицы ниже — встроенные значения секции "labels" rule pack-а.
 
 
 _SUPPORT = [
@@ -37,14 +43,25 @@ _DECISION = [
 ]
 
 
-def classify_need(text: str) -> str:
-    t = (text or "").lower()
+def _compile(sec: Dict[str, Any]) -> RuleMatcher:
+    return RuleMatcher([(r["name"], r["patterns"]) for r in sec["rules"]])
+
+
+# порядок = приоритет: workflow > decision > support
+register_section(
+    "labels",
+    {
+        "rules": [
+            {"name": "workflow_time_saver", "patterns": _WORKFLOW},
+            {"name": "decision_preview", "patterns": _DECISION},
+            {"name": "support_fix", "patterns": _SUPPORT},
+        ],
+    },
+    _compile,
+)
 
-    if any(re.search(p, t) for p in _WORKFLOW):
-        return "workflow_time_saver"
-    if any(re.search(p, t) for p in _DECISION):
-        return "decision_preview"
-    if any(re.search(p, t) for p in _SUPPORT):
-        return "support_fix"
 
-    return "unknown"
+def classify_need(text: TextLike) -> str:
+    t = analyze(text).norm
+    matcher: RuleMatcher = current_pack().section("labels")
+    return matcher.first_rule(t) or "unknown"
@@ -0,0 +1,126 @@
+# core/lsh.py
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+Vector = Dict[int, float]
+
+
+class LSHIndex:
+    """
+    Random-hyperplane LSH (SimHash) над разреженными хэш-векторами.
+
+    Гиперплоскости не хранятся: знак признака idx для плоскости p — бит p
+    в blake2b(seed, idx), так что индекс детерминирован и не зависит от
+    размерности векторизатора. Проекция считается по top_terms самым
+    весомым признакам вектора — центроиды и так обрезаны, а хвост почти
+    не влияет на знак проекции.
+
+    n_tables таблиц по n_bits бит; при поиске в каждой таблице кроме
+    своего бакета проверяются ещё probes соседних (инвертируется один
+    из наименее уверенных битов) — multi-probe вместо лишних таблиц.
+    Кандидаты отдаются по убыванию числа совпавших бакетов, limit
+    обрезает список до самых вероятных.
+
+    Бит совпадает с вероятностью 1 - angle/pi: у документа и центроида его
+    кластера косинус обычно ~0.5, поэтому бит в таблице немного (см.
+    scripts/bench_semantic.py — recall/latency против перебора).
+    """
+
+    def __init__(self, n_tables: int = 12, n_bits: int = 6, top_terms: int = 64, probes: int = 3, seed: int = 0):
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.top_terms = top_terms
+        self.probes = probes
+        self.seed = seed
+        self._planes = n_tables * n_bits
+        self._mask_bytes = (self._planes + 7) // 8
+        self._masks: Dict[int, int] = {}
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(n_tables)]
+        self._codes: Dict[int, List[int]] = {}
+        self.queries = 0
+        self.candidates_total = 0
+
+    def _mask(self, idx: int) -> int:
+        m = self._masks.get(idx)
+        if m is None:
+            d = hashlib.blake2b(f"{self.seed}:{idx}".encode("ascii"), digest_size=self._mask_bytes).digest()
+            m = int.from_bytes(d, "little")
+            if len(self._masks) >= 1 << 20:
+                self._masks.clear()
+            self._masks[idx] = m
+        return m
+
+    def _project(self, vec: Vector) -> List[float]:
+        items = vec.items()
+        if len(vec) > self.top_terms:
+            items = sorted(items, key=lambda kv: abs(kv[1]), reverse=True)[: self.top_terms]
+        proj = [0.0] * self._planes
+        rng = range(self._planes)
+        for idx, w in items:
+            m = self._mask(idx)
+            for p in rng:
+                if (m >> p) & 1:
+                    proj[p] += w
+                else:
+                    proj[p] -= w
+        return proj
+
+    def _split(self, proj: List[float]) -> List[Tuple[int, List[int]]]:
+        # (код таблицы, номера бит по возрастанию |проекции| — кандидаты на флип)
+        out = []
+        b = self.n_bits
+        for t in range(self.n_tables):
+            part = proj[t * b:(t + 1) * b]
+            code = 0
+            for i, x in enumerate(part):
+                if x > 0:
+                    code |= 1 << i
+            weak = sorted(range(b), key=lambda i: abs(part[i]))[: self.probes]
+            out.append((code, weak))
+        return out
+
+    def add(self, key: int, vec: Vector) -> None:
+        """Добавить или переиндексировать (центроид сдвинулся) ключ."""
+        self.remove(key)
+        codes = [code for code, _ in self._split(self._project(vec))]
+        for table, code in zip(self._tables, codes):
+            table.setdefault(code, set()).add(key)
+        self._codes[key] = codes
+
+    def remove(self, key: int) -> None:
+        codes = self._codes.pop(key, None)
+        if codes is None:
+            return
+        for table, code in zip(self._tables, codes):
+            bucket = table.get(code)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[code]
+
+    def candidates(self, vec: Vector, limit: Optional[int] = None) -> List[int]:
+        hits: Counter = Counter()
+        for table, (code, weak) in zip(self._tables, self._split(self._project(vec))):
+            for c in [code] + [code ^ (1 << i) for i in weak]:
+                bucket = table.get(c)
+                if bucket:
+                    hits.update(bucket)
+        out = [k for k, _ in hits.most_common(limit)]
+        self.queries += 1
+        self.candidates_total += len(out)
+        return out
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "keys": len(self._codes),
+            "tables": self.n_tables,
+            "bits": self.n_bits,
+            "queries": self.queries,
+            "avg_candidates": round(self.candidates_total / self.queries, 2) if self.queries else 0.0,
+        }
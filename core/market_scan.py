@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from typing import List, Optional
 from urllib.parse import quote_plus
 
-import requests
+from collectors import http_client
 
 
 @dataclass
@@ -56,7 +56,7 @@ def duckduckgo_lite_search(query: str, max_results: int = 8, timeout: int = 25)
 
     last_debug = ""
     for url in urls:
-        r = requests.get(
+        r = http_client.get(
             url,
             timeout=timeout,
             headers={
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field, AliasChoices, ConfigDict
 
 
@@ -11,6 +11,8 @@ class Task(BaseModel):
     domain: str
     problem_statement: str
     evidence: List[str]
+    # хэш rule pack-а, которым получена разметка (None — задача собрана не extractor-ом)
+    rules_version: Optional[str] = None
 
 
 class Idea(BaseModel):
@@ -3,13 +3,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from collections import Counter, defaultdict
 
 
 @dataclass
 class RadarItem:
-    signature: str
+    signature: Union[str, int]  # int — id из core.signature.SIGNATURES
     count: int
 
     # aggregate metrics
@@ -27,7 +27,19 @@ class RadarItem:
     examples: List[str]
 
 
+# зафиксированное «сейчас» (воспроизводимые прогоны, scripts/bench_offline); None — системные часы
+_pinned_now: Optional[int] = None
+
+
+def pin_now(ts: Optional[int]) -> None:
+    """Считать recency от ts вместо текущего времени (None — вернуть часы)."""
+    global _pinned_now
+    _pinned_now = int(ts) if ts is not None else None
+
+
 def _now_ts() -> int:
+    if _pinned_now is not None:
+        return _pinned_now
     return int(datetime.now(tz=timezone.utc).timestamp())
 
 
@@ -74,26 +86,18 @@ def _pick_label(labels: Iterable[str]) -> str:
     return c.most_common(1)[0][0]
 
 
-def _score_row(row: Dict[str, Any]) -> float:
-    """
-    Композитный скоринг "актуальность/массовость/полезность".
+def recency(age_days: float) -> float:
+    # затухание: свежие важнее
+    return 1.0 / (1.0 + age_days / 14.0)  # 14 дней "половинит" вклад
 
-    row ожидаемо содержит:
-      - view_count (int)
-      - score (votes) (int)  # да, поле часто называется score у тебя
-      - answer_count (int)
-      - is_answered (bool)
-      - days_since_activity (через last_activity_at)
-    """
+
+def score_base(row: Dict[str, Any]) -> float:
+    """Часть score_row без затухания по времени (не меняется, пока не меняется строка)."""
     views = _safe_int(row.get("view_count"), 0)
     votes = _safe_int(row.get("score"), 0)
     answers = _safe_int(row.get("answer_count"), 0)
     is_answered = bool(row.get("is_answered") or False)
 
-    age_days = _age_days_from_ts(_safe_int(row.get("last_activity_at"), 0))
-    # затухание: свежие важнее
-    recency = 1.0 / (1.0 + age_days / 14.0)  # 14 дней "половинит" вклад
-
     # просмотры: логарифм, чтобы 100k не ломали всё
     views_term = (views + 1) ** 0.35  # мягче, чем log, но без math
     votes_term = max(votes, 0) * 2.0 + (abs(min(votes, 0)) * -1.0)  # штраф за минуса
@@ -105,18 +109,32 @@ def _score_row(row: Dict[str, Any]) -> float:
     # если нет метрик вообще — пусть будет маленький, но не ноль
     if views == 0 and votes == 0 and answers == 0:
         base = 1.0
+    return base
 
-    return base * recency
+
+def score_row(row: Dict[str, Any]) -> float:
+    """
+    Композитный скоринг "актуальность/массовость/полезность".
+
+    row ожидаемо содержит:
+      - view_count (int)
+      - score (votes) (int)  # да, поле часто называется score у тебя
+      - answer_count (int)
+      - is_answered (bool)
+      - days_since_activity (через last_activity_at)
+    """
+    return score_base(row) * recency(_age_days_from_ts(_safe_int(row.get("last_activity_at"), 0)))
 
 
 def build_radar(
     items: List[Dict[str, Any]],
     min_count: int = 2,
     limit: int = 30,
+    facets: Optional[Callable[[Union[str, int]], Optional[Tuple[List[str], List[str]]]]] = None,
 ) -> List[RadarItem]:
     """
     items: список "тасков" (или строк), где у каждой есть как минимум:
-      - signature: str
+      - signature: str или int (id интернированной сигнатуры — группировка дешевле)
       - text: str (пример/проблема)
       - tags: list[str]
       - source: str
@@ -124,12 +142,18 @@ def build_radar(
       - view_count / score / answer_count / is_answered (могут отсутствовать)
       - label (опционально)
 
+    facets(signature) -> (tags_top, sources) или None: готовые топы
+    (например, из Space-Saving sketch-ей core.radar_state) вместо точных
+    Counter-ов по всем тегам всех строк.
+
     Возвращает агрегированные RadarItem по signature.
     """
-    buckets: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    buckets: Dict[Union[str, int], List[Dict[str, Any]]] = defaultdict(list)
 
     for row in items or []:
-        sig = (row.get("signature") or "").strip()
+        sig = row.get("signature") or ""
+        if isinstance(sig, str):
+            sig = sig.strip()
         if not sig:
             continue
         buckets[sig].append(row)
@@ -157,27 +181,31 @@ def build_radar(
         label = _pick_label((str(r.get("label") or "unknown") for r in rows))
 
         # tags + sources
-        tag_counter = Counter()
-        src_counter = Counter()
-        for r in rows:
-            src = (r.get("source") or "unknown").strip()
-            if src:
-                src_counter[src] += 1
-            tags = r.get("tags") or []
-            if isinstance(tags, list):
-                for t in tags:
-                    t = str(t).strip().lower()
-                    if t:
-                        tag_counter[t] += 1
-
-        tags_top = [t for t, _ in tag_counter.most_common(8)]
-        sources = [s for s, _ in src_counter.most_common(5)]
+        ready = facets(sig) if facets is not None else None
+        if ready is not None:
+            tags_top, sources = ready
+        else:
+            tag_counter = Counter()
+            src_counter = Counter()
+            for r in rows:
+                src = (r.get("source") or "unknown").strip()
+                if src:
+                    src_counter[src] += 1
+                tags = r.get("tags") or []
+                if isinstance(tags, list):
+                    for t in tags:
+                        t = str(t).strip().lower()
+                        if t:
+                            tag_counter[t] += 1
+
+            tags_top = [t for t, _ in tag_counter.most_common(8)]
+            sources = [s for s, _ in src_counter.most_common(5)]
 
         # score кластера: сумма композитных скорингов строк
-        cluster_score = sum(_score_row(r) for r in rows)
+        cluster_score = sum(score_row(r) for r in rows)
 
         # примеры: топ по score_row
-        ranked_rows = sorted(rows, key=_score_row, reverse=True)
+        ranked_rows = sorted(rows, key=score_row, reverse=True)
         examples: List[str] = []
         for r in ranked_rows[:5]:
             txt = (r.get("text") or "").strip()
@@ -0,0 +1,287 @@
+# core/radar_state.py
+"""
+RadarState — сериализуемый агрегат radar-а по одной сигнатуре.
+
+Шарды (процессы/машины) считают свои RadarState по своим задачам,
+координатор сливает их merge() и отдаёт общий radar. merge ассоциативен
+и коммутативен: числа — суммы, last_ts — max, примеры — top-N по
+(score, text) с дедупом по тексту, tags/sources — SpaceSaving
+(точно ассоциативен, пока различных ключей не больше k; дальше —
+в пределах гарантий Space-Saving).
+
+Скор хранится компонентами: score_base по часовым корзинам last_activity_at
+(целые суммы — шарды складываются точно, в какое бы время ни считались),
+затухание по возрасту применяется на выдаче. Примеры отбираются по
+score_row на момент добавления.
+
+Wire format (big-endian, zlib поверх всего тела):
+    b"RDS2" | u32 число состояний | состояния
+    состояние: str signature | 6 x i64 (count, views, answers, answered,
+    votes_sum, last_ts) | buckets | labels | sketch tags | sketch sources |
+    examples
+    buckets: u32 n + n x (i64 корзина, i64 base_micros)
+    str: u32 длина + utf-8; labels: u32 n + n x (str, i64)
+    sketch: u32 k, i64 total, u32 n + n x (str, i64 count, i64 error)
+    examples: u32 n + n x (i64 score_micros, str text)
+"""
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from core.heavy_hitters import SpaceSaving
+from core.radar import _now_ts
+from core.radar_tree import RadarAgg, row_score_micros
+
+MAGIC = b"RDS2"
+# ширина sketch-ей tags/sources: память O(k) на сигнатуру, ошибка count-а <= total / k
+TOP_K = int(os.getenv("HUNTER_RADAR_SKETCH_K", "64"))
+# k из чужого payload-а: шире — отказ, иначе /radar/merge раздувал бы sketch-и сервера без предела
+MAX_K = max(TOP_K, int(os.getenv("HUNTER_RADAR_SKETCH_MAX_K", "4096")))
+MAX_EXAMPLES = 5
+MAX_EXAMPLE_CHARS = 2200
+# предел распакованного тела /radar/merge: zip-бомба упирается в него, а не в память процесса
+MAX_BYTES = int(os.getenv("HUNTER_RADAR_STATE_MAX_BYTES", str(64 << 20)))
+
+_U32 = struct.Struct(">I")
+_I64 = struct.Struct(">q")
+_NUMS = struct.Struct(">6q")
+_BUCKET = struct.Struct(">2q")
+
+
+class StateKey(NamedTuple):
+    """RadarState.key(): поля по именам, чтобы проверки не зависели от их порядка."""
+    signature: str
+    nums: Tuple[int, ...]
+    labels: Tuple[Tuple[str, int], ...]
+    buckets: Tuple[Tuple[int, int], ...]
+    tags_total: int
+    tags: Tuple[Tuple[str, int, int], ...]
+    sources_total: int
+    sources: Tuple[Tuple[str, int, int], ...]
+    examples: Tuple[Tuple[str, int], ...]
+
+
+class RadarState:
+    def __init__(self, signature: str, top_k: int = TOP_K, max_examples: int = MAX_EXAMPLES):
+        self.signature = signature
+        self.agg = RadarAgg()
+        self.tags = SpaceSaving(top_k)
+        self.sources = SpaceSaving(top_k)
+        self.max_examples = max_examples
+        # text -> score_micros; хранится не больше max_examples лучших
+        self.examples: Dict[str, int] = {}
+
+    def add_row(self, row: Dict[str, Any], score_micros: Optional[int] = None) -> None:
+        # score_micros — только для отбора примеров; скор агрегата считается на выдаче
+        self.agg.add(row)
+
+        src = str(row.get("source") or "unknown").strip()
+        if src:
+            self.sources.update(src)
+        tags = row.get("tags") or []
+        if isinstance(tags, list):
+            for t in tags:
+                t = str(t).strip().lower()
+                if t:
+                    self.tags.update(t)
+
+        txt = str(row.get("text") or "").strip()
+        if txt:
+            if len(txt) > MAX_EXAMPLE_CHARS:
+                txt = txt[:MAX_EXAMPLE_CHARS] + "…"
+            if score_micros is None:
+                score_micros = row_score_micros(row)
+            self._offer_examples({txt: score_micros})
+
+    def _offer_examples(self, items: Dict[str, int]) -> None:
+        ex = dict(self.examples)
+        for txt, sc in items.items():
+            if sc > ex.get(txt, -(1 << 62)):
+                ex[txt] = sc
+        if len(ex) > self.max_examples:
+            # детерминированный top-N: порядок слияния не влияет на результат
+            ex = dict(sorted(ex.items(), key=lambda kv: (-kv[1], kv[0]))[: self.max_examples])
+        self.examples = ex
+
+    def merge(self, other: "RadarState") -> "RadarState":
+        if other.signature != self.signature:
+            raise ValueError(f"cannot merge states of {self.signature!r} and {other.signature!r}")
+        self.agg.merge(other.agg)
+        self.tags.merge(other.tags)
+        self.sources.merge(other.sources)
+        self._offer_examples(other.examples)
+        return self
+
+    def key(self) -> "StateKey":
+        """Каноническое представление — для сравнения состояний (проверки ассоциативности)."""
+        a = self.agg
+        return StateKey(
+            self.signature,
+            (a.count, a.total_views, a.total_answers, a.answered, a.votes_sum, a.last_ts),
+            tuple(sorted(a.labels.items())),
+            tuple(sorted((b, v) for b, v in a.base_micros.items() if v)),
+            self.tags.total, tuple(self.tags.entries()),
+            self.sources.total, tuple(self.sources.entries()),
+            tuple(sorted(self.examples.items(), key=lambda kv: (-kv[1], kv[0]))),
+        )
+
+    def facets(self, tags_n: int = 8, sources_n: int = 5) -> Tuple[List[str], List[str]]:
+        """(tags_top, sources) из sketch-ей — O(k), без прохода по строкам."""
+        return [t for t, _, _ in self.tags.top(tags_n)], [s for s, _, _ in self.sources.top(sources_n)]
+
+    def item(self, now: Optional[int] = None) -> Dict[str, Any]:
+        """Элемент выдачи в формате /radar."""
+        tags_top, sources = self.facets()
+        return {
+            "signature": self.signature,
+            **self.agg.summary(now),
+            "tags_top": tags_top,
+            "sources": sources,
+            "examples": [t for t, _ in sorted(self.examples.items(), key=lambda kv: (-kv[1], kv[0]))],
+        }
+
+
+def merge_states(into: Dict[str, RadarState], states: Iterable[RadarState]) -> Dict[str, RadarState]:
+    for st in states:
+        cur = into.get(st.signature)
+        if cur is None:
+            into[st.signature] = st
+        else:
+            cur.merge(st)
+    return into
+
+
+def radar_from_states(states: Iterable[RadarState], min_count: int = 2, limit: int = 30) -> List[Dict[str, Any]]:
+    now = _now_ts()
+    scored = [(s, s.agg.score_micros_at(now)) for s in states if s.agg.count >= min_count]
+    ranked = sorted(scored, key=lambda x: (x[1], x[0].agg.count), reverse=True)
+    if limit and limit > 0:
+        ranked = ranked[:limit]
+    return [s.item(now) for s, _ in ranked]
+
+
+# --- wire format -------------------------------------------------------------
+
+def _w_str(out: List[bytes], s: str) -> None:
+    b = s.encode("utf-8")
+    out.append(_U32.pack(len(b)))
+    out.append(b)
+
+
+def _w_sketch(out: List[bytes], ss: SpaceSaving) -> None:
+    entries = ss.entries()
+    out.append(_U32.pack(ss.k))
+    out.append(_I64.pack(ss.total))
+    out.append(_U32.pack(len(entries)))
+    for key, c, e in entries:
+        _w_str(out, str(key))
+        out.append(_I64.pack(c))
+        out.append(_I64.pack(e))
+
+
+def encode_states(states: Iterable[RadarState]) -> bytes:
+    states = list(states)
+    out: List[bytes] = [_U32.pack(len(states))]
+    for st in states:
+        a = st.agg
+        _w_str(out, st.signature)
+        out.append(_NUMS.pack(a.count, a.total_views, a.total_answers, a.answered, a.votes_sum, a.last_ts))
+        buckets = sorted((b, v) for b, v in a.base_micros.items() if v)
+        out.append(_U32.pack(len(buckets)))
+        for b, v in buckets:
+            out.append(_BUCKET.pack(b, v))
+        out.append(_U32.pack(len(a.labels)))
+        for label, n in sorted(a.labels.items()):
+            _w_str(out, label)
+            out.append(_I64.pack(n))
+        _w_sketch(out, st.tags)
+        _w_sketch(out, st.sources)
+        out.append(_U32.pack(len(st.examples)))
+        for txt, sc in sorted(st.examples.items(), key=lambda kv: (-kv[1], kv[0])):
+            out.append(_I64.pack(sc))
+            _w_str(out, txt)
+    return MAGIC + zlib.compress(b"".join(out))
+
+
+class _Reader:
+    def __init__(self, buf: bytes):
+        self.buf = buf
+        self.pos = 0
+
+    def unpack(self, st: struct.Struct) -> Tuple:
+        end = self.pos + st.size
+        if end > len(self.buf):
+            raise ValueError("truncated radar state payload")
+        v = st.unpack_from(self.buf, self.pos)
+        self.pos = end
+        return v
+
+    def u32(self) -> int:
+        return self.unpack(_U32)[0]
+
+    def i64(self) -> int:
+        return self.unpack(_I64)[0]
+
+    def text(self) -> str:
+        n = self.u32()
+        end = self.pos + n
+        if end > len(self.buf):
+            raise ValueError("truncated radar state payload")
+        s = self.buf[self.pos:end].decode("utf-8")
+        self.pos = end
+        return s
+
+    def sketch(self) -> SpaceSaving:
+        k = self.u32()
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"sketch width k={k} outside 1..{MAX_K}")
+        total = self.i64()
+        n = self.u32()
+        if n > k:
+            raise ValueError(f"sketch has {n} entries, more than k={k}")
+        entries = [(self.text(), self.i64(), self.i64()) for _ in range(n)]
+        return SpaceSaving.from_entries(k, total, entries)
+
+
+def decode_states(payload: bytes) -> List[RadarState]:
+    if payload[:4] != MAGIC:
+        raise ValueError("not a radar state payload")
+    d = zlib.decompressobj()
+    try:
+        body = d.decompress(payload[4:], MAX_BYTES)
+    except zlib.error as e:
+        raise ValueError(f"corrupted radar state payload: {e}") from e
+    if d.unconsumed_tail:
+        raise ValueError(f"radar state payload exceeds {MAX_BYTES} bytes uncompressed")
+    if not d.eof:
+        raise ValueError("truncated radar state payload")
+    if d.unused_data:
+        raise ValueError("trailing bytes after compressed radar state payload")
+    r = _Reader(body)
+
+    out: List[RadarState] = []
+    for _ in range(r.u32()):
+        st = RadarState(r.text())
+        a = st.agg
+        (a.count, a.total_views, a.total_answers, a.answered, a.votes_sum, a.last_ts) = r.unpack(_NUMS)
+        for _ in range(r.u32()):
+            b, v = r.unpack(_BUCKET)
+            a.base_micros[b] += v
+        for _ in range(r.u32()):
+            label = r.text()
+            a.labels[label] = r.i64()
+        st.tags = r.sketch()
+        st.sources = r.sketch()
+        n = r.u32()
+        if n > st.max_examples:
+            raise ValueError(f"radar state has {n} examples, more than {st.max_examples}")
+        for _ in range(n):
+            sc = r.i64()
+            st.examples[r.text()] = sc
+        out.append(st)
+    if r.pos != len(r.buf):
+        raise ValueError("trailing bytes in radar state payload")
+    return out
@@ -0,0 +1,230 @@
+# core/radar_tree.py
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from core.radar import _age_days_from_ts, _now_ts, _pick_label, _safe_int, recency, score_base, score_row
+
+# уровни иерархии сигнатуры: domain → intent → output → subtopic
+LEVELS = ("domain", "intent", "output", "subtopic")
+
+Path = Tuple[str, ...]
+
+
+# корзина last_activity_at: затухание считается на выдаче по середине корзины
+# (сдвиг возраста <= 30 мин при полупериоде 14 дней)
+ACTIVITY_BUCKET_S = 3600
+
+
+def row_score_micros(row: Dict[str, Any]) -> int:
+    """score_row в целых микро-единицах на текущий момент."""
+    return int(round(score_row(row) * 1_000_000))
+
+
+def row_score_parts(row: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    (корзина активности, score_base в микро-единицах) — от времени не зависят,
+    поэтому remove вычитает ровно то же, что добавил add, а суммы по корзинам
+    детей в int ровно равны родителю при любом порядке add/merge.
+    """
+    ts = _safe_int(row.get("last_activity_at"), 0)
+    bucket = ts // ACTIVITY_BUCKET_S if ts > 0 else 0
+    return bucket, int(round(score_base(row) * 1_000_000))
+
+
+def bucket_recency(bucket: int, now: int) -> float:
+    if bucket <= 0:
+        return recency(_age_days_from_ts(0))
+    ts = bucket * ACTIVITY_BUCKET_S + ACTIVITY_BUCKET_S // 2
+    return recency(max(0, now - ts) / 86400.0)
+
+
+@dataclass
+class RadarAgg:
+    """
+    Сумматорный агрегат узла; add/remove/merge — покомпонентные суммы.
+    Скор хранится компонентами (база по корзинам активности), затухание
+    применяется на выдаче — старые узлы не держат скор момента вставки.
+    """
+    count: int = 0
+    base_micros: Counter = field(default_factory=Counter)
+    total_views: int = 0
+    total_answers: int = 0
+    answered: int = 0
+    votes_sum: int = 0
+    # max не откатывается при remove: "последняя виденная активность"
+    last_ts: int = 0
+    labels: Counter = field(default_factory=Counter)
+
+    def add(self, row: Dict[str, Any], sign: int = 1) -> None:
+        bucket, base = row_score_parts(row)
+        self.count += sign
+        self.base_micros[bucket] += sign * base
+        if not self.base_micros[bucket]:
+            del self.base_micros[bucket]
+        self.total_views += sign * _safe_int(row.get("view_count"), 0)
+        self.total_answers += sign * _safe_int(row.get("answer_count"), 0)
+        self.answered += sign * (1 if row.get("is_answered") else 0)
+        self.votes_sum += sign * _safe_int(row.get("score"), 0)
+        if sign > 0:
+            self.last_ts = max(self.last_ts, _safe_int(row.get("last_activity_at"), 0))
+        label = str(row.get("label") or "unknown")
+        self.labels[label] += sign
+        if self.labels[label] <= 0:
+            del self.labels[label]
+
+    def merge(self, other: "RadarAgg") -> "RadarAgg":
+        self.count += other.count
+        self.base_micros.update(other.base_micros)
+        self.total_views += other.total_views
+        self.total_answers += other.total_answers
+        self.answered += other.answered
+        self.votes_sum += other.votes_sum
+        self.last_ts = max(self.last_ts, other.last_ts)
+        self.labels.update(other.labels)
+        return self
+
+    def score_micros_at(self, now: Optional[int] = None) -> int:
+        now = _now_ts() if now is None else now
+        return int(round(sum(v * bucket_recency(b, now) for b, v in self.base_micros.items())))
+
+    @property
+    def score_micros(self) -> int:
+        return self.score_micros_at()
+
+    @property
+    def score(self) -> float:
+        return self.score_micros / 1_000_000
+
+    def summary(self, now: Optional[int] = None) -> Dict[str, Any]:
+        n = max(self.count, 1)
+        return {
+            "count": self.count,
+            "score": round(self.score_micros_at(now) / 1_000_000, 2),
+            "total_views": self.total_views,
+            "total_answers": self.total_answers,
+            "answered_ratio": round(self.answered / n, 3),
+            "avg_votes": round(self.votes_sum / n, 2),
+            "days_since_activity": round(_age_days_from_ts(self.last_ts), 1),
+            "label": _pick_label(self.labels.elements()),
+        }
+
+
+def parse_level(level: str) -> int:
+    """'domain' / 'domain|intent' / ... -> глубина (1..len(LEVELS))."""
+    names = [x.strip() for x in level.split("|") if x.strip()]
+    if not names or tuple(names) != LEVELS[: len(names)]:
+        raise ValueError(f"level must be a prefix of {'|'.join(LEVELS)}, got {level!r}")
+    return len(names)
+
+
+class RadarTree:
+    """
+    Префиксное дерево агрегатов по компонентам сигнатуры.
+    Каждая задача добавляется во все узлы своего пути, поэтому агрегат
+    (и компоненты скора) узла — ровно сумма агрегатов детей. Узлы каждого уровня
+    лежат в отдельном dict: выдача уровня — O(узлов уровня).
+    """
+
+    def __init__(self):
+        self.root = RadarAgg()
+        self.by_depth: List[Dict[Path, RadarAgg]] = [{} for _ in LEVELS]
+        self.children: Dict[Path, Set[Path]] = {(): set()}
+
+    @staticmethod
+    def path_of(parts: Sequence[str]) -> Path:
+        return tuple(str(p) for p in parts[: len(LEVELS)])
+
+    def add(self, parts: Sequence[str], row: Dict[str, Any]) -> None:
+        path = self.path_of(parts)
+        self.root.add(row)
+        for d in range(1, len(path) + 1):
+            p = path[:d]
+            node = self.by_depth[d - 1].get(p)
+            if node is None:
+                node = self.by_depth[d - 1][p] = RadarAgg()
+                self.children.setdefault(p[:-1], set()).add(p)
+            node.add(row)
+
+    def remove(self, parts: Sequence[str], row: Dict[str, Any]) -> None:
+        """Обратная к add операция (та же row, что при вставке)."""
+        path = self.path_of(parts)
+        self.root.add(row, sign=-1)
+        for d in range(len(path), 0, -1):
+            p = path[:d]
+            node = self.by_depth[d - 1].get(p)
+            if node is None:
+                continue
+            node.add(row, sign=-1)
+            if node.count <= 0:
+                del self.by_depth[d - 1][p]
+                self.children.get(p[:-1], set()).discard(p)
+                self.children.pop(p, None)
+
+    def merge(self, other: "RadarTree") -> "RadarTree":
+        self.root.merge(other.root)
+        for d, nodes in enumerate(other.by_depth):
+            for p, agg in nodes.items():
+                node = self.by_depth[d].get(p)
+                if node is None:
+                    node = self.by_depth[d][p] = RadarAgg()
+                    self.children.setdefault(p[:-1], set()).add(p)
+                node.merge(agg)
+        return self
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def level(self, depth: int, prefix: Optional[Path] = None) -> List[Tuple[Path, RadarAgg]]:
+        nodes = self.by_depth[depth - 1]
+        if not prefix:
+            return list(nodes.items())
+        if len(prefix) == depth - 1:
+            # прямые дети узла — без прохода по всему уровню
+            return [(p, nodes[p]) for p in self.children.get(prefix, ())]
+        return [(p, a) for p, a in nodes.items() if p[: len(prefix)] == prefix]
+
+    def rollup(
+        self,
+        depth: int,
+        prefix: Optional[Path] = None,
+        min_count: int = 1,
+        limit: int = 30,
+        children: int = 5,
+    ) -> List[Dict[str, Any]]:
+        # один момент времени на всю выдачу: скоры узлов сравнимы между собой
+        now = _now_ts()
+        scored = [
+            (path, agg, agg.score_micros_at(now))
+            for path, agg in self.level(depth, prefix)
+            if agg.count >= min_count
+        ]
+        ranked = sorted(scored, key=lambda x: (x[2], x[1].count), reverse=True)
+        if limit and limit > 0:
+            ranked = ranked[:limit]
+
+        out = []
+        for path, agg, _ in ranked:
+            kids = self.children.get(path, set()) if depth < len(LEVELS) else set()
+            kid_aggs = [(k, self.by_depth[depth][k]) for k in kids]
+            kid_nodes = sorted(
+                ((k, a.score_micros_at(now), a) for k, a in kid_aggs),
+                key=lambda x: x[1],
+                reverse=True,
+            )
+            out.append(
+                {
+                    "path": "|".join(path),
+                    "level": LEVELS[depth - 1],
+                    **dict(zip(LEVELS, path)),
+                    **agg.summary(now),
+                    "children_count": len(kids),
+                    "children": [
+                        {"name": k[-1], "count": a.count, "score": round(sc / 1_000_000, 2)}
+                        for k, sc, a in kid_nodes[: max(0, children)]
+                    ],
+                }
+            )
+        return out
@@ -0,0 +1,162 @@
+# core/rule_engine.py
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+def _has_top_level_alt(pattern: str) -> bool:
+    """Есть ли в паттерне "|" вне групп и классов: такой паттерн нельзя хвостом подвесить под общий \\b."""
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if in_class:
+            if c == "]":
+                in_class = False
+        elif c == "[":
+            in_class = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+class RuleMatcher:
+    """
+    Таблица правил [(rule_name, [regex, ...]), ...], скомпилированная в одну
+    альтернацию с именованными группами. Текст сканируется одним регэкспом,
+    а не len(patterns) отдельными re.search.
+
+    Семантика совпадает с "для каждого паттерна: re.search(p, text)":
+      - после матча продолжаем поиск со start+1, а не с end, поэтому
+        жадные паттерны вида "a.*b" не прячут паттерны внутри своего матча;
+      - в позиции матча альтернация вернула первый сработавший паттерн,
+        значит паттерны левее него (в порядке альтернации) здесь не матчатся —
+        досматриваем только те, что правее (и ещё не найдены).
+    Паттерны, начинающиеся с \\b, собираются под общий префикс "\\b(?=\\w)(?:...)":
+    движок re не умеет сам выносить общий префикс альтернации, а без этого
+    в каждой позиции текста перебираются все альтернативы.
+    Паттерны не должны использовать нумерованные backreference (\\1 и т.п.):
+    после склейки номера групп сдвигаются.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, Sequence[str]]], flags: int = 0):
+        self.rule_names: List[str] = [name for name, _ in rules]
+        # pattern index -> rule name
+        self._owner: List[str] = []
+        self._single: List[re.Pattern[str]] = []
+        word_start: List[str] = []
+        boundary: List[str] = []
+        other: List[str] = []
+        word_idx: List[int] = []
+        boundary_idx: List[int] = []
+        other_idx: List[int] = []
+        rules_flat: List[str] = []
+        for name, pats in rules:
+            for p in pats:
+                idx = len(self._owner)
+                rules_flat.append(p)
+                self._owner.append(name)
+                self._single.append(re.compile(p, flags))
+                hoist = p.startswith(r"\b") and not _has_top_level_alt(p)
+                # первая буква обязательна (не "\ba?...") — матч начинается именно с неё
+                if hoist and len(p) > 2 and p[2].isalnum() and p[3:4] not in ("?", "*", "{"):
+                    word_start.append(f"(?P<p{idx}>{p[2:]})")
+                    word_idx.append(idx)
+                elif hoist:
+                    boundary.append(f"(?P<p{idx}>{p[2:]})")
+                    boundary_idx.append(idx)
+                else:
+                    other.append(f"(?P<p{idx}>{p})")
+                    other_idx.append(idx)
+
+        parts: List[str] = []
+        if word_start:
+            parts.append(r"\b(?=\w)(?:" + "|".join(word_start) + ")")
+        if boundary:
+            parts.append(r"\b(?:" + "|".join(boundary) + ")")
+        if other:
+            parts.append("|".join(other))
+
+        # порядок альтернатив в склеенном регэкспе (не совпадает с порядком таблицы)
+        self._order: List[int] = word_idx + boundary_idx + other_idx
+        self._rank: Dict[str, int] = {f"p{idx}": r for r, idx in enumerate(self._order)}
+        self._rx = re.compile("|".join(parts), flags) if parts else None
+
+        # для досмотра в позиции матча: паттерны "\bслово..." могут начаться
+        # только на своей первой букве, остальные проверяем всегда
+        fold = bool(flags & re.IGNORECASE)
+        first: Dict[int, str] = {}
+        for idx in word_idx:
+            c = rules_flat[idx][2]
+            first[idx] = c.lower() if fold else c
+        self._fold = fold
+        self._follow_by_char: List[Dict[str, List[int]]] = []
+        self._follow_any: List[List[int]] = []
+        for r in range(len(self._order)):
+            later = self._order[r + 1:]
+            always = [j for j in later if j not in first]
+            by_char: Dict[str, List[int]] = {}
+            for c in {first[j] for j in later if j in first}:
+                by_char[c] = [j for j in later if first.get(j, c) == c]
+            self._follow_by_char.append(by_char)
+            self._follow_any.append(always)
+
+    def matched(self, text: str, stop_rule: str | None = None) -> Set[int]:
+        """
+        Индексы паттернов, которые встречаются в тексте хотя бы раз.
+        stop_rule — прекратить сканирование, как только сработал паттерн этого правила.
+        """
+        found: Set[int] = set()
+        rx = self._rx
+        if rx is None or not text:
+            return found
+
+        total = len(self._single)
+        owner = self._owner
+        pos = 0
+        while len(found) < total:
+            m = rx.search(text, pos)
+            if m is None:
+                break
+            start = m.start()
+            rank = self._rank[m.lastgroup]  # type: ignore[index]
+            found.add(self._order[rank])
+
+            c = text[start]
+            if self._fold:
+                c = c.lower()
+            follow = self._follow_by_char[rank].get(c) or self._follow_any[rank]
+            for j in follow:
+                if j not in found and self._single[j].match(text, start):
+                    found.add(j)
+
+            if stop_rule is not None and any(owner[j] == stop_rule for j in found):
+                break
+            pos = start + 1
+        return found
+
+    def hits(self, text: str) -> Dict[str, int]:
+        """Сколько разных паттернов каждого правила встретилось в тексте."""
+        out = {name: 0 for name in self.rule_names}
+        for idx in self.matched(text):
+            out[self._owner[idx]] += 1
+        return out
+
+    def first_rule(self, text: str) -> str | None:
+        """Первое (по порядку таблицы) правило, у которого есть хотя бы один матч."""
+        if not self.rule_names:
+            return None
+        found = self.matched(text, stop_rule=self.rule_names[0])
+        if not found:
+            return None
+        return self._owner[min(found)]
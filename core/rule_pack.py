@@ -0,0 +1,251 @@
+# core/rule_pack.py
+r"""
+Rule pack — версия всех keyword/regex таблиц классификаторов.
+
+Каждый модуль с правилами (signal_filter, extractor, signature, labels,
+topic_rules, subtopics) регистрирует свою секцию: встроенные значения
+по умолчанию + функцию, которая компилирует секцию в то, что нужно на
+горячем пути (tuple, RuleMatcher, индекс якорей ...).
+
+Файл(ы) из HUNTER_RULES (JSON или YAML; файл или папка с файлами)
+переопределяют ключи секций. Пак собирается и компилируется целиком,
+и только потом атомарно подменяет активный — запросы в процессе
+дорабатывают на старом паке. version — хэш итоговых таблиц, им
+штампуются Task и ключи кэша extract_task.
+
+Формат файла — секции и ключи те же, что в register_section модулей:
+
+    signal_filter:
+      decision_hints: ["what is this", "identify", ...]
+    labels:
+      rules:
+        - {name: workflow_time_saver, patterns: ['\bworkflow\b']}
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+RULE_MODULES = (
+    "core.signal_filter",
+    "core.extractor",
+    "core.signature",
+    "core.labels",
+    "core.topic_rules",
+    "core.subtopics",
+)
+
+RULES_PATH_ENV = "HUNTER_RULES"
+# как часто (сек) проверять mtime файлов правил на горячем пути
+RELOAD_CHECK_S = float(os.getenv("HUNTER_RULES_CHECK_S", "2.0"))
+
+Compiler = Callable[[Dict[str, Any]], Any]
+
+_SECTIONS: Dict[str, Tuple[Dict[str, Any], Compiler]] = {}
+
+
+def _jsonable(v: Any) -> Any:
+    # приводим встроенные таблицы к тому виду, в каком они придут из JSON:
+    # tuple -> list, set -> отсортированный list
+    if isinstance(v, (set, frozenset)):
+        return sorted(_jsonable(x) for x in v)
+    if isinstance(v, (list, tuple)):
+        return [_jsonable(x) for x in v]
+    if isinstance(v, dict):
+        return {str(k): _jsonable(x) for k, x in v.items()}
+    return v
+
+
+def register_section(name: str, defaults: Dict[str, Any], compiler: Compiler) -> None:
+    """Вызывается модулем правил при импорте."""
+    _SECTIONS[name] = (_jsonable(defaults), compiler)
+
+
+@dataclass
+class RulePack:
+    version: str
+    source: str
+    tables: Dict[str, Dict[str, Any]]
+    compiled: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    def section(self, name: str) -> Any:
+        return self.compiled[name]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "sections": sorted(self.tables),
+        }
+
+
+def _import_rule_modules() -> None:
+    for mod in RULE_MODULES:
+        importlib.import_module(mod)
+
+
+def build_pack(overrides: Optional[Dict[str, Any]] = None, source: str = "builtin") -> RulePack:
+    """Встроенные таблицы + overrides -> скомпилированный пак. Ошибки — ValueError, активный пак не трогается."""
+    _import_rule_modules()
+    overrides = overrides or {}
+
+    unknown = sorted(set(overrides) - set(_SECTIONS))
+    if unknown:
+        raise ValueError(f"unknown rule sections: {unknown}")
+
+    tables: Dict[str, Dict[str, Any]] = {}
+    for name, (defaults, _) in _SECTIONS.items():
+        sec = dict(defaults)
+        extra = overrides.get(name) or {}
+        if not isinstance(extra, dict):
+            raise ValueError(f"rule section {name!r} must be a mapping")
+        bad = sorted(set(extra) - set(defaults))
+        if bad:
+            raise ValueError(f"unknown keys in rule section {name!r}: {bad}")
+        sec.update(_jsonable(extra))
+        tables[name] = sec
+
+    canonical = json.dumps(tables, sort_keys=True, ensure_ascii=False)
+    version = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]
+
+    compiled: Dict[str, Any] = {}
+    for name, (_, compiler) in _SECTIONS.items():
+        try:
+            compiled[name] = compiler(tables[name])
+        except Exception as e:
+            raise ValueError(f"rule section {name!r} failed to compile: {type(e).__name__}: {e}") from e
+
+    return RulePack(version=version, source=source, tables=tables, compiled=compiled, loaded_at=time.time())
+
+
+def _rule_files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, n)
+            for n in os.listdir(path)
+            if n.endswith((".json", ".yaml", ".yml"))
+        )
+    return [path]
+
+
+def _read_rule_file(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml  # опциональная зависимость, только для YAML-паков
+        except ImportError as e:
+            raise ValueError(f"{path}: PyYAML is not installed, use JSON or `pip install pyyaml`") from e
+        try:
+            data = yaml.safe_load(raw) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: {e}") from e
+    else:
+        data = json.loads(raw or "{}")
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: rule pack must be a mapping of sections")
+    return data
+
+
+def load_pack(path: str) -> RulePack:
+    """Файлы читаются по алфавиту, более поздний файл переопределяет ключи более раннего."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for fp in _rule_files(path):
+        for sec, values in _read_rule_file(fp).items():
+            if not isinstance(values, dict):
+                raise ValueError(f"{fp}: rule section {sec!r} must be a mapping")
+            merged.setdefault(sec, {}).update(values)
+    return build_pack(merged, source=path)
+
+
+_lock = threading.Lock()
+_active: Optional[RulePack] = None
+_pinned = False
+_last_check = 0.0
+_stamp: Optional[tuple] = None
+_last_error: Optional[str] = None
+
+
+def _rules_path() -> Optional[str]:
+    return os.getenv(RULES_PATH_ENV) or None
+
+
+def _files_stamp(path: str) -> tuple:
+    try:
+        return tuple((fp, os.stat(fp).st_mtime_ns) for fp in _rule_files(path))
+    except OSError:
+        return ()
+
+
+def _load_from_env() -> RulePack:
+    global _stamp
+    path = _rules_path()
+    if not path:
+        _stamp = None
+        return build_pack()
+    _stamp = _files_stamp(path)
+    return load_pack(path)
+
+
+def reload_rules(force: bool = False) -> Dict[str, Any]:
+    """
+    Перечитать правила. Новый пак собирается целиком и подменяет старый
+    одним присваиванием; при ошибке остаётся старый пак, ошибка — в last_error.
+    """
+    global _active, _last_error, _last_check
+    with _lock:
+        _last_check = time.monotonic()
+        path = _rules_path()
+        if not force and _active is not None and path and _files_stamp(path) == _stamp:
+            return {"reloaded": False, **_active.info()}
+        old = _active
+        try:
+            pack = _load_from_env()
+        except (OSError, ValueError) as e:
+            _last_error = f"{type(e).__name__}: {e}"
+            if old is not None:
+                return {"reloaded": False, "error": _last_error, **old.info()}
+            # на старте битый файл правил не должен ронять сервис — работаем на встроенных
+            pack = build_pack()
+            _active = pack
+            return {"reloaded": True, "error": _last_error, **pack.info()}
+        _last_error = None
+        _active = pack
+        return {"reloaded": old is None or old.version != pack.version, **pack.info()}
+
+
+def current_pack() -> RulePack:
+    """Активный пак. Раз в RELOAD_CHECK_S проверяет, не поменялись ли файлы правил."""
+    pack = _active
+    if pack is None:
+        reload_rules(force=True)
+        return _active  # type: ignore[return-value]
+    if not _pinned and _stamp is not None and time.monotonic() - _last_check > RELOAD_CHECK_S:
+        reload_rules()
+        return _active  # type: ignore[return-value]
+    return pack
+
+
+def pin_pack(tables: Dict[str, Dict[str, Any]], source: str) -> None:
+    """
+    Зафиксировать пак по готовым таблицам (воркеры пула процессов получают
+    таблицы родителя, чтобы весь батч считался одной версией правил).
+    """
+    global _active, _pinned
+    pack = build_pack(tables, source=source)
+    with _lock:
+        _active = pack
+        _pinned = True
+
+
+def rules_status() -> Dict[str, Any]:
+    pack = current_pack()
+    return {**pack.info(), "path": _rules_path(), "last_error": _last_error}
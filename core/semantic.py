@@ -0,0 +1,270 @@
+# core/semantic.py
+"""
+Семантическая группировка для радара (альтернатива точной signature).
+
+HashingVectorizer: слова, биграммы слов и char n-граммы внутри слов ->
+разреженный dict {индекс: вес}, индекс — crc32 фичи по модулю 2**bits
+(стабилен между процессами и перезапусками, словарь не хранится).
+
+OnlineKMeans: mini-batch k-means без заранее заданного k — документ
+уходит в ближайший центроид по косинусу или открывает новый кластер,
+пока их меньше max_clusters. Центроиды обрезаются до max_terms фич,
+ключевые слова кластера — ограниченный Counter, поэтому память модели
+не растёт с числом документов. Когда кластеров много, ближайший ищется
+среди кандидатов LSH-индекса по центроидам (core/lsh.py), а не перебором.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.lsh import LSHIndex
+from core.signature import STOP
+from core.text_analysis import TextLike, analyze
+
+# шум, который не должен делать документы похожими
+_STOP = STOP | {
+    "how", "what", "why", "does", "do", "is", "are", "can", "when", "then", "there",
+    "be", "so", "but", "if", "at", "as", "from", "not", "any", "some", "have", "has",
+    "use", "used", "trying", "try", "want", "need", "getting", "get",
+}
+
+Vector = Dict[int, float]
+
+
+class HashingVectorizer:
+    def __init__(
+        self,
+        n_bits: int = 18,
+        char_ngrams: Tuple[int, int] = (3, 4),
+        word_weight: float = 1.0,
+        bigram_weight: float = 0.7,
+        char_weight: float = 0.35,
+    ):
+        self.n_bits = n_bits
+        self.mask = (1 << n_bits) - 1
+        self.char_ngrams = char_ngrams
+        self.word_weight = word_weight
+        self.bigram_weight = bigram_weight
+        self.char_weight = char_weight
+        # crc32 фичи -> (индекс, знак); фичи сильно повторяются между документами
+        self._hash_cache: Dict[str, Tuple[int, float]] = {}
+
+    def _slot(self, feat: str) -> Tuple[int, float]:
+        v = self._hash_cache.get(feat)
+        if v is None:
+            h = zlib.crc32(feat.encode("utf-8"))
+            # старший бит — знак: коллизии гасят друг друга, а не копятся
+            v = (h & self.mask, -1.0 if h >> 31 else 1.0)
+            if len(self._hash_cache) >= 500_000:
+                self._hash_cache.clear()
+            self._hash_cache[feat] = v
+        return v
+
+    def words(self, text: TextLike) -> List[str]:
+        return [t for t in analyze(text).tokens if len(t) > 1 and t not in _STOP]
+
+    def transform_words(self, words: Sequence[str]) -> Vector:
+        counts: Counter = Counter()
+        lo, hi = self.char_ngrams
+        for i, w in enumerate(words):
+            counts["w:" + w] += self.word_weight
+            if i:
+                counts["b:" + words[i - 1] + " " + w] += self.bigram_weight
+            if len(w) >= lo:
+                p = f" {w} "
+                for n in range(lo, hi + 1):
+                    for j in range(len(p) - n + 1):
+                        counts["c:" + p[j:j + n]] += self.char_weight
+
+        vec: Vector = {}
+        for feat, c in counts.items():
+            idx, sign = self._slot(feat)
+            # сублинейный tf: длинное тело не перевешивает за счёт повторов
+            vec[idx] = vec.get(idx, 0.0) + sign * (1.0 + math.log(c) if c > 1 else c)
+        return _normalize(vec)
+
+    def transform(self, text: TextLike) -> Vector:
+        return self.transform_words(self.words(text))
+
+
+def _normalize(vec: Vector) -> Vector:
+    n = math.sqrt(sum(w * w for w in vec.values()))
+    if n == 0.0:
+        return {}
+    return {i: w / n for i, w in vec.items() if w}
+
+
+def _dot(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    get = b.get
+    return sum(w * get(i, 0.0) for i, w in a.items())
+
+
+@dataclass
+class Cluster:
+    id: int
+    centroid: Vector
+    norm: float = 1.0
+    size: int = 0
+    keywords: Counter = field(default_factory=Counter)
+
+
+class OnlineKMeans:
+    def __init__(
+        self,
+        max_clusters: int = 256,
+        threshold: float = 0.3,
+        max_terms: int = 300,
+        keywords_tracked: int = 64,
+        lsh: Optional[LSHIndex] = None,
+        lsh_min_clusters: int = 64,
+    ):
+        self.max_clusters = max_clusters
+        self.threshold = threshold
+        self.max_terms = max_terms
+        self.keywords_tracked = keywords_tracked
+        # на малом числе кластеров перебор дешевле проекции на гиперплоскости
+        self.lsh = lsh
+        self.lsh_min_clusters = lsh_min_clusters
+        self.clusters: Dict[int, Cluster] = {}
+        self._next_id = 1
+        self.docs = 0
+        self.lsh_fallbacks = 0
+
+    def _best(self, vec: Vector, clusters: Iterable[Cluster]) -> Tuple[Optional[int], float]:
+        best, best_sim = None, -1.0
+        for c in clusters:
+            sim = _dot(vec, c.centroid) / c.norm
+            if sim > best_sim:
+                best, best_sim = c.id, sim
+        return best, best_sim
+
+    def nearest(self, vec: Vector, exact: bool = False) -> Tuple[Optional[int], float]:
+        """
+        Ближайший центроид по косинусу. С LSH — только среди кандидатов;
+        если среди них нет никого ближе threshold, досчитываем перебором,
+        прежде чем открывать новый кластер: иначе каждый промах LSH плодил бы
+        дубликат кластера. Перебор нужен только новым темам и промахам.
+        """
+        if exact or self.lsh is None or len(self.clusters) < self.lsh_min_clusters:
+            return self._best(vec, self.clusters.values())
+        best, best_sim = self._best(vec, (self.clusters[cid] for cid in self.lsh.candidates(vec)))
+        if best_sim < self.threshold:
+            self.lsh_fallbacks += 1
+            return self._best(vec, self.clusters.values())
+        return best, best_sim
+
+    def _open(self, vec: Vector) -> int:
+        cid = self._next_id
+        self._next_id += 1
+        self.clusters[cid] = Cluster(id=cid, centroid=dict(vec))
+        if self.lsh is not None:
+            self.lsh.add(cid, vec)
+        return cid
+
+    def assign(self, vec: Vector) -> int:
+        cid, sim = self.nearest(vec)
+        if cid is None or (sim < self.threshold and len(self.clusters) < self.max_clusters):
+            cid = self._open(vec)
+        return cid
+
+    def partial_fit(self, vectors: Sequence[Vector], words: Sequence[Sequence[str]]) -> List[int]:
+        """
+        Один mini-batch: назначение по текущим центроидам (новые кластеры
+        открываются сразу и видны следующим документам батча), затем каждый
+        затронутый центроид сдвигается к среднему своих документов
+        с шагом n_batch / size, как в mini-batch k-means.
+        """
+        ids: List[int] = []
+        sums: Dict[int, Tuple[Vector, int]] = {}
+        for vec, ws in zip(vectors, words):
+            if not vec:
+                ids.append(0)  # пустой текст — вне кластеров
+                continue
+            cid = self.assign(vec)
+            ids.append(cid)
+            acc, n = sums.get(cid, ({}, 0))
+            for i, w in vec.items():
+                acc[i] = acc.get(i, 0.0) + w
+            sums[cid] = (acc, n + 1)
+            self.clusters[cid].keywords.update(set(ws))
+
+        for cid, (acc, n) in sums.items():
+            self._update(self.clusters[cid], acc, n)
+        self.docs += sum(1 for i in ids if i)
+        return ids
+
+    def _update(self, c: Cluster, acc: Vector, n: int) -> None:
+        total = c.size + n
+        keep = c.size / total
+        cen = {i: w * keep for i, w in c.centroid.items()} if c.size else {}
+        for i, w in acc.items():
+            cen[i] = cen.get(i, 0.0) + w / total
+        if len(cen) > self.max_terms:
+            top = sorted(cen.items(), key=lambda kv: abs(kv[1]), reverse=True)[: self.max_terms]
+            cen = dict(top)
+        c.centroid = cen
+        c.size = total
+        c.norm = math.sqrt(sum(w * w for w in cen.values())) or 1.0
+        if self.lsh is not None:
+            self.lsh.add(c.id, cen)  # центроид сдвинулся — переиндексируем
+        if len(c.keywords) > 4 * self.keywords_tracked:
+            c.keywords = Counter(dict(c.keywords.most_common(self.keywords_tracked)))
+
+    def top_keywords(self, cid: int, k: int = 8) -> List[str]:
+        c = self.clusters.get(cid)
+        return [w for w, _ in c.keywords.most_common(k)] if c else []
+
+
+class SemanticIndex:
+    """Векторизатор + кластеризатор за одним локом; обновляется на /extract."""
+
+    def __init__(self, use_lsh: bool = True, **kmeans: Any):
+        self.use_lsh = use_lsh
+        self._kmeans_args = kmeans
+        self.vectorizer = HashingVectorizer()
+        self.model = self._new_model()
+        self._lock = threading.Lock()
+
+    def _new_model(self) -> OnlineKMeans:
+        return OnlineKMeans(lsh=LSHIndex() if self.use_lsh else None, **self._kmeans_args)
+
+    def add_many(self, texts: Sequence[TextLike]) -> List[int]:
+        words = [self.vectorizer.words(t) for t in texts]
+        vectors = [self.vectorizer.transform_words(w) for w in words]
+        with self._lock:
+            return self.model.partial_fit(vectors, words)
+
+    def keywords(self, cid: int, k: int = 8) -> List[str]:
+        with self._lock:
+            return self.model.top_keywords(cid, k)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.model = self._new_model()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            m = self.model
+            return {
+                "docs": m.docs,
+                "clusters": len(m.clusters),
+                "max_clusters": m.max_clusters,
+                "threshold": m.threshold,
+                "centroid_terms": sum(len(c.centroid) for c in m.clusters.values()),
+                "lsh": {**m.lsh.stats(), "fallbacks": m.lsh_fallbacks} if m.lsh is not None else None,
+            }
+
+
+SEMANTIC = SemanticIndex(
+    use_lsh=os.getenv("HUNTER_SEMANTIC_LSH", "1") != "0",
+    max_clusters=int(os.getenv("HUNTER_SEMANTIC_K", "256")),
+    threshold=float(os.getenv("HUNTER_SEMANTIC_THRESHOLD", "0.3")),
+)
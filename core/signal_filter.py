@@ -1,6 +1,12 @@
 from __future__ import annotations
 
-import re
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from core.rule_pack import RulePack, current_pack, register_section
+from core.text_analysis import TextLike, analyze
+
+# Таблицы ниже — встроенные значения секции "signal_filter" rule pack-а
+# (см. core/rule_pack.py), в рантайме читаются из активного пака.
 
 # Жёстко режем dev/support (оно забивает весь радар)
 DEV_DENY = {
@@ -33,41 +39,75 @@ ONE_OFF_FIX_HINTS = {
     "crash", "bug", "issue", "problem", "can't", "cannot",
 }
 
-WS_RE = re.compile(r"\s+")
+class SignalRules(NamedTuple):
+    dev_deny: Tuple[str, ...]
+    decision_hints: Tuple[str, ...]
+    image_hints: Tuple[str, ...]
+    one_off_fix_hints: Tuple[str, ...]
+
+
+def _compile(sec: Dict[str, Any]) -> SignalRules:
+    return SignalRules(
+        dev_deny=tuple(sec["dev_deny"]),
+        decision_hints=tuple(sec["decision_hints"]),
+        image_hints=tuple(sec["image_hints"]),
+        one_off_fix_hints=tuple(sec["one_off_fix_hints"]),
+    )
+
 
-def _norm(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = WS_RE.sub(" ", s)
-    return s
+register_section(
+    "signal_filter",
+    {
+        "dev_deny": DEV_DENY,
+        "decision_hints": DECISION_HINTS,
+        "image_hints": IMAGE_HINTS,
+        "one_off_fix_hints": ONE_OFF_FIX_HINTS,
+    },
+    _compile,
+)
 
-def is_dev_support(text: str) -> bool:
-    t = _norm(text)
-    return any(k in t for k in DEV_DENY)
 
-def has_decision_signal(text: str) -> bool:
-    t = _norm(text)
-    return any(k in t for k in DECISION_HINTS) or any(k in t for k in IMAGE_HINTS)
+def _rules(pack: Optional[RulePack] = None) -> SignalRules:
+    return (pack or current_pack()).section("signal_filter")
 
-def is_one_off_fix(text: str) -> bool:
-    t = _norm(text)
+def is_dev_support(text: TextLike) -> bool:
+    return analyze(text).has_any("dev_deny", _rules().dev_deny)
+
+def has_decision_signal(text: TextLike, pack: Optional[RulePack] = None) -> bool:
+    a = analyze(text)
+    r = _rules(pack)
+    return a.has_any("decision", r.decision_hints) or a.has_any("image", r.image_hints)
+
+def has_decision_signal_norm(t: str, r: SignalRules) -> bool:
+    """has_decision_signal для готовой norm-строки и уже взятых правил (батчи без TextAnalysis)."""
+    return any(k in t for k in r.decision_hints) or any(k in t for k in r.image_hints)
+
+def is_one_off_fix(text: TextLike) -> bool:
+    a = analyze(text)
     # если нет decision-сигналов, а есть “не работает” → считаем одноразовым фикс-постом
-    return any(k in t for k in ONE_OFF_FIX_HINTS) and not has_decision_signal(t)
+    return a.has_any("one_off_fix", _rules().one_off_fix_hints) and not has_decision_signal(a)
 
-def is_signal_strict(text: str) -> bool:
+def is_signal_strict(text: TextLike) -> bool:
     """Строгий пропуск: decision-сценарий и не dev-support."""
-    if not text or len(text.strip()) < 12:
+    if not text:
         return False
-    if is_dev_support(text):
+    a = analyze(text)
+    if len(a.text.strip()) < 12:
         return False
-    if is_one_off_fix(text):
+    if is_dev_support(a):
         return False
-    return has_decision_signal(text)
+    if is_one_off_fix(a):
+        return False
+    return has_decision_signal(a)
 
-def is_signal_soft(text: str) -> bool:
+def is_signal_soft(text: TextLike) -> bool:
     """Мягкий пропуск: чуть шире, но всё равно режем dev-support."""
-    if not text or len(text.strip()) < 8:
+    if not text:
+        return False
+    a = analyze(text)
+    if len(a.text.strip()) < 8:
         return False
-    if is_dev_support(text):
+    if is_dev_support(a):
         return False
     # допускаем, если есть хотя бы намёк на image/screenshot/выбор/оценку
-    return has_decision_signal(text)
+    return has_decision_signal(a)
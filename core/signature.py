@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
 from core.models import Task
+from core.rule_pack import current_pack, register_section
+from core.text_analysis import TextLike, analyze
 
 STOP = {
     "i", "im", "i'm", "me", "my", "we", "you", "they", "it",
@@ -14,23 +19,113 @@ STOP = {
 
 TOKEN_RE = re.compile(r"[a-z0-9]+")
 
-def _topic_bucket(text: str) -> str:
-    t = (text or "").lower()
+# встроенные значения секции "signature" rule pack-а; порядок важен — первое совпадение
+TOPIC_BUCKETS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("calories_from_photo", ("calories", "nutrition", "macro", "ingredients")),
+    ("style_from_photo", ("outfit", "style", "hairstyle", "haircut", "how do i look")),
+    ("identify_living_thing", ("plant", "mushroom", "insect", "bug", "snake", "spider")),
+    ("verify_authenticity", ("scam", "fake", "legit", "authentic", "real or fake")),
+    ("choose_between_options", ("which one", "choose", "recommend", "better option")),
+]
+DEFAULT_TOPIC = "misc_decision"
+
+
+def _compile(sec: Dict[str, Any]) -> Tuple[Tuple[Tuple[str, Tuple[str, ...]], ...], str]:
+    buckets = tuple((b["topic"], tuple(b["any"])) for b in sec["topic_buckets"])
+    return buckets, str(sec["default_topic"])
+
+
+register_section(
+    "signature",
+    {
+        "topic_buckets": [{"topic": name, "any": keys} for name, keys in TOPIC_BUCKETS],
+        "default_topic": DEFAULT_TOPIC,
+    },
+    _compile,
+)
 
-    if any(k in t for k in ("calories", "nutrition", "macro", "ingredients")):
-        return "calories_from_photo"
-    if any(k in t for k in ("outfit", "style", "hairstyle", "haircut", "how do i look")):
-        return "style_from_photo"
-    if any(k in t for k in ("plant", "mushroom", "insect", "bug", "snake", "spider")):
-        return "identify_living_thing"
-    if any(k in t for k in ("scam", "fake", "legit", "authentic", "real or fake")):
-        return "verify_authenticity"
-    if any(k in t for k in ("which one", "choose", "recommend", "better option")):
-        return "choose_between_options"
 
-    return "misc_decision"
+def _topic_bucket(text: TextLike) -> str:
+    t = analyze(text).norm
+    buckets, default = current_pack().section("signature")
+    for name, keys in buckets:
+        if any(k in t for k in keys):
+            return name
+    return default
 
-def make_signature(task: Task) -> str:
-    topic = _topic_bucket(task.problem_statement)
+def make_signature(task: Task, analysis: TextLike = None) -> str:
+    """
+    analysis — уже разобранный текст задачи (TextAnalysis с /extract),
+    чтобы не нормализовать problem_statement второй раз.
+    """
+    topic = _topic_bucket(analysis if analysis is not None else task.problem_statement)
     # Кластер строим по “структуре задачи”, а не по текстовому шуму
     return f"{task.domain}|{task.intent}|{task.output_type}|{topic}"
+
+
+class SignatureParts(NamedTuple):
+    domain: str
+    intent: str
+    output_type: str
+    subtopic: str
+    keyword: Optional[str] = None
+
+
+def parse_signature(sig: str) -> SignatureParts:
+    """domain|intent|output|subtopic[|keyword] -> компоненты (недостающие — дефолты)."""
+    parts = sig.split("|")
+    return SignatureParts(
+        domain=parts[0],
+        intent=parts[1] if len(parts) > 1 else "understand",
+        output_type=parts[2] if len(parts) > 2 else "summary",
+        subtopic=parts[3] if len(parts) > 3 else "misc",
+        keyword=parts[4] if len(parts) > 4 else None,
+    )
+
+
+class SignatureDict:
+    """
+    Интернирование сигнатур: строка -> маленький int (с 1), компоненты
+    разбираются один раз при первой встрече. Агрегации радара ключуются
+    по id, строка нужна только на выдаче.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = [""]  # id 0 не выдаём: 0/None = "нет сигнатуры"
+        self._parts: List[Optional[SignatureParts]] = [None]
+        self._lock = threading.Lock()
+
+    def intern(self, sig: str) -> int:
+        sid = self._ids.get(sig)
+        if sid is not None:
+            return sid
+        with self._lock:
+            sid = self._ids.get(sig)
+            if sid is None:
+                sid = len(self._strings)
+                self._strings.append(sig)
+                self._parts.append(parse_signature(sig))
+                self._ids[sig] = sid
+        return sid
+
+    def lookup(self, sig: str) -> Optional[int]:
+        return self._ids.get(sig)
+
+    def string(self, sid: int) -> str:
+        return self._strings[sid]
+
+    def parts(self, sid: int) -> SignatureParts:
+        return self._parts[sid]  # type: ignore[return-value]
+
+    def __len__(self) -> int:
+        return len(self._strings) - 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+            del self._strings[1:]
+            del self._parts[1:]
+
+
+SIGNATURES = SignatureDict()
@@ -2,10 +2,14 @@
 from __future__ import annotations
 
 import re
-from typing import List, Optional
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from core.rule_pack import current_pack, register_section
+from core.text_analysis import TextLike, analyze
 
 _WORD_RX = re.compile(r"[a-z0-9]+|[а-я0-9]+", re.IGNORECASE)
 
+# Таблицы ниже — встроенные значения секции "subtopics" rule pack-а.
 # якорные "технические" подтемы, которые часто реально разделяют проблемы
 # порядок важен: более специфичные сверху
 _ANCHORS: list[tuple[str, list[str]]] = [
@@ -37,41 +41,122 @@ def _tokens(text: str) -> list[str]:
     return toks
 
 
-def pick_subtopic(text: str, tags: Optional[List[str]] = None, query: Optional[str] = None) -> str:
+def _build_anchor_index(
+    anchors: list[tuple[str, list[str]]],
+) -> Dict[str, List[Tuple[Tuple[str, ...], int]]]:
+    """
+    первый токен ключа -> [(токены ключа, индекс якоря), ...], отсортировано по индексу якоря.
+    Ключи токенизируются тем же _WORD_RX, что и текст: "w|gz" -> ("w", "gz"),
+    "log-level" -> ("log", "level").
+    """
+    index: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+    for idx, (_, keys) in enumerate(anchors):
+        for k in keys:
+            phrase = tuple(_tokens(k))
+            if phrase:
+                index.setdefault(phrase[0], []).append((phrase, idx))
+    for cands in index.values():
+        cands.sort(key=lambda c: c[1])
+    return index
+
+
+class SubtopicRules(NamedTuple):
+    anchors: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    index: Dict[str, List[Tuple[Tuple[str, ...], int]]]
+    stop: FrozenSet[str]
+
+
+def _compile(sec: Dict[str, Any]) -> SubtopicRules:
+    anchors = tuple((a["name"], tuple(a["keys"])) for a in sec["anchors"])
+    return SubtopicRules(
+        anchors=anchors,
+        index=_build_anchor_index([(name, list(keys)) for name, keys in anchors]),
+        stop=frozenset(sec["stop"]),
+    )
+
+
+register_section(
+    "subtopics",
+    {
+        "anchors": [{"name": name, "keys": keys} for name, keys in _ANCHORS],
+        "stop": _STOP,
+    },
+    _compile,
+)
+
+# "index" — по целым токенам/фразам через SubtopicRules.index;
+# "substring" — старое поведение (`k in text`), оставлено для сравнения
+MATCH_MODES = ("index", "substring")
+
+
+def _anchor_by_tokens(toks: List[str], rules: SubtopicRules) -> Optional[str]:
+    """Самый приоритетный (раньше в anchors) якорь, чей ключ встречается в токенах целиком."""
+    best: Optional[int] = None
+    n = len(toks)
+    index = rules.index
+    for i, tok in enumerate(toks):
+        cands = index.get(tok)
+        if not cands:
+            continue
+        for phrase, idx in cands:
+            if best is not None and idx >= best:
+                break
+            if len(phrase) == 1 or (i + len(phrase) <= n and tuple(toks[i:i + len(phrase)]) == phrase):
+                best = idx
+                break
+        if best == 0:
+            break
+    return rules.anchors[best][0] if best is not None else None
+
+
+def _anchor_by_substring(blob: str, rules: SubtopicRules) -> Optional[str]:
+    for name, keys in rules.anchors:
+        for k in keys:
+            if k in blob:
+                return name
+    return None
+
+
+def pick_subtopic(
+    text: TextLike,
+    tags: Optional[List[str]] = None,
+    query: Optional[str] = None,
+    mode: str = "index",
+) -> str:
     """
     Возвращает устойчивый subtopic.
     Принцип:
       1) сначала пытаемся матчить "якоря" по тексту (они отделяют реально разные боли)
       2) если не нашли — пытаемся по тегам
       3) если не нашли — fallback: 2 содержательных токена (склеить)
+    mode="index" матчит ключи якорей по границам слов ("auth" не ловит "author"),
+    mode="substring" — старый поиск подстрокой.
     """
-    toks = _tokens(text)
-    text_lc = " ".join(toks)
-
-    # 1) anchors by text
-    for name, keys in _ANCHORS:
-        for k in keys:
-            if k in text_lc:
-                return name
+    if mode not in MATCH_MODES:
+        raise ValueError(f"unknown subtopic match mode: {mode!r}")
 
-    # 2) anchors by tags
+    rules: SubtopicRules = current_pack().section("subtopics")
+    toks = analyze(text).tokens
     tags_lc = [t.lower() for t in (tags or [])]
-    tags_blob = " ".join(tags_lc)
-    for name, keys in _ANCHORS:
-        for k in keys:
-            if k in tags_blob:
-                return name
 
-    # 3) query hint
-    if query:
-        q = query.lower()
-        for name, keys in _ANCHORS:
-            for k in keys:
-                if k in q:
-                    return name
+    if mode == "index":
+        # 1) anchors by text, 2) by tags, 3) query hint
+        found = _anchor_by_tokens(toks, rules)
+        if found is None and tags_lc:
+            found = _anchor_by_tokens(_tokens(" ".join(tags_lc)), rules)
+        if found is None and query:
+            found = _anchor_by_tokens(_tokens(query), rules)
+    else:
+        found = _anchor_by_substring(" ".join(toks), rules)
+        if found is None:
+            found = _anchor_by_substring(" ".join(tags_lc), rules)
+        if found is None and query:
+            found = _anchor_by_substring(query.lower(), rules)
+    if found is not None:
+        return found
 
     # 4) fallback: 2 содержательных слова
-    content = [w for w in toks if len(w) >= 5 and w not in _STOP]
+    content = [w for w in toks if len(w) >= 5 and w not in rules.stop]
     if not content:
         return "misc"
 
@@ -0,0 +1,69 @@
+# core/text_analysis.py
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+WORD_RE = re.compile(r"[a-z0-9]+|[а-я0-9]+", re.IGNORECASE)
+
+
+@dataclass
+class TextAnalysis:
+    """
+    Результат однократного разбора документа.
+    Все классификаторы (signal_filter, extractor, labels, subtopics, ...)
+    принимают его вместо строки, чтобы не нормализовать текст заново.
+    """
+    text: str
+    norm: str
+    # кэш проверок "есть ли хоть одно ключевое слово из таблицы": key -> (таблица, результат)
+    hits: Dict[str, Tuple[object, bool]] = field(default_factory=dict)
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        # токенизация нужна не всем классификаторам — считаем по первому обращению
+        return WORD_RE.findall(self.norm)
+
+    @cached_property
+    def token_set(self) -> FrozenSet[str]:
+        return frozenset(self.tokens)
+
+    def has_any(self, key: str, keywords: Iterable[str]) -> bool:
+        """
+        Substring-проверка по нормализованному тексту, результат запоминается по key.
+        key — имя таблицы (например "decision"), keywords — сама таблица.
+        Запись годится только для того же объекта таблицы: после hot reload пака
+        под тем же key приходит новая таблица и проверка считается заново.
+        """
+        cached = self.hits.get(key)
+        if cached is not None and cached[0] is keywords:
+            return cached[1]
+        t = self.norm
+        v = any(k in t for k in keywords)
+        self.hits[key] = (keywords, v)
+        return v
+
+
+TextLike = Union[str, TextAnalysis, None]
+
+
+def norm(text: Optional[str]) -> str:
+    """strip + lower + схлопывание пробелов (как _norm в фильтрах и norm_text в cluster)."""
+    # str.split() режет по тем же unicode-пробелам, что и \s, но без regex-прохода
+    return " ".join((text or "").lower().split())
+
+
+def analyze(text: TextLike, normalized: Optional[str] = None) -> TextAnalysis:
+    """
+    Строит TextAnalysis один раз на документ.
+    Если передан уже готовый TextAnalysis — возвращает его как есть.
+    normalized — уже посчитанный norm(text) (например StoredRaw.normalized).
+    """
+    if isinstance(text, TextAnalysis):
+        return text
+
+    raw = text or ""
+    t = normalized if normalized is not None else norm(raw)
+    return TextAnalysis(text=raw, norm=t)
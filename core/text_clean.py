@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import html
 import re
+from typing import List, Optional
 
 TAG_RE = re.compile(r"<[^>]+>")
 WS_RE = re.compile(r"\s+")
@@ -22,3 +23,81 @@ def clean_text(text: str) -> str:
 # alias для старого имени, чтобы IDE не ругалась и старый код не падал
 def html_to_text(text: str) -> str:
     return clean_text(text)
+
+
+# ---------------------------------------------------------------------------
+# Потоковый вариант для больших HTML-тел (StackExchange body, HN comment_text).
+# Один ленивый проход токенизатора по телу: без промежуточных копий всего
+# тела, умеет пропускать/помечать блоки кода и останавливается по бюджету
+# символов — остаток тела даже не сканируется.
+
+CODE_MODES = ("keep", "skip", "mark")
+CODE_MARK = "[code]"
+# блоком кода считаем только <pre> (внутри него обычно <code>);
+# инлайновый <code> в тексте вопроса — имена функций/флагов, их оставляем
+CODE_BLOCK_TAGS = frozenset({"pre"})
+
+# тег (атрибуты в кавычках могут содержать '>') | комментарий/doctype/pi | текст | одиночный '<'
+HTML_TOKEN_RE = re.compile(
+    r"""<(/?)([a-zA-Z][\w:-]*)(?:[^>"']|"[^"]*"|'[^']*')*>"""
+    r"|<!--.*?(?:-->|$)|<[!?][^>]*>"
+    r"|[^<]+|<",
+    re.DOTALL,
+)
+
+_QUOTES = str.maketrans({"'": " ", '"': " "})
+
+
+def clean_html(text: str, code: str = "keep", max_chars: Optional[int] = None) -> str:
+    """
+    HTML -> плоский текст за один проход.
+    code: "keep" — код как обычный текст, "skip" — выкинуть <pre>-блоки,
+    "mark" — заменить каждый блок на [code].
+    max_chars — бюджет длины результата: дальше тело не сканируется.
+    Кавычки и пробелы обрабатываются как в clean_text; отличие — сущности
+    раскрываются после разбора тегов, поэтому экранированная разметка
+    (&lt;module&gt; в трейсбеке) остаётся текстом, а не вырезается как тег.
+    """
+    if code not in CODE_MODES:
+        raise ValueError(f"code must be one of {CODE_MODES}, got {code!r}")
+    if not text:
+        return ""
+
+    words: List[str] = []
+    size = -1  # длина " ".join(words)
+    depth = 0
+    for m in HTML_TOKEN_RE.finditer(text):
+        tag = m.group(2)
+        if tag is not None:
+            if tag.lower() in CODE_BLOCK_TAGS:
+                if m.group(1):
+                    depth = max(0, depth - 1)
+                else:
+                    if depth == 0 and code == "mark":
+                        words.append(CODE_MARK)
+                        size += len(CODE_MARK) + 1
+                    depth += 1
+            continue
+
+        chunk = m.group(0)
+        if depth and code != "keep":
+            continue
+        if chunk[0] == "<" and len(chunk) > 1:
+            continue  # комментарий / <!doctype> / <?pi?>
+        if "&" in chunk:
+            chunk = html.unescape(chunk)
+        parts = chunk.translate(_QUOTES).split()
+        words.extend(parts)
+        if max_chars is not None:
+            size += sum(map(len, parts)) + len(parts)
+            if size >= max_chars:
+                break
+
+    out = " ".join(words)
+    if max_chars is not None and len(out) > max_chars:
+        # режем по границе слова, чтобы не оставлять обрубок токена классификаторам
+        cut = out[:max_chars]
+        if out[max_chars] != " " and " " in cut:
+            cut = cut.rsplit(" ", 1)[0]
+        out = cut.rstrip()
+    return out
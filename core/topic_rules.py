@@ -2,6 +2,12 @@ from __future__ import annotations
 
 import re
 
+from typing import Any, Dict, Tuple
+
+from core.rule_engine import RuleMatcher
+from core.rule_pack import current_pack, register_section
+from core.text_analysis import TextLike, analyze
+
 # Простые rules. Дальше расширишь словарём по доменам.
 _RULES: list[tuple[str, list[str]]] = [
     ("meeting_notes_summary", [
@@ -34,32 +40,45 @@ _RULES: list[tuple[str, list[str]]] = [
     ]),
 ]
 
-_COMPILED: list[tuple[str, list[re.Pattern[str]]]] = [
-    (name, [re.compile(p, re.IGNORECASE) for p in pats])
-    for name, pats in _RULES
-]
+# порог: если совпадений меньше — не считаем это уверенным топиком
+_MIN_HITS = 2
+
+
+def _compile(sec: Dict[str, Any]) -> Tuple[RuleMatcher, int]:
+    matcher = RuleMatcher([(r["name"], r["patterns"]) for r in sec["rules"]], re.IGNORECASE)
+    return matcher, int(sec["min_hits"])
+
+
+register_section(
+    "topic_rules",
+    {
+        "rules": [{"name": name, "patterns": pats} for name, pats in _RULES],
+        "min_hits": _MIN_HITS,
+    },
+    _compile,
+)
 
 
-def classify_topic(text: str) -> str:
+def classify_topic(text: TextLike) -> str:
     """
     Возвращает устойчивый topic для кластеров.
     Без ML: только правила + порог совпадений.
     """
-    t = (text or "").strip()
+    t = analyze(text).norm
     if not t:
         return "unknown"
 
     best_name = "misc"
     best_hits = 0
 
-    for name, regs in _COMPILED:
-        hits = sum(1 for rx in regs if rx.search(t))
+    matcher, min_hits = current_pack().section("topic_rules")
+    for name, hits in matcher.hits(t).items():
         if hits > best_hits:
             best_hits = hits
             best_name = name
 
     # Порог: если совпадений слишком мало — не считаем это уверенным топиком
-    if best_hits >= 2:
+    if best_hits >= min_hits:
         return best_name
 
     return "misc"
@@ -0,0 +1,232 @@
+"""
+Micro-benchmarks for the classifier path (signal_filter / extractor / labels /
+topic_rules / subtopics).
+
+Run from the repo root:
+
+    python -m scripts.bench_classifiers --n 20000
+    python -m scripts.bench_classifiers --corpus data/raw.jsonl
+    python -m scripts.bench_classifiers --only rules --n 100000
+
+--corpus accepts a JSONL file (one object with a "text" field per line) or a
+plain text file (one document per line). Without it a synthetic corpus is
+generated from a fixed seed, so numbers are comparable between runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from core import labels, topic_rules
+from core.extractor import classify, classify_many, extract_task, extract_tasks
+from core.labels import classify_need
+from core.signal_filter import is_signal_soft, is_signal_strict
+from core.subtopics import pick_subtopic
+from core.text_analysis import analyze
+from core.topic_rules import classify_topic
+
+_FRAGMENTS = [
+    "What is this plant and is it dangerous?",
+    "How many calories are in this food photo",
+    "Which laptop is better for programming, compare these two",
+    "My meeting notes are scattered across docs and chats",
+    "Summarize the transcript and pull out action items",
+    "It takes forever every day to transfer files between folders",
+    "Does this outfit look ok, how do I look",
+    "Is this seller legit or a scam? Real or fake sneakers",
+    "FastAPI returns 307 redirect on trailing slash",
+    "JWT bearer token auth fails after login",
+    "Upload to S3 with presigned multipart url",
+    "StreamingResponse zip archive is corrupted",
+    "pytest AsyncMock __aenter__ does not work",
+    "uvicorn logging without timestamp",
+    "Excel formula not working, error on every row",
+    "recommend a haircut from this picture",
+    "identify this insect from a screenshot",
+    "Resume and cover letter review before the job interview",
+    "I rewrite my notes many times, it is my whole workflow",
+    "the app crashes with a timeout, any idea?",
+]
+
+
+def load_corpus(n: int, path: Optional[str] = None, seed: int = 42) -> List[str]:
+    if path:
+        out: List[str] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith("{"):
+                    line = str(json.loads(line).get("text") or "")
+                out.append(line)
+                if n and len(out) >= n:
+                    break
+        return out
+
+    rnd = random.Random(seed)
+    return [
+        " ".join(rnd.choice(_FRAGMENTS) for _ in range(rnd.randint(1, 8)))
+        for _ in range(n)
+    ]
+
+
+def _timeit(fn: Callable[[], object]) -> tuple[float, object]:
+    t0 = time.perf_counter()
+    res = fn()
+    return time.perf_counter() - t0, res
+
+
+def _report(name: str, n: int, results: Dict[str, float]) -> None:
+    base = next(iter(results.values()))
+    print(f"[{name}] docs={n}")
+    for label, dt in results.items():
+        speed = n / dt if dt > 0 else 0.0
+        print(f"  {label:<24} {dt:8.3f}s  {speed:10.0f} docs/s  x{base / dt if dt > 0 else 0:.2f}")
+
+
+def bench_pipeline(texts: List[str]) -> None:
+    """
+    collect → ingest → extract: каждый классификатор со строкой
+    (каждый заново нормализует текст) против одного TextAnalysis на документ.
+    """
+
+    def per_call() -> list:
+        out = []
+        for t in texts:
+            keep = is_signal_strict(t) or is_signal_soft(t)
+            task = extract_task(t)
+            out.append((keep, task.intent, task.domain, classify_need(t), classify_topic(t), pick_subtopic(t)))
+        return out
+
+    def shared() -> list:
+        out = []
+        for t in texts:
+            a = analyze(t)
+            keep = is_signal_strict(a) or is_signal_soft(a)
+            task = extract_task(a)
+            out.append((keep, task.intent, task.domain, classify_need(a), classify_topic(a), pick_subtopic(a)))
+        return out
+
+    dt_old, res_old = _timeit(per_call)
+    dt_new, res_new = _timeit(shared)
+    if res_old != res_new:
+        raise SystemExit("pipeline: shared TextAnalysis changed classifier output")
+    _report("pipeline", len(texts), {"str per call": dt_old, "shared TextAnalysis": dt_new})
+
+
+def _legacy_classify_need(t: str) -> str:
+    if any(re.search(p, t) for p in labels._WORKFLOW):
+        return "workflow_time_saver"
+    if any(re.search(p, t) for p in labels._DECISION):
+        return "decision_preview"
+    if any(re.search(p, t) for p in labels._SUPPORT):
+        return "support_fix"
+    return "unknown"
+
+
+_LEGACY_TOPIC_COMPILED = [
+    (name, [re.compile(p, re.IGNORECASE) for p in pats])
+    for name, pats in topic_rules._RULES
+]
+
+
+def _legacy_classify_topic(t: str) -> str:
+    if not t:
+        return "unknown"
+    best_name, best_hits = "misc", 0
+    for name, regs in _LEGACY_TOPIC_COMPILED:
+        hits = sum(1 for rx in regs if rx.search(t))
+        if hits > best_hits:
+            best_hits, best_name = hits, name
+    return best_name if best_hits >= 2 else "misc"
+
+
+def bench_rules(texts: List[str]) -> None:
+    """
+    Golden-проверка + скорость: по-паттерновые re.search против одной
+    альтернации RuleMatcher (labels.classify_need, topic_rules.classify_topic).
+    """
+    norm = [analyze(t).norm for t in texts]
+
+    dt_old, res_old = _timeit(lambda: [(_legacy_classify_need(t), _legacy_classify_topic(t)) for t in norm])
+    dt_new, res_new = _timeit(lambda: [(classify_need(t), classify_topic(t)) for t in norm])
+
+    mismatches = [i for i, (a, b) in enumerate(zip(res_old, res_new)) if a != b]
+    if mismatches:
+        i = mismatches[0]
+        raise SystemExit(f"rules: {len(mismatches)} mismatches, first: {norm[i]!r} {res_old[i]} != {res_new[i]}")
+    _report("rules", len(texts), {"re.search per pattern": dt_old, "RuleMatcher": dt_new})
+
+
+def bench_subtopics(texts: List[str]) -> None:
+    """
+    pick_subtopic: индекс токен -> якорь против старого поиска подстрокой.
+    Выход отличается намеренно (границы слов), печатаем сколько и примеры.
+    """
+    docs = [analyze(t) for t in texts]
+    tags = ["python", "fastapi"]
+
+    dt_old, res_old = _timeit(lambda: [pick_subtopic(a, tags=tags, mode="substring") for a in docs])
+    dt_new, res_new = _timeit(lambda: [pick_subtopic(a, tags=tags, mode="index") for a in docs])
+    _report("subtopics", len(texts), {"substring": dt_old, "token index": dt_new})
+
+    diff = [(old, new) for old, new in zip(res_old, res_new) if old != new]
+    print(f"  differs on {len(diff)} docs")
+    for (old, new), n in Counter(diff).most_common(5):
+        print(f"    {old} -> {new}: {n}")
+
+
+def bench_batch(texts: List[str]) -> None:
+    """
+    extract_task в цикле против extract_tasks; отдельно classify в цикле против
+    classify_many по готовым norm-строкам (как в /extract) и через пул процессов
+    (пул принудительно, минимум 2 воркера — на 1 ядре он только проигрывает).
+    """
+    dt_loop, res_loop = _timeit(lambda: [extract_task(t) for t in texts])
+    dt_batch, res_batch = _timeit(lambda: extract_tasks(texts, workers=0))
+    if res_loop != res_batch:
+        raise SystemExit("batch: extract_tasks differs from per-item extract_task")
+    _report("batch", len(texts), {"extract_task loop": dt_loop, "extract_tasks": dt_batch})
+
+    norms = [analyze(t).norm for t in texts]
+    workers = max(2, os.cpu_count() or 1)
+    dt_loop, res_loop = _timeit(lambda: [classify(analyze(t, normalized=t)) for t in norms])
+    dt_many, res_many = _timeit(lambda: classify_many(texts, normalized=norms, workers=0))
+    dt_pool, res_pool = _timeit(lambda: classify_many(texts, normalized=norms, workers=workers, pool_threshold=0))
+    if not (res_loop == res_many == res_pool):
+        raise SystemExit("batch: classify_many differs from per-item classify")
+    _report("classify", len(texts), {"classify loop": dt_loop, "classify_many": dt_many, f"classify_many pool x{workers}": dt_pool})
+
+
+BENCHES: Dict[str, Callable[[List[str]], None]] = {
+    "pipeline": bench_pipeline,
+    "rules": bench_rules,
+    "subtopics": bench_subtopics,
+    "batch": bench_batch,
+}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--corpus", default=None)
+    ap.add_argument("--only", choices=sorted(BENCHES), default=None)
+    args = ap.parse_args()
+
+    texts = load_corpus(args.n, args.corpus)
+    for name, fn in BENCHES.items():
+        if args.only and name != args.only:
+            continue
+        fn(texts)
+
+
+if __name__ == "__main__":
+    main()
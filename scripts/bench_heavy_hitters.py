@@ -0,0 +1,117 @@
+"""
+cluster_by_key (exact, all buckets in memory) vs cluster_by_key_streaming
+(Space-Saving top-k) on a Zipf-distributed task stream.
+
+Run from the repo root:
+
+    python -m scripts.bench_heavy_hitters --n 200000 --keys 50000 --k 1000
+    python -m scripts.bench_heavy_hitters --workers 8
+
+Checks:
+  - with k >= distinct keys the streaming result equals cluster_by_key;
+  - every reported count is within [true, true + error] and error <= n / k;
+  - recall of the true top-N and how many of them are "guaranteed";
+  - merging per-worker partial results vs one pass over the whole stream;
+  - peak memory of both (tracemalloc).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Callable, List, Tuple
+
+from core.cluster import StreamingKeyClusters, cluster_by_key, cluster_by_key_streaming, task_key
+
+
+def zipf_tasks(n: int, keys: int, s: float = 1.1, seed: int = 42) -> List[Any]:
+    rnd = random.Random(seed)
+    weights = [1.0 / (i ** s) for i in range(1, keys + 1)]
+    picks = rnd.choices(range(keys), weights=weights, k=n)
+    domains = ["health", "style", "nature", "shopping", "general"]
+    out = []
+    for p in picks:
+        out.append(
+            SimpleNamespace(
+                domain=domains[p % len(domains)],
+                intent="choose",
+                output_type="recommendation",
+                problem_statement=f"pain point {p} w{p % 97} x{p % 13} y{p % 7} z{p % 3} tail text",
+            )
+        )
+    return out
+
+
+def _peak(fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, dt, peak / 1024 / 1024
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--keys", type=int, default=50_000)
+    ap.add_argument("--k", type=int, default=1000)
+    ap.add_argument("--top", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    tasks = zipf_tasks(args.n, args.keys)
+    truth = Counter(task_key(t) for t in tasks)
+    print(f"stream n={args.n} distinct keys={len(truth)} k={args.k}")
+
+    # 1) k >= distinct -> точное совпадение
+    small = tasks[:5000]
+    exact_small = cluster_by_key(small)
+    stream_small = cluster_by_key_streaming(small, k=len(exact_small))
+    same = [{**x, "error": 0} for x in exact_small] == stream_small
+    print(f"  k>=distinct equals cluster_by_key: {same}")
+    if not same:
+        raise SystemExit("streaming result differs from cluster_by_key")
+
+    # 2) память и время
+    exact, dt_exact, mb_exact = _peak(lambda: cluster_by_key(tasks))
+    stream, dt_stream, mb_stream = _peak(lambda: cluster_by_key_streaming(tasks, k=args.k))
+    print(f"  cluster_by_key           {dt_exact:6.2f}s  peak {mb_exact:7.1f} MB  buckets={len(exact)}")
+    print(f"  cluster_by_key_streaming {dt_stream:6.2f}s  peak {mb_stream:7.1f} MB  tracked={len(stream)}")
+
+    # 3) ошибки и recall
+    bound = args.n / args.k
+    bad = [x for x in stream if not (truth[x["key"]] <= x["count"] <= truth[x["key"]] + x["error"])]
+    max_err = max((x["count"] - truth[x["key"]] for x in stream), default=0)
+    print(f"  count within [true, true+error]: {len(stream) - len(bad)}/{len(stream)}  max overestimate={max_err} bound={bound:.0f}")
+    if bad or max_err > bound:
+        raise SystemExit("Space-Saving bounds violated")
+
+    true_top = {k for k, _ in truth.most_common(args.top)}
+    got_top = {x["key"] for x in stream[: args.top]}
+    sc = StreamingKeyClusters(k=args.k).feed(tasks)
+    guaranteed = sc.sketch.guaranteed(args.top)
+    print(f"  top-{args.top} recall {len(true_top & got_top) / args.top:.3f}  guaranteed {len(guaranteed)}/{args.top}")
+
+    # 4) merge партиций == один проход (в пределах ошибок)
+    parts = [tasks[i::args.workers] for i in range(args.workers)]
+    merged = StreamingKeyClusters(k=args.k)
+    for p in parts:
+        merged.merge(StreamingKeyClusters(k=args.k).feed(p))
+    m_top = merged.top(args.top)
+    bad_m = [x for x in m_top if not (truth[x["key"]] <= x["count"] <= truth[x["key"]] + x["error"])]
+    print(
+        f"  merged {args.workers} workers: top-{args.top} recall "
+        f"{len(true_top & {x['key'] for x in m_top}) / args.top:.3f}  bounds ok {len(m_top) - len(bad_m)}/{len(m_top)}"
+    )
+    if bad_m:
+        raise SystemExit("merged Space-Saving bounds violated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+End-to-end pipeline benchmark on recorded HTTP: collect -> filter -> ingest ->
+extract -> radar -> ideas -> market scan, with throughput and latency per stage.
+
+Run from the repo root:
+
+    # once, with network: run the pipeline live and record every external response
+    python -m scripts.bench_offline --record data/cassettes/bench.jsonl.gz --se superuser:microsoft-excel
+    # afterwards, fully offline (same flags -> same requests)
+    python -m scripts.bench_offline --replay data/cassettes/bench.jsonl.gz --se superuser:microsoft-excel
+    python -m scripts.bench_offline --replay ... --latency-ms 120 --jitter-ms 80 --error-rate 0.05 --seed 7
+    python -m scripts.bench_offline --replay ... --json
+
+External hosts (reddit, HN Algolia, StackExchange, DuckDuckGo) go through a
+collectors.cassette adapter; the API runs in this process (FastAPI TestClient
+mounted as the transport for API_BASE), so ingest hits the real /ingest/batch
+handler. Checkpoints, the seen filter and the extract cache are in-memory and
+start empty, and the HTTP cache is off: every run issues the same request
+sequence, which is what makes a recording replayable. Radar recency is
+counted from the newest fetched item instead of the wall clock, so the ideas
+(and the market-scan queries built from them) do not drift between record and
+replay; cassette misses are still counted and reported under "errors".
+
+Per stage: calls, items out, wall time, items/s and p50/p95 latency per call.
+Fetches are materialized per source here (not streamed) so stages do not overlap.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from fastapi.testclient import TestClient
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from app.main import app
+from collectors import http_client
+from core import radar as radar_mod
+from collectors.cassette import Cassette, adapters
+from collectors.checkpoints import CheckpointStore
+from collectors.pipeline import API_BASE, Collector, IngestSink, NormalizedItem, Pipeline, batched, default_stages
+from collectors.sources import HNCollector, RedditCollector, SECollector
+from core.extract_cache import TASK_CACHE
+from core.market_scan import run_market_scan
+from scripts.collect_and_ingest import SUBREDDITS
+from scripts.collect_routine_and_ingest import HN_QUERIES
+
+# пороги длины — как в collect-скриптах
+MIN_CHARS = {"reddit": 40, "hn": 0, "stackexchange": 80}
+
+
+class AppAdapter(BaseAdapter):
+    """requests-транспорт в FastAPI-приложение этого же процесса (без uvicorn и сокетов)."""
+
+    def __init__(self, client: TestClient):
+        super().__init__()
+        self.client = client
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        parts = urlsplit(request.url or "")
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        r = self.client.request(request.method or "GET", path, content=request.body, headers=dict(request.headers))
+        resp = requests.Response()
+        resp.status_code = r.status_code
+        resp.headers = CaseInsensitiveDict(r.headers)
+        resp._content = r.content
+        resp.url = request.url or ""
+        resp.request = request
+        resp.encoding = "utf-8"
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+@dataclass
+class StageStats:
+    name: str
+    calls: int = 0
+    items: int = 0
+    wall_s: float = 0.0
+    lat_ms: List[float] = field(default_factory=list)
+
+    def timed(self, fn: Callable[[], Any]) -> Any:
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        self.calls += 1
+        self.wall_s += dt
+        self.lat_ms.append(dt * 1000)
+        return out
+
+    def row(self) -> Dict[str, Any]:
+        lat = sorted(self.lat_ms)
+
+        def pct(p: float) -> float:
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 2) if lat else 0.0
+
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "items": self.items,
+            "wall_s": round(self.wall_s, 3),
+            "items_per_s": round(self.items / self.wall_s, 1) if self.wall_s > 0 else 0.0,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+        }
+
+
+class _Materialized:
+    def __init__(self, name: str, items: List[NormalizedItem]):
+        self.name = name
+        self._items = items
+
+    def items(self) -> Iterator[NormalizedItem]:
+        return iter(self._items)
+
+
+def _cassette_misses(mounts: List[Tuple[str, BaseAdapter]]) -> int:
+    # http:// и https:// смонтированы одним адаптером — считаем каждый один раз
+    uniq = {id(a): a for _, a in mounts}
+    return sum(int(getattr(a, "counts", {}).get("misses", 0)) for a in uniq.values())
+
+
+def build_collectors(args: argparse.Namespace, store: CheckpointStore) -> List[Collector]:
+    # с --error-rate отдельные источники падают: ошибка считается, прогон идёт дальше
+    out: List[Collector] = [RedditCollector([sr], store=store, skip_errors=True) for sr in SUBREDDITS[: args.subreddits]]
+    out += [HNCollector([q], pages=args.hn_pages, store=store, skip_errors=True) for q in HN_QUERIES[: args.hn_queries]]
+    out += [SECollector([spec], pages=1, store=store, skip_errors=True) for spec in args.se]
+    return out
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mode = "record" if args.record else "replay"
+    path = args.record or args.replay
+    # record пишет кассету с нуля: смешанные записи разных прогонов не воспроизводятся
+    cassette = Cassette(None if args.record else path)
+    cassette.path = path
+    replay = {}
+    if mode == "replay":
+        replay = {
+            "latency_s": args.latency_ms / 1000.0,
+            "jitter_s": args.jitter_ms / 1000.0,
+            "error_rate": args.error_rate,
+            "error_kind": args.error_kind,
+            "seed": args.seed,
+        }
+    http_client.set_cache(None)
+    mounts = adapters(cassette, mode, **replay)
+    for prefix, adapter in mounts:
+        http_client.mount(prefix, adapter)
+    client = TestClient(app)
+    http_client.mount(API_BASE, AppAdapter(client))
+    client.post("/reset")
+    # extract-кэш в памяти и пустой: файл HUNTER_EXTRACT_CACHE не читается и не пишется
+    TASK_CACHE.path = None
+    TASK_CACHE.clear()
+
+    stages = {name: StageStats(name) for name in ("fetch", "filter", "ingest", "extract", "radar", "ideas", "market")}
+    store = CheckpointStore(None)
+    t_all = time.perf_counter()
+
+    fetched: List[_Materialized] = []
+    errors: Dict[str, int] = {"fetch": 0}
+    for c in build_collectors(args, store):
+        items = stages["fetch"].timed(lambda: list(c.items()))
+        stages["fetch"].items += len(items)
+        errors["fetch"] += len(getattr(c, "errors", []))
+        fetched.append(_Materialized(c.name, items))
+    # recency radar-а — от самого свежего скачанного элемента, а не от часов: тот же рейтинг идей при replay
+    newest = max((it.last_activity_at for m in fetched for it in m.items()), default=0)
+    radar_mod.pin_now(newest or None)
+
+    kept: List[NormalizedItem] = []
+    funnel: Dict[str, int] = {}
+    for m in fetched:
+        p = Pipeline(default_stages(min_chars=MIN_CHARS.get(m.name, 40)))
+        kept += stages["filter"].timed(lambda: list(p.items([m])))
+        for k, v in p.counts.items():
+            funnel[k] = funnel.get(k, 0) + v
+    stages["filter"].items = len(kept)
+
+    sink = IngestSink()
+    for batch in batched(kept, size=args.batch_size):
+        stages["ingest"].timed(lambda: sink(batch))
+    stages["ingest"].items = sink.counts["ingested"]
+
+    ex = stages["extract"].timed(lambda: http_client.post(f"{API_BASE}/extract", json={"limit": 0, "only_new": True}).json())
+    stages["extract"].items = int(ex.get("created") or 0)
+
+    radar: Dict[str, Any] = {}
+    ideas: Dict[str, Any] = {}
+    for _ in range(args.repeat):
+        radar = stages["radar"].timed(lambda: http_client.get(f"{API_BASE}/radar", params={"min_count": 1}, cache=False).json())
+        stages["radar"].items += len(radar.get("items") or [])
+        ideas = stages["ideas"].timed(lambda: http_client.get(f"{API_BASE}/ideas", params={"min_count": 1}, cache=False).json())
+        stages["ideas"].items += len(ideas.get("items") or [])
+
+    # run_market_scan глотает ошибки поиска — промахи кассеты считаем по адаптеру
+    misses_before = _cassette_misses(mounts)
+    for idea in (ideas.get("items") or [])[: args.market]:
+        scan = stages["market"].timed(lambda: run_market_scan(query=f"{idea['title']} app", sleep_s=0.0))
+        stages["market"].items += len(scan.results)
+    errors["market_cassette_miss"] = _cassette_misses(mounts) - misses_before
+    radar_mod.pin_now(None)
+
+    if mode == "record":
+        cassette.save()
+    net = http_client.stats()
+    return {
+        "mode": mode,
+        "cassette": {"path": path, "responses": len(cassette)},
+        "wall_s": round(time.perf_counter() - t_all, 3),
+        "stages": [s.row() for s in stages.values() if s.calls],
+        "funnel": funnel,
+        "errors": errors,
+        "http": {k: net.get(k, 0) for k in ("requests", "retries", "failures")},
+        "transport": net["transport"],
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--record", metavar="CASSETTE", help="hit the network and write a cassette")
+    g.add_argument("--replay", metavar="CASSETTE", help="serve responses from a cassette, no network")
+    ap.add_argument("--subreddits", type=int, default=5, help="first N of collect_and_ingest.SUBREDDITS")
+    ap.add_argument("--hn-queries", type=int, default=4, help="first N of collect_routine_and_ingest.HN_QUERIES")
+    ap.add_argument("--hn-pages", type=int, default=1)
+    ap.add_argument("--se", action="append", default=[], help="site:tag, repeatable")
+    ap.add_argument("--market", type=int, default=3, help="market-scan the top N ideas (DuckDuckGo)")
+    ap.add_argument("--batch-size", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=5, help="radar/ideas calls, for latency percentiles")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="replay: base latency per request")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="replay: + uniform(0, jitter)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="replay: share of requests that fail")
+    ap.add_argument("--error-kind", choices=["status", "reset"], default="status", help="replay: 503 or connection reset")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=1))
+        return
+    print(f"{report['mode']}: {report['cassette']['path']} ({report['cassette']['responses']} responses), total {report['wall_s']}s")
+    print(f"{'stage':<8} {'calls':>5} {'items':>6} {'wall_s':>8} {'items/s':>9} {'p50_ms':>8} {'p95_ms':>8}")
+    for r in report["stages"]:
+        print(f"{r['stage']:<8} {r['calls']:>5} {r['items']:>6} {r['wall_s']:>8} {r['items_per_s']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+    print("funnel: " + ", ".join(f"{k}={v}" for k, v in report["funnel"].items()))
+    print("errors: " + ", ".join(f"{k}={v}" for k, v in report["errors"].items()))
+    print("http: " + json.dumps(report["http"]) + " transport: " + json.dumps(report["transport"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Recall/latency of LSH nearest-cluster lookup vs brute force (core.semantic).
+
+Run from the repo root:
+
+    python -m scripts.bench_semantic --topics 600 --n 6000
+    python -m scripts.bench_semantic --corpus data/raw.jsonl --k 1024
+    python -m scripts.bench_semantic --tables 8 --bits 12 --probes 3
+
+1) fits OnlineKMeans on --n docs (exact assignment) to get realistic centroids;
+2) indexes those centroids with LSHIndex;
+3) for held-out docs compares the LSH answer with brute force:
+   recall@1 (same cluster), similarity lost on misses, candidates per query,
+   latency per query;
+4) times the full fit with and without LSH.
+
+Without --corpus a synthetic corpus with --topics latent topics is generated
+from a fixed seed (each doc = words of one topic + shared noise words).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List, Optional
+
+from core.lsh import LSHIndex
+from core.semantic import HashingVectorizer, OnlineKMeans
+
+
+def synthetic_corpus(n: int, topics: int, seed: int = 42) -> List[str]:
+    rnd = random.Random(seed)
+
+    def word() -> str:
+        return "".join(rnd.choice("bcdfghklmnprstvz") + rnd.choice("aeiou") for _ in range(rnd.randint(2, 4)))
+
+    noise = [word() for _ in range(300)]
+    vocab = [[word() for _ in range(14)] for _ in range(topics)]
+    out = []
+    for _ in range(n):
+        words = vocab[rnd.randrange(topics)]
+        doc = rnd.sample(words, rnd.randint(6, 10)) + rnd.sample(noise, 3)
+        rnd.shuffle(doc)
+        out.append(" ".join(doc))
+    return out
+
+
+def _fit(vec: HashingVectorizer, docs: List[str], k: int, threshold: float, lsh: Optional[LSHIndex], batch: int) -> tuple:
+    model = OnlineKMeans(max_clusters=k, threshold=threshold, lsh=lsh)
+    t0 = time.perf_counter()
+    for i in range(0, len(docs), batch):
+        words = [vec.words(t) for t in docs[i:i + batch]]
+        model.partial_fit([vec.transform_words(w) for w in words], words)
+    return model, time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=6000)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--topics", type=int, default=600)
+    ap.add_argument("--corpus", default=None)
+    ap.add_argument("--k", type=int, default=4096, help="max_clusters")
+    ap.add_argument("--threshold", type=float, default=0.3)
+    ap.add_argument("--tables", type=int, default=12)
+    ap.add_argument("--bits", type=int, default=6)
+    ap.add_argument("--probes", type=int, default=3)
+    ap.add_argument("--batch", type=int, default=200)
+    args = ap.parse_args()
+
+    if args.corpus:
+        from scripts.bench_classifiers import load_corpus
+
+        texts = load_corpus(args.n + args.queries, args.corpus)
+    else:
+        texts = synthetic_corpus(args.n + args.queries, args.topics)
+    train, held = texts[: args.n], texts[args.n:]
+
+    vec = HashingVectorizer()
+    model, dt_exact = _fit(vec, train, args.k, args.threshold, None, args.batch)
+    print(f"fit exact: docs={len(train)} clusters={len(model.clusters)} {dt_exact:.2f}s ({len(train) / dt_exact:.0f} docs/s)")
+
+    lsh = LSHIndex(n_tables=args.tables, n_bits=args.bits, probes=args.probes)
+    t0 = time.perf_counter()
+    for c in model.clusters.values():
+        lsh.add(c.id, c.centroid)
+    print(f"index: {len(lsh)} centroids in {time.perf_counter() - t0:.2f}s")
+
+    qvecs = [v for v in (vec.transform(t) for t in held) if v]
+    t0 = time.perf_counter()
+    exact = [model.nearest(v, exact=True) for v in qvecs]
+    dt_brute = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    approx = [model._best(v, (model.clusters[c] for c in lsh.candidates(v))) for v in qvecs]
+    dt_lsh = time.perf_counter() - t0
+
+    hit = sum(a[0] == e[0] for a, e in zip(approx, exact))
+    # «потеря» — насколько хуже найденный кластер (важна только там, где LSH промахнулся)
+    lost = [e[1] - max(a[1], 0.0) for a, e in zip(approx, exact) if a[0] != e[0]]
+    matched = [(a, e) for a, e in zip(approx, exact) if e[1] >= args.threshold]
+    hit_matched = sum(a[0] == e[0] for a, e in matched)
+
+    q = len(qvecs)
+    print(f"queries={q} tables={args.tables} bits={args.bits} probes={args.probes}")
+    print(f"  recall@1 all              {hit / q:.3f}")
+    print(f"  recall@1 sim>=threshold   {hit_matched / max(1, len(matched)):.3f}  ({len(matched)} queries)")
+    print(f"  avg sim lost on misses    {sum(lost) / max(1, len(lost)):.3f}")
+    print(f"  avg candidates            {lsh.candidates_total / max(1, lsh.queries):.1f} of {len(model.clusters)}")
+    print(f"  brute force               {dt_brute / q * 1e3:.3f} ms/query")
+    print(f"  lsh                       {dt_lsh / q * 1e3:.3f} ms/query  x{dt_brute / dt_lsh if dt_lsh > 0 else 0:.2f}")
+
+    lsh_fit = LSHIndex(n_tables=args.tables, n_bits=args.bits, probes=args.probes)
+    model_lsh, dt_fit_lsh = _fit(vec, train, args.k, args.threshold, lsh_fit, args.batch)
+    print(
+        f"fit lsh:   docs={len(train)} clusters={len(model_lsh.clusters)} {dt_fit_lsh:.2f}s "
+        f"({len(train) / dt_fit_lsh:.0f} docs/s, x{dt_exact / dt_fit_lsh:.2f}, fallbacks={model_lsh.lsh_fallbacks})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark: clean_text (unescape + regex) vs clean_html (streaming single-pass tokenizer).
+
+Run from the repo root:
+
+    python -m scripts.bench_text_clean --fetch stackoverflow:python --save data/se_bodies.jsonl
+    python -m scripts.bench_text_clean --corpus data/se_bodies.jsonl
+    python -m scripts.bench_text_clean --max-chars 2000
+
+--fetch pulls real question bodies through collectors.stackexchange
+(site:tag, needs network); --save keeps them for offline runs.
+--corpus reads a JSONL file with a "text" (or "body") field per line.
+Without either, a synthetic SE-like corpus is generated from a fixed seed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from core.text_clean import CODE_MODES, clean_html, clean_text
+
+_PARAS = [
+    "<p>I am trying to upload a file to S3 with a presigned URL but get <code>403 Forbidden</code>.</p>",
+    "<p>Here is what I tried &amp; what I expected:</p>",
+    "<p>The docs say it should &quot;just work&quot; but it doesn&#39;t.</p>",
+    "<ul><li>Python 3.11</li><li>FastAPI 0.110</li><li>uvicorn</li></ul>",
+    "<blockquote><p>Error: timeout while reading response</p></blockquote>",
+    "<p>Which approach is better here? Any idea what I am missing?</p>",
+    "<p>See <a href=\"https://example.com/docs\" rel=\"nofollow noreferrer\">the docs</a>.</p>",
+]
+
+_CODE = [
+    "<pre class=\"lang-py s-code-block\"><code>import boto3\n"
+    "s3 = boto3.client(&quot;s3&quot;)\n"
+    "url = s3.generate_presigned_url(&quot;put_object&quot;, Params={&quot;Bucket&quot;: b, &quot;Key&quot;: k})\n"
+    "for i in range(10):\n    print(i &lt; 5 and i &gt; 1)\n</code></pre>",
+    "<pre><code>Traceback (most recent call last):\n  File &quot;app.py&quot;, line 12, in &lt;module&gt;\n"
+    "    main()\nRuntimeError: event loop is closed\n</code></pre>",
+]
+
+
+def synthetic_corpus(n: int, seed: int = 42) -> List[str]:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = [rnd.choice(_PARAS) for _ in range(rnd.randint(2, 8))]
+        for _ in range(rnd.randint(0, 6)):
+            parts.insert(rnd.randint(0, len(parts)), rnd.choice(_CODE))
+        out.append("\n".join(parts))
+    return out
+
+
+def load_corpus(path: str, n: int) -> List[str]:
+    out: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            out.append(str(obj.get("text") or obj.get("body") or ""))
+            if n and len(out) >= n:
+                break
+    return out
+
+
+def fetch_corpus(spec: str, pages: int) -> List[str]:
+    from collectors.stackexchange import fetch_questions_with_body
+
+    site, _, tagged = spec.partition(":")
+    qs = fetch_questions_with_body(site=site, tagged=tagged or "python", pages=pages)
+    return [q.text for q in qs if q.text]
+
+
+def _measure(fn: Callable[[str], str], bodies: List[str]) -> Dict[str, float]:
+    t0 = time.perf_counter()
+    total = sum(len(fn(b)) for b in bodies)
+    dt = time.perf_counter() - t0
+
+    # пик памяти на самом большом теле — сколько полных копий делает очистка
+    big = max(bodies, key=len)
+    tracemalloc.start()
+    fn(big)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"dt": dt, "out_chars": total, "peak_kb": peak / 1024, "big_kb": len(big) / 1024}
+
+
+def run(bodies: List[str], max_chars: Optional[int], repeat: int) -> None:
+    bodies = bodies * max(1, repeat)
+    in_chars = sum(len(b) for b in bodies)
+    print(f"docs={len(bodies)} input={in_chars / 1024:.0f} KB avg={in_chars / max(1, len(bodies)):.0f} chars")
+
+    variants: Dict[str, Callable[[str], str]] = {"clean_text (regex)": clean_text}
+    for mode in CODE_MODES:
+        variants[f"clean_html code={mode}"] = lambda b, m=mode: clean_html(b, code=m)
+        if max_chars:
+            variants[f"clean_html code={mode} cap={max_chars}"] = lambda b, m=mode: clean_html(b, code=m, max_chars=max_chars)
+
+    base: Optional[float] = None
+    for label, fn in variants.items():
+        r = _measure(fn, bodies)
+        base = base or r["dt"]
+        speed = in_chars / 1024 / 1024 / r["dt"] if r["dt"] > 0 else 0.0
+        print(
+            f"  {label:<36} {r['dt']:7.3f}s {speed:7.1f} MB/s x{base / r['dt'] if r['dt'] > 0 else 0:5.2f}"
+            f"  out={r['out_chars'] / 1024:8.0f} KB  peak={r['peak_kb']:7.1f} KB (body {r['big_kb']:.1f} KB)"
+        )
+
+    # code=keep должен совпадать со старой очисткой, кроме экранированной разметки (&lt;tag&gt;)
+    same = sum(clean_text(b) == clean_html(b) for b in bodies)
+    print(f"  clean_html(code=keep) == clean_text: {same}/{len(bodies)}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--corpus", default=None)
+    ap.add_argument("--fetch", default=None, help="site:tag, e.g. stackoverflow:python")
+    ap.add_argument("--pages", type=int, default=2)
+    ap.add_argument("--save", default=None)
+    ap.add_argument("--max-chars", type=int, default=1500)
+    ap.add_argument("--repeat", type=int, default=1)
+    args = ap.parse_args()
+
+    if args.fetch:
+        bodies = fetch_corpus(args.fetch, args.pages)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                for b in bodies:
+                    f.write(json.dumps({"text": b}, ensure_ascii=False) + "\n")
+    elif args.corpus:
+        bodies = load_corpus(args.corpus, args.n)
+    else:
+        bodies = synthetic_corpus(args.n)
+
+    if not bodies:
+        raise SystemExit("empty corpus")
+    run(bodies, args.max_chars, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
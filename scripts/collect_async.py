@@ -0,0 +1,172 @@
+"""
+Concurrent collection from reddit / HN / StackExchange with per-host rate limits.
+
+Run from the repo root (API must be up for ingest):
+
+    python -m scripts.collect_async
+    python -m scripts.collect_async --sources reddit,hn --se stackoverflow:fastapi
+    python -m scripts.collect_async --sequential        # old one-by-one loop, for comparison
+    python -m scripts.collect_async --compare --dry-run # both, no ingest, prints the speedup
+
+Jobs are the same collector + pipeline stages the sync scripts use (one
+subreddit, one HN query, one SE site:tag), incremental from collectors.checkpoints
+cursors (--full drops them). Each host has its own token bucket
+(collectors.async_runner.DEFAULT_LIMITS, override with --rate host=rps:burst);
+items are posted to /ingest as soon as their job finishes. Items whose URL is
+already in the persisted seen filter (collectors.seen_filter) are dropped
+before cleaning.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from collectors import http_client
+from collectors.async_runner import FetchJob, RunStats, run_async, run_sequential
+from collectors.checkpoints import CHECKPOINTS, report_line
+from collectors.pipeline import Collector, Pipeline, default_stages
+from collectors.seen_filter import SEEN, item_keys
+from collectors.seen_filter import report_line as seen_report_line
+from collectors.sources import HNCollector, RedditCollector, SECollector
+from scripts.collect_and_ingest import SUBREDDITS
+from scripts.collect_routine_and_ingest import HN_QUERIES
+
+API_BASE = os.getenv("HUNTER_API_BASE", "http://127.0.0.1:8000")
+
+
+def ingest_item(item: Dict[str, Any]) -> bool:
+    # _keys — ключи seen-фильтра от _pipeline_fetch (с id и revision), на сервер не уходят
+    keys = item.pop("_keys", None) or item_keys(item.get("url"))
+    r = http_client.post(f"{API_BASE}/ingest", json=item, timeout=25)
+    if r.status_code == 400:
+        return False
+    r.raise_for_status()
+    SEEN.record(keys)
+    return not r.json().get("deduped", False)
+
+
+def _pipeline_fetch(collector: Collector, min_chars: int) -> List[Dict[str, Any]]:
+    # те же стадии, что и в синхронных скриптах (collectors.pipeline.default_stages)
+    return [{**it.payload(), "_keys": it.keys()} for it in Pipeline(default_stages(min_chars=min_chars, seen=SEEN)).items([collector])]
+
+
+def reddit_job(sr: str) -> FetchJob:
+    return FetchJob(
+        host="www.reddit.com",
+        name=f"r/{sr}",
+        fetch=lambda: _pipeline_fetch(RedditCollector([sr], limit=80), min_chars=40),
+    )
+
+
+def hn_job(query: str, pages: int) -> FetchJob:
+    # страницы одного запроса идут подряд: пустой хвост после курсора не запрашивается
+    return FetchJob(
+        host="hn.algolia.com",
+        name=repr(query),
+        fetch=lambda: _pipeline_fetch(HNCollector([query], pages=pages, hits_per_page=50), min_chars=0),
+        cost=pages,
+    )
+
+
+def se_job(spec: str, pages: int = 2) -> FetchJob:
+    # pages страниц id + один запрос за телами
+    return FetchJob(
+        host="api.stackexchange.com",
+        name=spec,
+        fetch=lambda: _pipeline_fetch(SECollector([spec], pages=pages), min_chars=80),
+        cost=pages + 1,
+    )
+
+
+def build_jobs(sources: List[str], se_specs: List[str], hn_pages: int = 2) -> List[FetchJob]:
+    jobs: List[FetchJob] = []
+    if "reddit" in sources:
+        jobs += [reddit_job(sr) for sr in SUBREDDITS]
+    if "hn" in sources:
+        jobs += [hn_job(q, hn_pages) for q in HN_QUERIES]
+    if "se" in sources:
+        jobs += [se_job(spec) for spec in se_specs]
+    return jobs
+
+
+def parse_rates(specs: List[str]) -> Dict[str, Tuple[float, int]]:
+    out: Dict[str, Tuple[float, int]] = {}
+    for spec in specs:
+        host, _, val = spec.partition("=")
+        rate, _, burst = val.partition(":")
+        out[host.strip()] = (float(rate), int(burst or 1))
+    return out
+
+
+def _report(name: str, stats: RunStats) -> None:
+    print(f"[{name}] " + json.dumps(stats.summary(), ensure_ascii=False))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sources", default="reddit,hn", help="comma list of reddit,hn,se")
+    ap.add_argument("--se", action="append", default=[], help="site:tag, repeatable (needs 'se' in --sources)")
+    ap.add_argument("--hn-pages", type=int, default=2)
+    ap.add_argument("--rate", action="append", default=[], help="host=rps[:burst], repeatable")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--sequential", action="store_true", help="run the old sequential loop instead")
+    ap.add_argument("--compare", action="store_true", help="run sequential first, then async, and print the speedup")
+    ap.add_argument("--dry-run", action="store_true", help="fetch and filter, but do not ingest")
+    ap.add_argument("--full", action="store_true", help="drop checkpoints of the selected sources and refetch everything")
+    args = ap.parse_args()
+
+    sources = [x.strip() for x in args.sources.split(",") if x.strip()]
+    if args.se and "se" not in sources:
+        sources.append("se")
+    ingest: Optional[Any] = None if args.dry_run else ingest_item
+    if not args.dry_run:
+        try:
+            SEEN.sync(API_BASE)
+        except Exception as e:
+            print(f"[seen] sync failed, using local filter only: {e}")
+    if args.full:
+        for src in sources:
+            CHECKPOINTS.reset({"se": "stackexchange"}.get(src, src))
+
+    seq: Optional[RunStats] = None
+    if args.sequential or args.compare:
+        cursors = CHECKPOINTS.snapshot()
+        seen = SEEN.snapshot()
+        seq = run_sequential(build_jobs(sources, args.se, args.hn_pages), ingest=ingest)
+        _report("sequential", seq)
+        if args.sequential:
+            if not args.dry_run:
+                CHECKPOINTS.save()
+                SEEN.save()
+            return
+        # async-прогон должен стартовать с тех же курсоров, иначе сравнение нечестное
+        CHECKPOINTS.restore(cursors)
+        SEEN.restore(seen)
+
+    stats = asyncio.run(
+        run_async(
+            build_jobs(sources, args.se, args.hn_pages),
+            ingest=ingest,
+            limits=parse_rates(args.rate),
+            concurrency=args.concurrency,
+        )
+    )
+    _report("async", stats)
+    if seq is not None and stats.wall_s > 0:
+        print(f"wall clock: sequential {seq.wall_s:.1f}s -> async {stats.wall_s:.1f}s ({seq.wall_s / stats.wall_s:.1f}x)")
+    if not args.dry_run:
+        # в dry-run курсоры не сохраняем: следующий настоящий запуск должен получить эти элементы
+        CHECKPOINTS.save()
+        SEEN.save()
+    print("Checkpoints: " + report_line())
+    print("Seen filter: " + seen_report_line())
+    print("HTTP: " + http_client.report_line())
+    print("Next: POST /extract then GET /radar then GET /ideas")
+
+
+if __name__ == "__main__":
+    main()
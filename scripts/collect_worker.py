@@ -0,0 +1,155 @@
+"""
+Collection worker: drain the durable work queue and send results to /ingest/batch.
+
+Run from the repo root, as many processes (or hosts sharing the queue file) as needed:
+
+    python -m scripts.collect_worker
+    python -m scripts.collect_worker --idle-exit 30      # stop after 30s without work
+    python -m scripts.collect_worker --max-jobs 100 --visibility 300
+
+Each leased unit (collectors.work_units) is fetched, run through the usual
+pipeline stages and posted; it is acknowledged only after the POST succeeds
+(at-least-once). A crash or hang makes the unit visible again after
+--visibility seconds, failures are retried with backoff and parked as
+'dead' after max attempts. Redelivered units are harmless: the server
+dedupes ingest. Per-host rate limits (collectors.async_runner.DEFAULT_LIMITS)
+are shared by all workers through the queue database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections import Counter
+from typing import Iterator, List
+
+from collectors import http_client
+from collectors.async_runner import DEFAULT_LIMITS, FALLBACK_LIMIT
+from collectors.pipeline import API_BASE, IngestSink, NormalizedItem, Pipeline, batched, default_stages
+from collectors.seen_filter import SeenFilter
+from collectors.work_queue import DEFAULT_VISIBILITY_S, Job, WorkQueue, open_default, worker_name
+from collectors.work_units import DRY_RUN_RESULT, HOSTS, MIN_CHARS, run_unit
+
+# seen-фильтр воркера — в памяти (общий файл несколько процессов перетирали бы), подтягивается с сервера
+SEEN_SYNC_EVERY = 50
+
+
+def wait_for_host(q: WorkQueue, kind: str, n: int = 1) -> None:
+    """По токену общего bucket-а хоста на каждый из n запросов."""
+    host = HOSTS.get(kind, "")
+    rate, burst = DEFAULT_LIMITS.get(host, FALLBACK_LIMIT)
+    for _ in range(n):
+        while True:
+            wait = q.acquire_host(host, rate, burst)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+
+
+class _Items:
+    """Уже скачанные элементы единицы как Collector для Pipeline."""
+
+    name = "queue"
+
+    def __init__(self, items: List[NormalizedItem]):
+        self._items = items
+
+    def items(self) -> Iterator[NormalizedItem]:
+        return iter(self._items)
+
+
+def process(q: WorkQueue, job: Job, name: str, seen: SeenFilter, dry_run: bool, totals: Counter, visibility_s: float = DEFAULT_VISIBILITY_S) -> None:
+    t0 = time.perf_counter()
+
+    def throttle(n: int) -> None:
+        wait_for_host(q, job.kind, n)
+        # ожидание лимита и запросы съедают аренду — продлеваем перед каждым шагом
+        q.extend(job, visibility_s)
+
+    try:
+        items, result = run_unit(job.kind, job.payload, throttle)
+        q.extend(job, visibility_s)
+        sink = IngestSink(dry_run=dry_run, seen=seen)
+        pipe = Pipeline(default_stages(min_chars=MIN_CHARS.get(job.kind, 40), seen=seen))
+        for batch in batched(pipe.items([_Items(items)]), size=100, start=100):
+            sink(batch)
+            q.extend(job, visibility_s)
+    except Exception as e:
+        q.nack(job, f"{type(e).__name__}: {e}")
+        q.record_worker(name, jobs_failed=1, busy_s=time.perf_counter() - t0)
+        totals["failed"] += 1
+        print(f"[worker] {job.kind} #{job.id} attempt {job.attempts}/{job.max_attempts} failed: {e}")
+        return
+
+    if dry_run:
+        # ничего не отправлено: результат без курсоров, fold_result его пропустит
+        # (иначе продюсер сдвинул бы checkpoints за неотправленные элементы)
+        result = {DRY_RUN_RESULT: True}
+    if q.ack(job, result):
+        done = {"jobs_done": 1}
+    else:
+        # аренда истекла и задачу взял кто-то ещё — данные уже ушли, повтор сдедупит сервер
+        done = {"leases_lost": 1}
+        print(f"[worker] {job.kind} #{job.id}: lease lost before ack")
+    q.record_worker(
+        name,
+        items_fetched=len(items),
+        items_sent=sink.counts["sent"],
+        ingested=sink.counts["ingested"],
+        busy_s=time.perf_counter() - t0,
+        **done,
+    )
+    totals.update(jobs=1, items=len(items), sent=sink.counts["sent"], ingested=sink.counts["ingested"])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queue", default=None, help="queue file (default HUNTER_WORK_QUEUE)")
+    ap.add_argument("--name", default=None, help="worker id (default host:pid)")
+    ap.add_argument("--visibility", type=float, default=DEFAULT_VISIBILITY_S, help="lease seconds before redelivery")
+    ap.add_argument("--max-jobs", type=int, default=None)
+    ap.add_argument("--idle-exit", type=float, default=None, help="exit after this many seconds with an empty queue")
+    ap.add_argument("--poll", type=float, default=2.0, help="seconds between polls of an empty queue")
+    ap.add_argument("--dry-run", action="store_true", help="fetch and filter, but do not ingest")
+    args = ap.parse_args()
+
+    q = WorkQueue(args.queue) if args.queue else open_default()
+    name = args.name or worker_name()
+    seen = SeenFilter(None)
+    totals: Counter = Counter()
+    idle_since = time.time()
+    next_sync = 0
+    t0 = time.time()
+    q.record_worker(name)
+    try:
+        while args.max_jobs is None or totals["jobs"] + totals["failed"] < args.max_jobs:
+            handled = totals["jobs"] + totals["failed"]
+            if not args.dry_run and handled >= next_sync:
+                next_sync = handled + SEEN_SYNC_EVERY
+                try:
+                    seen.sync(API_BASE)
+                except Exception as e:
+                    print(f"[seen] sync failed: {e}")
+            job = q.lease(name, visibility_s=args.visibility)
+            if job is None:
+                if args.idle_exit is not None and time.time() - idle_since >= args.idle_exit:
+                    break
+                time.sleep(args.poll)
+                continue
+            process(q, job, name, seen, args.dry_run, totals, args.visibility)
+            idle_since = time.time()
+    except KeyboardInterrupt:
+        pass
+
+    wall = max(time.time() - t0, 1e-9)
+    print(
+        f"[{name}] jobs={totals['jobs']} failed={totals['failed']} items={totals['items']} sent={totals['sent']} "
+        f"ingested={totals['ingested']} | {totals['jobs'] * 60 / wall:.1f} jobs/min, {totals['items'] / wall:.1f} items/s"
+    )
+    print("queue: " + json.dumps(q.stats(), ensure_ascii=False))
+    print("HTTP: " + http_client.report_line())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Producer for the durable collection queue: split collection into work units
+and push them; fold finished units back into the checkpoints.
+
+Run from the repo root (any time, e.g. from cron):
+
+    python -m scripts.enqueue_collect
+    python -m scripts.enqueue_collect --sources reddit,hn,se --se superuser:microsoft-excel --hn-pages 2
+    python -m scripts.enqueue_collect --stats     # queue depth and per-worker throughput only
+
+One unit = one subreddit /new, one HN query page or one SE tag page
+(collectors.work_units). Units are keyed, so re-running while earlier ones
+are still queued adds nothing. Cursors come from collectors.checkpoints and
+only this producer moves them, from the results of acknowledged units.
+Workers: python -m scripts.collect_worker (as many as you like, sharing
+HUNTER_WORK_QUEUE, default var/work_queue.sqlite).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from typing import List
+
+from collectors.checkpoints import CHECKPOINTS, report_line
+from collectors.work_queue import WorkQueue, open_default
+from collectors.work_units import Unit, fold_result, hn_units, reddit_unit, se_units
+from scripts.collect_and_ingest import SUBREDDITS
+from scripts.collect_routine_and_ingest import HN_QUERIES
+
+
+def print_stats(q: WorkQueue) -> None:
+    print("queue: " + json.dumps(q.stats(), ensure_ascii=False))
+    for w in q.worker_stats():
+        print(
+            f"  {w['worker']}: done={w['jobs_done']} failed={w['jobs_failed']} lost={w['leases_lost']} "
+            f"items={w['items_fetched']} ingested={w['ingested']} jobs/min={w['jobs_per_min']} "
+            f"items/s={w['items_per_s']} util={w['utilization']}"
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queue", default=None, help="queue file (default HUNTER_WORK_QUEUE)")
+    ap.add_argument("--sources", default="reddit,hn", help="comma list of reddit,hn,se")
+    ap.add_argument("--se", action="append", default=[], help="site:tag, repeatable (needs 'se' in --sources)")
+    ap.add_argument("--hn-pages", type=int, default=2)
+    ap.add_argument("--se-pages", type=int, default=2)
+    ap.add_argument("--max-attempts", type=int, default=5)
+    ap.add_argument("--stats", action="store_true", help="print queue and worker stats and exit")
+    args = ap.parse_args()
+
+    q = WorkQueue(args.queue) if args.queue else open_default()
+    if args.stats:
+        print_stats(q)
+        return
+
+    folded = q.harvest()
+    for kind, payload, result in folded:
+        fold_result(kind, payload, result, CHECKPOINTS)
+    CHECKPOINTS.save()
+
+    sources = [x.strip() for x in args.sources.split(",") if x.strip()]
+    if args.se and "se" not in sources:
+        sources.append("se")
+    units: List[Unit] = []
+    if "reddit" in sources:
+        units += [reddit_unit(sr, 80, CHECKPOINTS) for sr in SUBREDDITS]
+    if "hn" in sources:
+        units += [u for query in HN_QUERIES for u in hn_units(query, args.hn_pages, 50, CHECKPOINTS)]
+    if "se" in sources:
+        units += [u for spec in args.se for u in se_units(spec, args.se_pages, 50, CHECKPOINTS)]
+    pushed = q.push_many(units, max_attempts=args.max_attempts)
+
+    print(f"Harvested: {len(folded)} finished units | Enqueued: {pushed} new of {len(units)} (rest still pending)")
+    if folded:
+        print("Checkpoints: " + report_line())
+    print_stats(q)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Accuracy report: radar tags_top/sources from per-signature Space-Saving
+sketches (core.radar_state) vs exact Counters over every row (build_radar).
+
+Run from the repo root:
+
+    python -m scripts.report_sketch_accuracy
+    python -m scripts.report_sketch_accuracy --corpus data/se_items.jsonl --widths 8,16,32,64
+
+--corpus reads collector items as JSONL ({"text", "tags", "source",
+"signature"?} per line, e.g. what collectors post to /ingest). Items
+without a signature are signed the same way /extract does it.
+Without --corpus a synthetic SE-like stream is generated: Zipf-sized
+signatures with Zipf-distributed tags drawn from a large vocabulary.
+
+Per sketch width it reports, over signatures with >= --min-count rows:
+  - recall@8 of the exact top-8 tags and exact-order rate of tags_top;
+  - the same for sources (top-5);
+  - max count overestimate relative to total tags of the signature
+    (Space-Saving guarantees <= 1 / k);
+  - tracked entries vs exact distinct keys and facet read time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Tuple
+
+from core.radar_state import RadarState
+
+_SOURCES = ["stackexchange", "reddit", "hn", "manual", "github", "discourse"]
+
+
+def synthetic_items(n: int, signatures: int, vocab: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    sig_w = [1.0 / (i ** 1.1) for i in range(1, signatures + 1)]
+    tag_w = [1.0 / (i ** 1.05) for i in range(1, vocab + 1)]
+    src_w = [1.0 / (i ** 1.5) for i in range(1, len(_SOURCES) + 1)]
+    out = []
+    for s in rnd.choices(range(signatures), weights=sig_w, k=n):
+        # у каждой сигнатуры свой сдвиг словаря, чтобы топы различались
+        tags = {f"tag{(t + s * 37) % vocab}" for t in rnd.choices(range(vocab), weights=tag_w, k=rnd.randint(1, 5))}
+        out.append(
+            {
+                "signature": f"sig{s}",
+                "text": f"pain point {s}",
+                "tags": sorted(tags),
+                "source": rnd.choices(_SOURCES, weights=src_w)[0],
+            }
+        )
+    return out
+
+
+def load_items(path: str, n: int) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                items.append(json.loads(line))
+                if n and len(items) >= n:
+                    break
+
+    unsigned = [x for x in items if not x.get("signature")]
+    if unsigned:
+        from core.extract_cache import extract_tasks_cached
+        from core.signature import make_signature
+        from core.text_analysis import analyze
+
+        docs = [analyze(str(x.get("text") or "")) for x in unsigned]
+        for x, doc, task in zip(unsigned, docs, extract_tasks_cached(docs)):
+            x["signature"] = make_signature(task, doc)
+    return items
+
+
+def exact_facets(rows: List[Dict[str, Any]]) -> Tuple[Counter, Counter]:
+    # ровно тот же проход, что в build_radar
+    tag_counter: Counter = Counter()
+    src_counter: Counter = Counter()
+    for r in rows:
+        src = str(r.get("source") or "unknown").strip()
+        if src:
+            src_counter[src] += 1
+        for t in r.get("tags") or []:
+            t = str(t).strip().lower()
+            if t:
+                tag_counter[t] += 1
+    return tag_counter, src_counter
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", default=None)
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--signatures", type=int, default=200)
+    ap.add_argument("--vocab", type=int, default=5000)
+    ap.add_argument("--widths", default="4,8,16,32,64")
+    ap.add_argument("--min-count", type=int, default=2)
+    args = ap.parse_args()
+
+    items = load_items(args.corpus, args.n) if args.corpus else synthetic_items(args.n, args.signatures, args.vocab)
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for x in items:
+        groups[str(x["signature"])].append(x)
+    groups = {s: rows for s, rows in groups.items() if len(rows) >= args.min_count}
+
+    t0 = time.perf_counter()
+    exact = {s: exact_facets(rows) for s, rows in groups.items()}
+    exact_s = time.perf_counter() - t0
+    distinct = sum(len(tc) + len(sc) for tc, sc in exact.values())
+    biggest = max((len(r) for r in groups.values()), default=0)
+    print(f"items={len(items)} signatures={len(groups)} biggest={biggest} distinct tag+source keys={distinct}")
+    print(f"exact Counter pass over all rows: {exact_s * 1000:.1f} ms")
+    print()
+    print(f"{'k':>4} {'tag recall@8':>13} {'tag order':>10} {'src recall@5':>13} {'max err/total':>14} {'entries':>9} {'read ms':>8}")
+
+    for k in [int(x) for x in args.widths.split(",") if x.strip()]:
+        states: Dict[str, RadarState] = {}
+        for s, rows in groups.items():
+            st = states[s] = RadarState(s, top_k=k)
+            for r in rows:
+                st.add_row(r, score_micros=0)
+
+        t0 = time.perf_counter()
+        facets = {s: st.facets() for s, st in states.items()}
+        read_s = time.perf_counter() - t0
+
+        tag_hits = tag_total = order_ok = src_hits = src_total = 0
+        max_err = 0.0
+        for s, (tc, sc) in exact.items():
+            tags_top, sources = facets[s]
+            true_tags = [t for t, _ in tc.most_common(8)]
+            true_src = [x for x, _ in sc.most_common(5)]
+            tag_hits += len(set(tags_top) & set(true_tags))
+            tag_total += len(true_tags)
+            order_ok += tags_top == true_tags
+            src_hits += len(set(sources) & set(true_src))
+            src_total += len(true_src)
+            ss = states[s].tags
+            if ss.total:
+                max_err = max(max_err, max((c - tc[t]) / ss.total for t, c, _ in ss.entries()))
+
+        entries = sum(len(st.tags) + len(st.sources) for st in states.values())
+        print(
+            f"{k:>4} {tag_hits / max(tag_total, 1):>13.3f} {order_ok / max(len(exact), 1):>10.3f} "
+            f"{src_hits / max(src_total, 1):>13.3f} {max_err:>14.4f} {entries:>9} {read_s * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Long-running adaptive poller over the reddit / HN / SE collectors.
+
+Run from the repo root (API must be up for ingest):
+
+    python -m scripts.run_scheduler --budget 600
+    python -m scripts.run_scheduler --se stackoverflow:fastapi --se superuser:excel
+    python -m scripts.run_scheduler --plan     # print upcoming polls from the state file and exit
+
+Each source (subreddit, HN query, SE site:tag) gets its own interval that
+follows its observed arrival rate (collectors.scheduler.AdaptiveScheduler);
+due sources are dispatched in batches to collectors.async_runner with the
+usual per-host token buckets, fetches are incremental via checkpoints.
+Learned intervals and the upcoming-poll plan are written to
+HUNTER_SCHEDULER_STATE (default var/scheduler_state.json), which GET
+/scheduler on the API serves as well.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+from collectors import http_client
+from collectors.pipeline import API_BASE
+from collectors.scheduler import DEFAULT_STATE_PATH, AdaptiveScheduler, PollState, Source, state_view
+from collectors.seen_filter import SEEN
+from scripts.collect_and_ingest import SUBREDDITS
+from scripts.collect_async import hn_job, ingest_item, reddit_job, se_job
+from scripts.collect_routine_and_ingest import HN_QUERIES
+
+STATE_PATH = os.getenv("HUNTER_SCHEDULER_STATE", DEFAULT_STATE_PATH)
+
+
+def build_sources(se_specs: List[str], initial_s: float, hn_pages: int = 2) -> List[Source]:
+    out: List[Source] = []
+    for sr in SUBREDDITS:
+        out.append(Source(f"reddit:{sr}", reddit_job(sr), ("reddit", sr), capacity=80, state=PollState(initial_s)))
+    for q in HN_QUERIES:
+        out.append(Source(f"hn:{q}", hn_job(q, hn_pages), ("hn", q), capacity=50 * hn_pages, state=PollState(initial_s)))
+    for spec in se_specs:
+        site, _, tagged = spec.partition(":")
+        key = f"{site}:{tagged or 'python'}"
+        out.append(Source(f"se:{key}", se_job(spec), ("stackexchange", key), capacity=100, state=PollState(initial_s)))
+    return out
+
+
+def _print_plan(rows: List[dict], n: int) -> None:
+    for r in rows[:n]:
+        print(
+            f"  {r['due_in_s']:>8.0f}s  {r['source']:<40} every {r['interval_s']:>7.0f}s"
+            f"  rate/h={r['rate_per_h']:<8} expect={r['expected_yield']}"
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget", type=float, default=600.0, help="requests per hour across all sources")
+    ap.add_argument("--target", type=float, default=20.0, help="new items per poll to aim for")
+    ap.add_argument("--min-interval", type=float, default=60.0)
+    ap.add_argument("--max-interval", type=float, default=6 * 3600.0)
+    ap.add_argument("--initial", type=float, default=900.0, help="interval for sources without history")
+    ap.add_argument("--se", action="append", default=[], help="site:tag, repeatable")
+    ap.add_argument("--ticks", type=int, default=None, help="stop after N ticks (default: run forever)")
+    ap.add_argument("--dry-run", action="store_true", help="poll, but do not ingest")
+    ap.add_argument("--plan", action="store_true", help="print the saved plan and exit")
+    args = ap.parse_args()
+
+    if args.plan:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            view = state_view(json.load(f), time.time())
+        print(f"running={view['running']} age={view['age_s']}s budget/h={view['budget_per_hour']} pressure={view['pressure']}")
+        _print_plan(view["plan"], 50)
+        return
+
+    if not args.dry_run:
+        # job-ы collect_async фильтруют по SEEN и пишут в него — сверяем с сервером до первого опроса
+        try:
+            SEEN.sync(API_BASE)
+        except Exception as e:
+            print(f"[seen] sync failed, using local filter only: {e}")
+
+    sched = AdaptiveScheduler(
+        build_sources(args.se, args.initial),
+        ingest=None if args.dry_run else ingest_item,
+        budget_per_hour=args.budget,
+        target_per_poll=args.target,
+        min_interval_s=args.min_interval,
+        max_interval_s=args.max_interval,
+        state_path=STATE_PATH,
+        persist_checkpoints=not args.dry_run,
+        seen=SEEN,
+    )
+
+    def on_tick(s: AdaptiveScheduler, n: int) -> None:
+        if not n:
+            return
+        run = s.last_run.summary() if s.last_run else {}
+        print(f"[tick] polled={n} items={run.get('items')} ingested={run.get('ingested')} errors={run.get('errors')} pressure={s.pressure():.2f}")
+        _print_plan(s.plan(), 5)
+        print("  HTTP: " + http_client.report_line())
+
+    try:
+        asyncio.run(sched.run_forever(on_tick=on_tick, max_ticks=args.ticks))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sched.save(stopped=True)
+
+
+if __name__ == "__main__":
+    main()
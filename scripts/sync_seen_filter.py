@@ -0,0 +1,37 @@
+"""
+Sync the client-side seen filter with the API's dedup index, or inspect it.
+
+    python -m scripts.sync_seen_filter            # pull URLs ingested since the last sync
+    python -m scripts.sync_seen_filter --rebuild  # drop the local filter and pull everything
+    python -m scripts.sync_seen_filter --stats    # print size / key count, no network
+
+The filter (collectors.seen_filter.SEEN) lives in HUNTER_SEEN_FILTER
+(default var/seen_filter.bin); its false-positive rate is fixed when it is
+created from HUNTER_SEEN_FPR (default 0.001), so --rebuild after changing it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from collectors.pipeline import API_BASE
+from collectors.seen_filter import SEEN
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rebuild", action="store_true", help="reset the local filter before syncing")
+    ap.add_argument("--stats", action="store_true", help="only print filter stats")
+    args = ap.parse_args()
+
+    if not args.stats:
+        if args.rebuild:
+            SEEN.reset()
+        print("sync: " + json.dumps(SEEN.sync(API_BASE)))
+        SEEN.save()
+    print("filter: " + json.dumps(SEEN.stats()))
+
+
+if __name__ == "__main__":
+    main()